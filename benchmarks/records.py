@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Memory and DataFrame build-time benchmark for scraped-record containers.
+
+Compares the old per-item dicts collected in a list with RecordBatch on the
+same synthetic scrape: memory held by the container (tracemalloc, reported
+per million records), time to collect the items, and time to turn them into
+the DataFrame the exporter writes.
+
+    python benchmarks/records.py                   # 1M records
+    python benchmarks/records.py --records 200000
+"""
+import os
+import gc
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.records import RecordBatch  # noqa: E402
+
+PLATFORMS = ['amazon', 'ebay', 'aliexpress', 'jumia']
+
+
+def synthetic_items(count, seed=0):
+    """Fresh item dicts shaped like the scraper's, with fresh string objects as Selenium returns them"""
+    rng = random.Random(seed)
+    started = datetime(2025, 1, 1)
+    for i in range(count):
+        platform = PLATFORMS[i % len(PLATFORMS)]
+        yield {
+            'platform': ''.join(platform),
+            'title': f"Gaming product {i} with a fairly typical listing title",
+            'url': f"https://www.{platform}.com/item/{i}?ref=search_{rng.randrange(1000)}",
+            'price': f"${rng.uniform(5, 2000):,.2f}",
+            'discount': f"{rng.choice([0, 0, 0, 5, 10, 15, 20, 30])}%",
+            'rating': f"{rng.randint(30, 50) / 10}",
+            'reviews': str(rng.randrange(5000)),
+            'scraped_at': (started + timedelta(seconds=i)).isoformat(),
+        }
+
+
+def measure(label, collect, build, count):
+    gc.collect()
+    started = time.perf_counter()
+    container = collect(synthetic_items(count))
+    collect_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    frame = build(container)
+    build_seconds = time.perf_counter() - started
+    assert len(frame) == count
+    del container, frame
+    gc.collect()
+
+    # Memory is traced in a second pass so tracing doesn't skew the timings
+    tracemalloc.start()
+    container = collect(synthetic_items(count))
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del container
+
+    per_million = 1_000_000 / count
+    print(f"{label:<12} memory {held / 2**20 * per_million:>8.1f} MB/1M records   "
+          f"collect {collect_seconds:>6.2f} s   DataFrame {build_seconds:>6.2f} s")
+    return held
+
+
+def build_from_dicts(items):
+    # What the exporter did for every output format
+    df = pd.DataFrame(items)
+    df['scraped_at'] = pd.to_datetime(df['scraped_at'], format='ISO8601')
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraped-record container benchmark")
+    parser.add_argument('--records', type=int, default=1_000_000, help='Synthetic records to collect (default: 1000000)')
+    args = parser.parse_args()
+
+    dict_bytes = measure('dict list', list, build_from_dicts, args.records)
+    batch_bytes = measure('RecordBatch', RecordBatch, RecordBatch.to_frame, args.records)
+    print(f"RecordBatch holds {batch_bytes / dict_bytes:.0%} of the memory of the dict list")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
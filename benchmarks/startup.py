@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for main.py subcommands.
+
+Each scenario runs in a fresh interpreter with `-X importtime` inside a
+scratch working directory (a copy of config/ with empty data/ and logs/), so
+nothing touches the real data. It records the total import time and the
+peak RSS of the process and compares them with benchmarks/startup_baseline.json.
+
+    python benchmarks/startup.py                    # compare, exit 1 on regression
+    python benchmarks/startup.py --update-baseline  # record a new baseline
+
+Baselines are machine-specific; record them on the machine that runs the check.
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'startup_baseline.json')
+
+# Commands that start and exit on their own run main.py directly; long-running
+# ones (--serve, --schedule, --worker) are measured by importing what they load.
+SCENARIOS = {
+    'help': ['main.py', '--help'],
+    'query': ['main.py', 'query', '--product', '0'],
+    'export': ['main.py', '--export'],
+    'visualize': ['main.py', '--visualize'],
+    'enqueue': ['main.py', '--enqueue'],
+    'serve': ['-c', 'import main; from src.api import PriceQueryServer'],
+    'schedule': ['-c', 'import main; from src.scheduler import TaskScheduler'],
+    'worker': ['-c', 'import main; from src.work_queue import WorkQueue, QueueWorker'],
+}
+
+# A regression must exceed both the relative and the absolute slack
+RELATIVE_TOLERANCE = 0.25
+IMPORT_SLACK_MS = 30
+RSS_SLACK_MB = 10
+
+
+def scratch_dir():
+    path = tempfile.mkdtemp(prefix='startup-bench-')
+    shutil.copytree(os.path.join(ROOT, 'config'), os.path.join(path, 'config'))
+    os.makedirs(os.path.join(path, 'data'))
+    os.makedirs(os.path.join(path, 'logs'))
+    return path
+
+
+def run_once(args, cwd):
+    """Return (import_ms, peak_rss_mb, exit_status) for one fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1')
+    args = [os.path.join(ROOT, args[0])] + args[1:] if args[0] == 'main.py' else args
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [sys.executable, '-X', 'importtime'] + args,
+            cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=stderr,
+        )
+        # wait4 reports the resource usage of this child alone
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stderr.seek(0)
+        lines = stderr.read().decode('utf-8', 'replace').splitlines()
+
+    import_us = 0
+    for line in lines:
+        if line.startswith('import time:') and '|' in line:
+            self_us = line.split(':', 1)[1].split('|')[0].strip()
+            if self_us.isdigit():
+                import_us += int(self_us)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_bytes = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return import_us / 1000, rss_bytes / (1024 * 1024), process.returncode
+
+
+def measure(names, repeat):
+    results = {}
+    for name in names:
+        cwd = scratch_dir()
+        try:
+            runs = [run_once(SCENARIOS[name], cwd) for _ in range(repeat)]
+        finally:
+            shutil.rmtree(cwd, ignore_errors=True)
+        results[name] = {
+            'import_ms': round(statistics.median(run[0] for run in runs), 1),
+            'peak_rss_mb': round(statistics.median(run[1] for run in runs), 1),
+            'exit_code': runs[-1][2],
+        }
+        print(f"{name:<10} import {results[name]['import_ms']:>8.1f} ms   "
+              f"peak RSS {results[name]['peak_rss_mb']:>7.1f} MB   exit {results[name]['exit_code']}")
+    return results
+
+
+def regressions(results, baseline):
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        for metric, slack in (('import_ms', IMPORT_SLACK_MS), ('peak_rss_mb', RSS_SLACK_MB)):
+            limit = max(expected[metric] * (1 + RELATIVE_TOLERANCE), expected[metric] + slack)
+            if result[metric] > limit:
+                failures.append(f"{name}: {metric} {result[metric]} exceeds {limit:.1f} (baseline {expected[metric]})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and memory benchmark for main.py")
+    parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run (default: all): {', '.join(SCENARIOS)}")
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario; the median is reported')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+    args = parser.parse_args()
+    unknown = sorted(set(args.scenarios) - set(SCENARIOS))
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    results = measure(args.scenarios or list(SCENARIOS), args.repeat)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE, 'r') as f:
+                baseline = json.load(f)
+        baseline.update({name: {k: v for k, v in result.items() if k != 'exit_code'} for name, result in results.items()})
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline yet; run with --update-baseline to record one")
+        return 0
+    with open(BASELINE_FILE, 'r') as f:
+        failures = regressions(results, json.load(f))
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
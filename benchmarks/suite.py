@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Offline micro-benchmarks for parsing, normalization, export and charting.
+
+Every case runs against synthetic data in the exact historical_data.csv
+schema, without a browser or network. The history for a size is generated
+once into a template directory; each case then runs in a fresh interpreter
+inside its own scratch copy of it (plus config/ and empty logs/), so cases
+don't see each other's output and nothing touches the real data. The time
+of the measured call is reported by the case itself; peak RSS is that of the
+whole case process. Each case also checks what the call produced (rows
+written, charts rendered), since the code under test logs and swallows most
+errors; a case whose check fails exits non-zero and is reported as failed
+instead of timed. Results are compared with benchmarks/suite_baseline.json.
+
+    python benchmarks/suite.py                      # 10k rows, compare, exit 1 on regression
+    python benchmarks/suite.py --size 1m price_trends update_historical
+    python benchmarks/suite.py --update-baseline    # record a new baseline for this size
+
+Sizes are 10k, 1m and 10m rows. 10m takes a long time and several GB of
+memory and is meant for occasional runs; snapshot exports are skipped at that
+size (Excel's sheet limit is 1,048,576 rows). Baselines are machine-specific;
+record them on the machine that runs the check.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'suite_baseline.json')
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+# Products tracked at each size; every scrape run observes all of them
+PRODUCTS = {'10k': 100, '1m': 400, '10m': 1000}
+# New observations merged into the history by update_historical (one scrape run)
+SCRAPE_ROWS = 1000
+MAX_EXPORT_ROWS = 1_000_000
+
+PLATFORMS = ['amazon', 'ebay', 'aliexpress', 'jumia']
+BRANDS = ['Logitech', 'Razer', 'Corsair', 'SteelSeries', 'HyperX', 'Asus', 'Sony', 'Samsung']
+KINDS = ['Wireless Gaming Mouse', 'Mechanical Keyboard', 'Gaming Headset', 'USB-C Hub',
+         '27" Gaming Monitor', 'Portable SSD 1TB', 'Bluetooth Speaker', 'Webcam 1080p']
+HISTORY_COLUMNS = ['platform', 'url', 'title', 'price', 'discount', 'rating', 'reviews', 'scraped_at',
+                   'product_id', 'product_key']
+
+# A regression must exceed both the relative and the absolute slack
+RELATIVE_TOLERANCE = 0.25
+TIME_SLACK_S = 0.05
+RSS_SLACK_MB = 10
+
+
+def product_url(platform, product):
+    if platform == 'amazon':
+        return f"https://www.amazon.com/dp/B0{product:08d}"
+    if platform == 'ebay':
+        return f"https://www.ebay.com/itm/{100000000000 + product}"
+    if platform == 'aliexpress':
+        return f"https://www.aliexpress.com/item/{1005000000000000 + product}.html"
+    return f"https://www.jumia.co.ke/gaming-accessory-{10000000 + product}.html"
+
+
+def price_text(platform, value):
+    if platform == 'aliexpress':
+        return f"US ${value:,.2f}"
+    if platform == 'jumia':
+        return f"KSh {value * 130:,.0f}"
+    return f"${value:,.2f}"
+
+
+def synthetic_scrape(rows, products, seed=0):
+    """Scraped item columns as the scrapers produce them (text fields, ISO scrape times)"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    product = np.arange(rows) % products
+    run = np.arange(rows) // products
+    # The same model is listed on every platform, so cross-platform matching has work to do
+    model = product // len(PLATFORMS)
+    platform = np.array(PLATFORMS)[product % len(PLATFORMS)]
+
+    base_price = rng.uniform(5, 1500, products)
+    prices = base_price[product] * (1 + rng.normal(0, 0.03, rows))
+    missing = rng.random(rows) < 0.02
+    discounts = rng.choice([0, 0, 0, 5, 10, 15, 20, 30], rows)
+    ratings = rng.integers(30, 51, products)[product] / 10
+    reviews = rng.integers(0, 20000, products)[product] + run
+
+    urls = [product_url(PLATFORMS[k % len(PLATFORMS)], k) for k in range(products)]
+    titles = [f"{BRANDS[m % len(BRANDS)]} {KINDS[m // len(BRANDS) % len(KINDS)]} G{m:04d}"
+              for m in range(products // len(PLATFORMS) + 1)]
+    # Runs every six hours, products a couple of seconds apart within a run
+    started = np.datetime64('2025-01-01T00:00:00', 'us')
+    scraped_at = started + run * np.timedelta64(6, 'h') + product * np.timedelta64(2, 's') \
+        + rng.integers(0, 1_000_000, rows).astype('timedelta64[us]')
+
+    return pd.DataFrame({
+        'platform': platform,
+        'url': np.array(urls, dtype=object)[product],
+        'title': np.array(titles, dtype=object)[model],
+        'price': ["Not Found" if gone else price_text(p, value)
+                  for p, value, gone in zip(platform, prices, missing)],
+        'discount': [f"{value}%" for value in discounts],
+        'rating': [f"{value:.1f}" for value in ratings],
+        'reviews': [f"{value:,}" for value in reviews],
+        'scraped_at': pd.Series(scraped_at).dt.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+    })
+
+
+def prepare(size):
+    """Write the history for `size` and the stores the exporter keeps next to it into data/"""
+    from src.identity import ProductIndex
+    from src.rollups import RollupStore
+    from src.matching import ProductMatcher
+    from src.history_index import HistoryIndex
+    from src.series_store import SeriesStore
+
+    df = synthetic_scrape(SIZES[size], PRODUCTS[size])
+    product_index = ProductIndex()
+    df = product_index.assign(df)[HISTORY_COLUMNS]
+    df.to_csv("data/historical_data.csv", index=False)
+    product_index.save()
+    HistoryIndex().build(df)
+    RollupStore().rebuild(df)
+    SeriesStore().rebuild(df)
+    ProductMatcher().add_products(df)
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def parsed_values(values, expected):
+    # Every case returns (call, check); check raises if the call's result is wrong
+    def check(result):
+        expect(len(result) == len(values), f"parsed {len(result)} of {len(values)} values")
+        expect(sum(value is not None for value in result) >= expected,
+               f"fewer than {expected} values parsed")
+    return check
+
+
+def case_extract_price(size):
+    from src.utils import extract_price
+    prices = list(synthetic_scrape(SIZES[size], PRODUCTS[size])['price'])
+    priced = sum(price != "Not Found" for price in prices)
+    return lambda: list(map(extract_price, prices)), parsed_values(prices, priced)
+
+
+def case_extract_discount(size):
+    from src.utils import extract_discount
+    discounts = list(synthetic_scrape(SIZES[size], PRODUCTS[size])['discount'])
+    return lambda: list(map(extract_discount, discounts)), parsed_values(discounts, len(discounts))
+
+
+def case_visualizer_price(size):
+    from src.visualizer import DataVisualizer
+    extract_numeric_price = DataVisualizer().extract_numeric_price
+    prices = list(synthetic_scrape(SIZES[size], PRODUCTS[size])['price'])
+    priced = sum(price != "Not Found" for price in prices)
+    return lambda: list(map(extract_numeric_price, prices)), parsed_values(prices, priced)
+
+
+def snapshot_rows(output_format):
+    """Rows in the timestamped snapshot write_snapshots wrote for a format"""
+    folder, extension = {'csv': ('csv', 'csv'), 'json': ('json', 'json'), 'excel': ('excel', 'xlsx')}[output_format]
+    files = glob.glob(f"data/{folder}/products_[0-9]*.{extension}")
+    expect(len(files) == 1, f"expected one {output_format} snapshot, found {len(files)}")
+    if output_format == 'csv':
+        import pandas as pd
+        return len(pd.read_csv(files[0], usecols=['url']))
+    if output_format == 'json':
+        with open(files[0], 'r') as f:
+            return len(json.load(f))
+    import openpyxl
+    # The header row is the sheet's first row
+    return openpyxl.load_workbook(files[0], read_only=True).active.max_row - 1
+
+
+def export_case(output_format):
+    # The snapshot half of export_data for one format; the history update is its own case
+    def case(size):
+        from src.exporter import DataExporter
+        from src.records import RecordBatch
+        batch = RecordBatch(synthetic_scrape(SIZES[size], PRODUCTS[size]).to_dict('records'))
+        exporter = DataExporter()
+
+        def check(result):
+            rows = snapshot_rows(output_format)
+            expect(rows == len(batch), f"{output_format} snapshot has {rows} rows, expected {len(batch)}")
+        return lambda: exporter.write_snapshots(batch, batch.to_frame(), [output_format]), check
+    return case
+
+
+def case_update_historical(size):
+    import pandas as pd
+    from src.exporter import DataExporter
+    from src.records import RecordBatch
+    # The next scrape run after the stored history
+    scrape = synthetic_scrape(SIZES[size] + SCRAPE_ROWS, PRODUCTS[size]).iloc[SIZES[size]:]
+    batch = RecordBatch(scrape.to_dict('records'))
+    exporter = DataExporter()
+
+    def check(history):
+        expect(history is not None, "update_historical_data failed")
+        # Not Found rows of the new run are quarantined rather than appended
+        quarantined = len(pd.read_csv("data/quarantine.csv")) if os.path.exists("data/quarantine.csv") else 0
+        expect(quarantined < SCRAPE_ROWS, f"{quarantined} of {SCRAPE_ROWS} new rows quarantined")
+        expected = SIZES[size] + SCRAPE_ROWS - quarantined
+        expect(len(history) == expected, f"history has {len(history)} rows, expected {expected}")
+    return lambda: exporter.update_historical_data(batch.to_frame(), batch.price_values()), check
+
+
+def chart_case(method, outputs=(), check_result=None, **kwargs):
+    def case(size):
+        from src.visualizer import DataVisualizer
+        visualizer = DataVisualizer()
+
+        def check(result):
+            for output in outputs:
+                expect(glob.glob(output), f"{method} wrote no {output}")
+            if check_result is not None:
+                check_result(result)
+        return lambda: getattr(visualizer, method)(**kwargs), check
+    return case
+
+
+def rendered_charts(stats):
+    expect(stats is not None and stats['charts'] > 0, "no price trend charts rendered")
+
+
+def matched_products(table):
+    expect(table is not None and not table.empty, "no matched products")
+
+
+def html_index(index_file):
+    expect(index_file is not None and os.path.exists(index_file), "no dashboard index written")
+
+
+CASES = {
+    'extract_price': case_extract_price,
+    'extract_discount': case_extract_discount,
+    'visualizer_price': case_visualizer_price,
+    'export_csv': export_case('csv'),
+    'export_json': export_case('json'),
+    'export_excel': export_case('excel'),
+    'update_historical': case_update_historical,
+    'price_trends': chart_case('generate_price_trends', ["data/charts/price_trend_*.png"], rendered_charts, force=True),
+    'comparison_charts': chart_case('generate_comparison_charts', ["data/charts/platform_comparison.png"], force=True),
+    'dashboard': chart_case('generate_dashboard', ["data/charts/dashboard.png"], force=True),
+    'match_comparison': chart_case('generate_match_comparison', ["data/charts/cheapest_platform.png"],
+                                   matched_products, force=True),
+    'html_dashboard': chart_case('generate_html_dashboard', check_result=html_index),
+}
+
+
+def skipped(name, size):
+    return name.startswith('export_') and SIZES[size] > MAX_EXPORT_ROWS
+
+
+def run_case(name, size):
+    """Child side: set the case up, time the call, check its result and print the seconds
+
+    A failed check raises, so the child exits non-zero and prints nothing to time.
+    """
+    call, check = CASES[name](size)
+    started = time.perf_counter()
+    result = call()
+    seconds = time.perf_counter() - started
+    check(result)
+    print(json.dumps({'seconds': seconds}))
+
+
+def child(args, cwd):
+    """Return (stdout, stderr, peak_rss_mb, exit_status) for one fresh interpreter running this script"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1')
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)] + args,
+            cwd=cwd, env=env, stdout=stdout, stderr=stderr,
+        )
+        # wait4 reports the resource usage of this child alone
+        _, status, usage = os.wait4(process.pid, 0)
+        stdout.seek(0)
+        stderr.seek(0)
+        output = stdout.read().decode('utf-8', 'replace')
+        errors = stderr.read().decode('utf-8', 'replace')
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_bytes = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return output, errors, rss_bytes / (1024 * 1024), os.waitstatus_to_exitcode(status)
+
+
+def failure_reason(errors, exit_code):
+    """The last line of a failed child's stderr, normally the exception it died of"""
+    lines = errors.strip().splitlines()
+    return lines[-1] if lines else f"exit {exit_code}"
+
+
+def template_dir(size):
+    path = tempfile.mkdtemp(prefix=f'suite-bench-{size}-')
+    shutil.copytree(os.path.join(ROOT, 'config'), os.path.join(path, 'config'))
+    os.makedirs(os.path.join(path, 'data'))
+    os.makedirs(os.path.join(path, 'logs'))
+    print(f"Generating {SIZES[size]:,} rows of synthetic history...")
+    started = time.perf_counter()
+    _, errors, _, exit_code = child(['--prepare', '--size', size], path)
+    if exit_code != 0:
+        shutil.rmtree(path, ignore_errors=True)
+        raise RuntimeError(f"Generating the synthetic history failed: {failure_reason(errors, exit_code)}")
+    print(f"Generated in {time.perf_counter() - started:.1f} s")
+    return path
+
+
+def measure(names, size, repeat):
+    """Timings of the cases that passed their checks, and the reasons the others failed"""
+    template = template_dir(size)
+    results, failures = {}, {}
+    try:
+        for name in names:
+            if skipped(name, size):
+                print(f"{name:<18} skipped at {size}")
+                continue
+            runs = []
+            for _ in range(repeat):
+                cwd = tempfile.mkdtemp(prefix='suite-case-')
+                try:
+                    shutil.copytree(template, cwd, dirs_exist_ok=True)
+                    output, errors, rss_mb, exit_code = child(['--case', name, '--size', size], cwd)
+                finally:
+                    shutil.rmtree(cwd, ignore_errors=True)
+                lines = output.strip().splitlines()
+                if exit_code != 0 or not lines:
+                    failures[name] = failure_reason(errors, exit_code)
+                    break
+                runs.append((json.loads(lines[-1])['seconds'], rss_mb))
+            if name in failures:
+                print(f"{name:<18} FAILED: {failures[name]}")
+                continue
+            results[name] = {
+                'seconds': round(statistics.median(run[0] for run in runs), 3),
+                'peak_rss_mb': round(statistics.median(run[1] for run in runs), 1),
+            }
+            print(f"{name:<18} {results[name]['seconds']:>9.3f} s   peak RSS {results[name]['peak_rss_mb']:>8.1f} MB")
+    finally:
+        shutil.rmtree(template, ignore_errors=True)
+    return results, failures
+
+
+def regressions(results, baseline):
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        for metric, slack in (('seconds', TIME_SLACK_S), ('peak_rss_mb', RSS_SLACK_MB)):
+            limit = max(expected[metric] * (1 + RELATIVE_TOLERANCE), expected[metric] + slack)
+            if result[metric] > limit:
+                failures.append(f"{name}: {metric} {result[metric]} exceeds {limit:.3f} (baseline {expected[metric]})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline parsing, export and charting benchmarks")
+    parser.add_argument('cases', nargs='*', help=f"Cases to run (default: all): {', '.join(CASES)}")
+    parser.add_argument('--size', choices=list(SIZES), default='10k', help='Rows of synthetic history (default: 10k)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the median is reported')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline for this size')
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        prepare(args.size)
+        return 0
+    if args.case:
+        run_case(args.case, args.size)
+        return 0
+
+    unknown = sorted(set(args.cases) - set(CASES))
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(unknown)}")
+
+    results, failed = measure(args.cases or list(CASES), args.size, args.repeat)
+    for name, reason in failed.items():
+        print(f"FAILED {name}: {reason}")
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r') as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.setdefault(args.size, {}).update(results)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 1 if failed else 0
+
+    if args.size not in baseline:
+        print(f"No {args.size} baseline yet; run with --update-baseline to record one")
+        return 1 if failed else 0
+    failures = regressions(results, baseline[args.size])
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
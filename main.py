@@ -2,44 +2,112 @@
 """
 E-commerce Price Tracker - Main Script
 """
+import sys
+import json
 import argparse
-from src.scraper import EcommerceScraper
-from src.exporter import DataExporter
-from src.visualizer import DataVisualizer
-from src.scheduler import TaskScheduler
 from src.utils import setup_logging
 
+# Subsystems are imported inside the branch that uses them: selenium, pandas,
+# matplotlib and the Google clients together take seconds to load, and most
+# commands need only one of them.
+
 def main():
     parser = argparse.ArgumentParser(description="E-commerce Price Tracker")
+    parser.add_argument('command', nargs='?', choices=['query'], help='query: stream matching history observations')
     parser.add_argument('--scrape', action='store_true', help='Run scraping once')
     parser.add_argument('--export', action='store_true', help='Export existing data')
     parser.add_argument('--visualize', action='store_true', help='Generate visualizations')
     parser.add_argument('--schedule', action='store_true', help='Start scheduled tasks')
-    parser.add_argument('--headless', action='store_true', default=True, help='Run browser in headless mode')
+    parser.add_argument('--headless', action='store_true', default=None, help='Run browser in headless mode (default: "headless" in settings.json)')
     parser.add_argument('--all', action='store_true', help='Run all steps: scrape, export, visualize')
+    parser.add_argument('--tabs', type=int, help='Pages to keep loading at once in one browser (default: "browser.tabs" in settings.json)')
+    parser.add_argument('--shard', help='Scrape only shard i of N of the catalog, e.g. --shard 0/4')
+    parser.add_argument('--cost-version', help='With --shard: balance shards on the frozen URL cost snapshot of this version (python -m src.sharding freeze)')
+    parser.add_argument('--enqueue', action='store_true', help='Queue a scraping run for --worker processes')
+    parser.add_argument('--worker', action='store_true', help='Process queued scraping tasks until the queue is drained')
+    parser.add_argument('--serve', action='store_true', help='Serve the read-only price query API')
+    parser.add_argument('--host', default='127.0.0.1', help='Host for --serve (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Port for --serve (default: 8080)')
+    parser.add_argument('--product', help='query: product_key, product_id or exact title')
+    parser.add_argument('--platform', help='query: only this platform')
+    parser.add_argument('--since', help='query: observations at or after this time')
+    parser.add_argument('--until', help='query: observations at or before this time')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='query: output format (json is one object per line)')
+    parser.add_argument('--output', help='query: write to this file instead of stdout')
     
     args = parser.parse_args()
     logger = setup_logging('main')
     
-    if args.all or args.scrape:
+    from src.config import get_config, ConfigError
+    try:
+        config = get_config()
+    except ConfigError as e:
+        parser.error(f"Invalid configuration: {e}")
+    
+    if args.tabs is not None and args.tabs < 1:
+        parser.error("--tabs must be at least 1")
+    
+    shard = None
+    if args.shard:
+        from src.sharding import parse_shard
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.cost_version:
+        if not shard:
+            parser.error("--cost-version requires --shard")
+        from src.sharding import load_cost_snapshot
+        try:
+            load_cost_snapshot(args.cost_version)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.command == 'query':
+        run_query(args, parser, logger)
+    
+    elif args.all:
+        from src.scraper import EcommerceScraper
+        from src.exporter import DataExporter
+        from src.visualizer import DataVisualizer
+        from src.pipeline import ExportPipeline
+        logger.info("Starting scraping process with overlapped export and charts...")
+        scraper = EcommerceScraper(headless=args.headless, shard=shard, tabs=args.tabs, cost_version=args.cost_version)
+        pipeline = ExportPipeline(DataExporter(shard=shard), DataVisualizer())
+        try:
+            data = scraper.scrape_all_products(sink=pipeline)
+        finally:
+            pipeline.close()
+        
+        if data:
+            logger.info(f"Successfully scraped {len(data)} products")
+        else:
+            logger.warning("No data was scraped")
+    
+    elif args.scrape:
+        from src.scraper import EcommerceScraper
         logger.info("Starting scraping process...")
-        scraper = EcommerceScraper(headless=args.headless)
+        scraper = EcommerceScraper(headless=args.headless, shard=shard, tabs=args.tabs, cost_version=args.cost_version)
         data = scraper.scrape_all_products()
         
         if data:
             logger.info(f"Successfully scraped {len(data)} products")
             
-            if args.all or args.export:
+            if args.export:
+                from src.exporter import DataExporter
                 logger.info("Exporting data...")
-                exporter = DataExporter()
+                exporter = DataExporter(shard=shard)
                 exporter.export_data(data)
             
-            if args.all or args.visualize:
+            if args.visualize:
+                from src.visualizer import DataVisualizer
                 logger.info("Generating visualizations...")
                 visualizer = DataVisualizer()
                 visualizer.generate_price_trends()
                 visualizer.generate_comparison_charts()
                 visualizer.generate_dashboard()
+                visualizer.generate_match_comparison()
+                visualizer.generate_html_dashboard()
         else:
             logger.warning("No data was scraped")
     
@@ -49,13 +117,57 @@ def main():
         logger.warning("Export-only mode requires existing data structure")
     
     elif args.visualize:
+        from src.visualizer import DataVisualizer
         logger.info("Generating visualizations from historical data...")
         visualizer = DataVisualizer()
         visualizer.generate_price_trends()
         visualizer.generate_comparison_charts()
         visualizer.generate_dashboard()
+        visualizer.generate_match_comparison()
+        visualizer.generate_html_dashboard()
+    
+    elif args.enqueue:
+        from src.work_queue import WorkQueue
+        from src.frontier import CrawlFrontier
+        from src.urls import page_type
+        queue = WorkQueue.from_settings(config.settings)
+        frontier = CrawlFrontier.from_config(config)
+        run_id = queue.enqueue_run(frontier.plan(config.products, page_type))
+        frontier.finish_run()
+        logger.info(f"Queued run {run_id}; start workers with: python main.py --worker")
+    
+    elif args.worker:
+        from src.work_queue import WorkQueue, QueueWorker
+        queue = WorkQueue.from_settings(config.settings)
+        
+        def export_run(run_id, data):
+            from src.exporter import DataExporter
+            if not data:
+                logger.warning(f"Run {run_id} produced no data")
+                return
+            logger.info(f"Exporting {len(data)} products from run {run_id}")
+            if not DataExporter().export_data(data):
+                # Raising releases the merge lease, so the run is merged again later
+                raise RuntimeError(f"Updating the history with run {run_id} failed")
+        
+        def make_scraper():
+            from src.scraper import EcommerceScraper
+            return EcommerceScraper(headless=args.headless)
+        
+        worker = QueueWorker(queue, make_scraper)
+        worker.run(export=export_run)
+    
+    elif args.serve:
+        from src.api import PriceQueryServer
+        logger.info("Starting price query API...")
+        server = PriceQueryServer(host=args.host, port=args.port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
     
     elif args.schedule:
+        from src.scheduler import TaskScheduler
         logger.info("Starting scheduled task runner...")
         scheduler = TaskScheduler()
         scheduler.schedule_daily_task()
@@ -63,5 +175,44 @@ def main():
     else:
         parser.print_help()
 
+def run_query(args, parser, logger):
+    """Stream history observations matching the query filters"""
+    import pandas as pd
+    from src.history_index import HistoryIndex
+    bounds = {}
+    for name in ('since', 'until'):
+        value = getattr(args, name)
+        try:
+            bounds[name] = pd.Timestamp(value) if value is not None else None
+        except ValueError:
+            bounds[name] = pd.NaT
+        if value is not None and pd.isna(bounds[name]):
+            parser.error(f"--{name} must be a date or time such as 2025-01-31 or 2025-01-31T08:00, got {value!r}")
+    
+    index = HistoryIndex()
+    if not index.load():
+        logger.warning("No historical data found")
+        return
+    
+    filters = dict(product=args.product, platform=args.platform, **bounds)
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    count = 0
+    try:
+        if args.format == 'csv':
+            positions = index.select(**filters)
+            count = len(positions)
+            output.write(index.header)
+            for blob in index.read(positions):
+                output.write(blob)
+        else:
+            for record in index.query_records(**filters):
+                output.write((json.dumps(record) + "\n").encode('utf-8'))
+                count += 1
+        output.flush()
+    finally:
+        if args.output:
+            output.close()
+    logger.info(f"Query returned {count} observations")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
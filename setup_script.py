@@ -59,6 +59,52 @@ def setup_project():
                 "enabled": False,
                 "credentials_file": "credentials.json",
                 "spreadsheet_id": ""
+            },
+            "anomaly_detection": {
+                "enabled": True,
+                "mode": "quarantine",
+                "window": 7,
+                "threshold": 6.0
+            },
+            "alerts": {
+                "enabled": False,
+                "cooldown_minutes": 360,
+                "state_file": "data/alerts/state.json",
+                "rules": [
+                    {"type": "percent_drop", "percent": 10},
+                    {"type": "all_time_low"},
+                    {"type": "discount_above", "percent": 30}
+                ],
+                "sinks": [
+                    {"type": "jsonl", "path": "data/alerts/alerts.jsonl"}
+                ]
+            },
+            "work_queue": {
+                "db_file": "data/queue.db",
+                "lease_seconds": 300,
+                "max_attempts": 3
+            },
+            "scheduler": {
+                "daily_at": "09:00",
+                "timeout_minutes": 120
+            },
+            "frontier": {
+                "index_file": "data/frontier.npz",
+                "freshness_hours": 6
+            },
+            "enrichment": {
+                "enabled": False,
+                "max_workers": 2,
+                "cache_file": "data/enrichment_cache.json",
+                "ttl_hours": 24
+            },
+            "selector_stats": {
+                "stats_file": "data/selector_stats.json",
+                "demote_after_runs": 5
+            },
+            "browser": {
+                "tabs": 1,
+                "runs_file": "data/browser_runs.jsonl"
             }
         }
         
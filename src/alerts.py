@@ -0,0 +1,266 @@
+"""
+Incremental price-alert rules engine.
+
+Rules are evaluated at ingest time against per-product running state (last
+price, minimum price), so every new observation costs O(1) and the history
+is never re-scanned. Fired alerts are deduplicated, rate-limited with a
+per-rule cooldown and delivered to pluggable sinks.
+"""
+import os
+import json
+import logging
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from src.identity import UNIDENTIFIED_KEY
+from src.rollups import parse_price_series, parse_discount_series
+
+
+class ThresholdRule:
+    """Price at or below an absolute threshold, optionally scoped to one product/platform"""
+    def __init__(self, max_price, product=None, platform=None, rule_id=None):
+        self.max_price = float(max_price)
+        self.product = product
+        self.platform = platform
+        self.rule_id = rule_id or f"threshold:{self.max_price:g}:{product or platform or 'all'}"
+
+    def evaluate(self, observation, state):
+        if self.product and self.product not in (observation['product_id'], str(observation['product_key'])):
+            return None
+        if self.platform and self.platform != observation['platform']:
+            return None
+        if observation['price'] <= self.max_price:
+            return f"Price {observation['price']:g} is at or below {self.max_price:g}"
+        return None
+
+
+class PercentDropRule:
+    """Price dropped by at least `percent` versus the previous observation"""
+    def __init__(self, percent, rule_id=None):
+        self.percent = float(percent)
+        self.rule_id = rule_id or f"percent_drop:{self.percent:g}"
+
+    def evaluate(self, observation, state):
+        last_price = state.get('last_price')
+        if not last_price:
+            return None
+        drop = (last_price - observation['price']) / last_price * 100
+        if drop >= self.percent:
+            return f"Price dropped {drop:.1f}% from {last_price:g} to {observation['price']:g}"
+        return None
+
+
+class AllTimeLowRule:
+    """Price is lower than every previous observation of the product"""
+    def __init__(self, rule_id=None):
+        self.rule_id = rule_id or "all_time_low"
+
+    def evaluate(self, observation, state):
+        min_price = state.get('min_price')
+        if min_price is not None and observation['price'] < min_price:
+            return f"New all-time low {observation['price']:g} (previous low {min_price:g})"
+        return None
+
+
+class DiscountAboveRule:
+    """Advertised discount above `percent`"""
+    def __init__(self, percent, rule_id=None):
+        self.percent = float(percent)
+        self.rule_id = rule_id or f"discount_above:{self.percent:g}"
+
+    def evaluate(self, observation, state):
+        if observation['discount'] > self.percent:
+            return f"Discount {observation['discount']:g}% is above {self.percent:g}%"
+        return None
+
+
+RULE_TYPES = {
+    'threshold': ThresholdRule,
+    'percent_drop': PercentDropRule,
+    'all_time_low': AllTimeLowRule,
+    'discount_above': DiscountAboveRule,
+}
+
+
+class JsonlAlertSink:
+    def __init__(self, path="data/alerts/alerts.jsonl"):
+        self.path = path
+
+    def send(self, alerts):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert) + "\n")
+
+
+class WebhookAlertSink:
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alerts):
+        body = json.dumps({'alerts': alerts}).encode('utf-8')
+        request = urllib.request.Request(
+            self.url, data=body, headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+SINK_TYPES = {
+    'jsonl': lambda config: JsonlAlertSink(config.get('path', "data/alerts/alerts.jsonl")),
+    'webhook': lambda config: WebhookAlertSink(config['url'], config.get('timeout', 5)),
+}
+
+
+class AlertEngine:
+    def __init__(self, rules, sinks, state_file="data/alerts/state.json", cooldown_minutes=360):
+        self.rules = rules
+        self.sinks = sinks
+        self.state_file = state_file
+        self.cooldown = timedelta(minutes=cooldown_minutes)
+        self.logger = logging.getLogger(__name__)
+        self.products = {}
+        self.fired = {}
+        self.load_state()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build an engine from the "alerts" section of settings.json, or None if disabled"""
+        config = settings.get('alerts', {})
+        if not config.get('enabled', False):
+            return None
+        rules = []
+        for rule in config.get('rules', []):
+            options = {k: v for k, v in rule.items() if k != 'type'}
+            rules.append(RULE_TYPES[rule['type']](**options))
+        sinks = [SINK_TYPES[sink['type']](sink) for sink in config.get('sinks', [{'type': 'jsonl'}])]
+        return cls(
+            rules, sinks,
+            state_file=config.get('state_file', "data/alerts/state.json"),
+            cooldown_minutes=config.get('cooldown_minutes', 360),
+        )
+
+    def load_state(self):
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            self.products = state.get('products', {})
+            self.fired = state.get('fired', {})
+        except (json.JSONDecodeError, OSError) as e:
+            self.logger.error(f"Could not read alert state {self.state_file}: {e}")
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'products': self.products, 'fired': self.fired}, f)
+        os.replace(tmp_file, self.state_file)
+
+    def should_fire(self, fired_key, observation, state):
+        """Deduplicate identical alerts and enforce the per-rule cooldown"""
+        previous = self.fired.get(fired_key)
+        if previous is None:
+            return True
+        # The same alert for a price that has not moved since is a duplicate
+        if previous['price'] == observation['price'] and state.get('last_price') == observation['price']:
+            return False
+        return observation['scraped_at'] - datetime.fromisoformat(previous['at']) >= self.cooldown
+
+    def process(self, df):
+        """Evaluate all rules on a batch of new observations and update running state"""
+        df = df[df['product_key'] != UNIDENTIFIED_KEY]
+        batch = pd.DataFrame({
+            'product_key': df['product_key'],
+            'product_id': df['product_id'],
+            'platform': df['platform'],
+            'title': df['title'],
+            'url': df['url'],
+            'price': parse_price_series(df['price']),
+            'discount': parse_discount_series(df['discount']),
+            'scraped_at': pd.to_datetime(df['scraped_at'], format='ISO8601'),
+        }).dropna(subset=['price']).sort_values('scraped_at', kind='stable')
+
+        alerts = []
+        for observation in batch.to_dict('records'):
+            observation['scraped_at'] = observation['scraped_at'].to_pydatetime()
+            product_key = str(observation['product_key'])
+            state = self.products.get(product_key, {})
+
+            for rule in self.rules:
+                message = rule.evaluate(observation, state)
+                if not message:
+                    continue
+                fired_key = f"{product_key}|{rule.rule_id}"
+                if not self.should_fire(fired_key, observation, state):
+                    continue
+                self.fired[fired_key] = {'price': observation['price'], 'at': observation['scraped_at'].isoformat()}
+                alerts.append({
+                    'rule': rule.rule_id,
+                    'message': message,
+                    'product_key': int(observation['product_key']),
+                    'product_id': observation['product_id'],
+                    'platform': observation['platform'],
+                    'title': observation['title'],
+                    'url': observation['url'],
+                    'price': observation['price'],
+                    'scraped_at': observation['scraped_at'].isoformat(),
+                })
+
+            min_price = state.get('min_price')
+            self.products[product_key] = {
+                'last_price': observation['price'],
+                'min_price': observation['price'] if min_price is None else min(min_price, observation['price']),
+                'observations': state.get('observations', 0) + 1,
+                'last_seen': observation['scraped_at'].isoformat(),
+            }
+
+        self.save_state()
+        if alerts:
+            self.dispatch(alerts)
+        self.logger.info(f"Evaluated {len(batch)} observations, fired {len(alerts)} alerts")
+        return alerts
+
+    def dispatch(self, alerts):
+        for sink in self.sinks:
+            try:
+                sink.send(alerts)
+            except Exception as e:
+                self.logger.error(f"Error delivering alerts to {type(sink).__name__}: {str(e)}")
+
+
+class LocalWebhookReceiver:
+    """Stand-in webhook endpoint that appends received alerts to a JSONL file"""
+    def __init__(self, host="127.0.0.1", port=8765, output_file="data/alerts/webhook_received.jsonl"):
+        sink = JsonlAlertSink(output_file)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                sink.send(payload.get('alerts', []))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logging.getLogger(__name__).info(format % args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    # Run the stand-in webhook receiver for local testing
+    logging.basicConfig(level=logging.INFO)
+    LocalWebhookReceiver().serve_forever()
@@ -0,0 +1,144 @@
+"""
+Vectorized anomaly and scrape-error detection over price history.
+
+Observations are flagged when they are scrape errors (missing price or
+title, bot-challenge URLs) or statistical outliers against a trailing
+rolling median/MAD of the same product. The rolling statistics are computed
+for all products at once with NumPy sliding windows over the history sorted
+by (product_key, scraped_at); no per-row Python runs.
+"""
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.rollups import parse_price_series
+
+CHALLENGE_MARKERS = r'splashui/challenge|captcha|/errors/validatecaptcha|punish|sec\.aliexpress'
+# Rows per block when materializing sliding windows, to bound memory
+BLOCK_ROWS = 1_000_000
+MAD_TO_SIGMA = 1.4826
+
+
+def window_median(windows, counts):
+    """Row-wise median of NaN-padded windows; np.sort puts NaNs last"""
+    ordered = np.sort(windows, axis=1)
+    low = np.take_along_axis(ordered, ((counts - 1) // 2)[:, None], axis=1)[:, 0]
+    high = np.take_along_axis(ordered, (counts // 2)[:, None], axis=1)[:, 0]
+    return (low + high) / 2
+
+
+def excluded_rows(df, config):
+    """Rows derived views leave out: flagged at ingest, plus scrape glitches and outliers
+    in older history when anomaly detection is enabled"""
+    flagged = pd.Series(False, index=df.index)
+    if config.anomaly_detection.enabled:
+        flagged |= AnomalyDetector.from_config(config).detect(df) != ''
+    if 'anomaly' in df.columns:
+        flagged |= df['anomaly'].fillna('') != ''
+    return flagged
+
+
+class AnomalyDetector:
+    def __init__(self, window=7, threshold=6.0, min_periods=3, min_relative_scale=0.1):
+        self.window = window
+        self.threshold = threshold
+        self.min_periods = min_periods
+        # Floor for the robust scale, as a fraction of the median, so a product with
+        # perfectly stable prices doesn't flag every ordinary price change
+        self.min_relative_scale = min_relative_scale
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(window=config.anomaly_detection.window, threshold=config.anomaly_detection.threshold)
+
+    def detect(self, df):
+        """Return a Series of anomaly reasons aligned with df ('' for clean rows)"""
+        reasons = pd.Series('', index=df.index, dtype=object)
+        if df.empty:
+            return reasons
+
+        prices = df['price_numeric'] if 'price_numeric' in df.columns else parse_price_series(df['price'])
+        prices = prices.to_numpy(dtype=float, na_value=np.nan)
+
+        # History repeats the same URLs every run, so match each distinct URL once
+        url_codes, urls = pd.factorize(df['url'].astype(str))
+        challenge = pd.Series(urls).str.contains(CHALLENGE_MARKERS, case=False, regex=True).to_numpy()[url_codes]
+        not_found = np.isnan(prices) | (df['title'].isna() | (df['title'] == "Not Found")).to_numpy()
+        outlier = self.outliers(df, prices) & ~not_found & ~challenge
+
+        reasons[not_found] = 'not_found'
+        reasons[challenge] = 'challenge_page'
+        reasons[outlier] = 'price_outlier'
+        return reasons
+
+    def outliers(self, df, prices):
+        """Robust z-score of each price against the product's previous `window` prices"""
+        order = np.lexsort((df['scraped_at'].to_numpy(), df['product_key'].to_numpy()))
+        keys = df['product_key'].to_numpy()[order]
+        sorted_prices = prices[order]
+        n = len(sorted_prices)
+
+        # Index of the first row of each row's product group
+        is_start = np.ones(n, dtype=bool)
+        is_start[1:] = keys[1:] != keys[:-1]
+        group_start = np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+        padded = np.concatenate([np.full(self.window, np.nan), sorted_prices])
+        offsets = np.arange(self.window)
+        flagged_sorted = np.zeros(n, dtype=bool)
+
+        for block_start in range(0, n, BLOCK_ROWS):
+            block_end = min(block_start + BLOCK_ROWS, n)
+            rows = np.arange(block_start, block_end)
+            # Row i sees prices[i - window : i]; padded shifts that to padded[i : i + window]
+            windows = sliding_window_view(padded[block_start:block_end + self.window - 1], self.window).copy()
+            positions = rows[:, None] - self.window + offsets[None, :]
+            windows[positions < group_start[rows][:, None]] = np.nan
+
+            counts = np.sum(~np.isnan(windows), axis=1)
+            enough = counts >= self.min_periods
+            if not enough.any():
+                continue
+
+            windows = windows[enough]
+            counts = counts[enough]
+            current = sorted_prices[rows[enough]]
+            median = window_median(windows, counts)
+            mad = window_median(np.abs(windows - median[:, None]), counts)
+            scale = np.maximum(MAD_TO_SIGMA * mad, self.min_relative_scale * np.abs(median))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                score = np.abs(current - median) / scale
+            flagged_sorted[rows[enough]] = score > self.threshold
+
+        flagged = np.zeros(n, dtype=bool)
+        flagged[order] = flagged_sorted
+        return flagged
+
+    def split(self, new_df, history_df=None):
+        """Score new rows against recent history; return (clean_rows, anomalous_rows)"""
+        context = pd.DataFrame()
+        if history_df is not None and not history_df.empty and 'product_key' in history_df.columns:
+            recent = history_df[history_df['product_key'].isin(new_df['product_key'])]
+            context = recent.groupby('product_key', sort=False).tail(self.window)
+            if 'anomaly' in context.columns:
+                context = context[context['anomaly'].fillna('') == '']
+
+        combined = pd.concat([context, new_df], ignore_index=True)
+        combined['scraped_at'] = pd.to_datetime(combined['scraped_at'], format='ISO8601')
+        reasons = self.detect(combined).to_numpy()[len(context):]
+
+        flagged = reasons != ''
+        anomalies = new_df[flagged].assign(anomaly=reasons[flagged])
+        return new_df[~flagged], anomalies
+
+    def quarantine(self, anomalies, quarantine_file="data/quarantine.csv"):
+        if anomalies.empty:
+            return
+        header = not os.path.exists(quarantine_file)
+        anomalies.to_csv(quarantine_file, mode='a', header=header, index=False)
+        counts = anomalies['anomaly'].value_counts().to_dict()
+        self.logger.warning(f"Quarantined {len(anomalies)} observations to {quarantine_file}: {counts}")
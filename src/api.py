@@ -0,0 +1,184 @@
+"""
+Local read-only HTTP API for current prices and price history.
+
+Endpoints (all GET, JSON):
+    /products/latest?platform=X&limit=N&offset=M   latest observation per product
+    /products/<product>/latest                      latest observation of one product
+    /products/<product>/history?since=..&until=..   history of one product in a time range
+    /platforms/summary                              per-platform summary of latest prices
+
+<product> is a product_key, a product_id such as "amazon:B08N5WRWNW", or an
+exact (URL-encoded) title. Responses are cached in an in-memory LRU that is
+invalidated whenever a new export rewrites the history file, and carry an
+ETag so clients can revalidate with If-None-Match.
+"""
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import pandas as pd
+
+from src.history_store import HistoryStore
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.generation = None
+        self.lock = threading.Lock()
+
+    def get(self, key, generation):
+        with self.lock:
+            if generation != self.generation:
+                # A new export landed: everything cached is stale
+                self.entries.clear()
+                self.generation = generation
+                return None
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, generation, value):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+def frame_to_records(df):
+    return json.loads(df.to_json(orient='records', date_format='iso'))
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PriceQueryService:
+    def __init__(self, store=None, cache_size=1024):
+        self.store = store or HistoryStore()
+        self.cache = LRUCache(cache_size)
+        self.logger = logging.getLogger(__name__)
+
+    def handle(self, path, query):
+        """Return (status, etag, body bytes) for a GET request"""
+        generation = self.store.refresh()
+        cache_key = (path, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+        cached = self.cache.get(cache_key, generation)
+        if cached is not None:
+            return cached
+
+        try:
+            payload = self.route(path, query)
+            status = 200
+        except ApiError as e:
+            payload = {'error': e.message}
+            status = e.status
+
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        etag = f'"{generation}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        response = (status, etag, body)
+        if status == 200:
+            self.cache.put(cache_key, generation, response)
+        return response
+
+    def route(self, path, query):
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        if parts == ['products', 'latest']:
+            return self.latest_prices(query)
+        if parts == ['platforms', 'summary']:
+            return frame_to_records(self.store.platform_summary())
+        if len(parts) == 3 and parts[0] == 'products' and parts[2] in ('latest', 'history'):
+            product_key = self.store.resolve(parts[1])
+            if product_key is None:
+                raise ApiError(404, f"Unknown product: {parts[1]}")
+            if parts[2] == 'latest':
+                return frame_to_records(self.store.latest_for(product_key))[0]
+            return {
+                'product_key': product_key,
+                'observations': frame_to_records(self.store.history(
+                    product_key,
+                    since=self.parse_time(query, 'since'),
+                    until=self.parse_time(query, 'until'),
+                )),
+            }
+        raise ApiError(404, f"Unknown endpoint: {path}")
+
+    def latest_prices(self, query):
+        latest = self.store.latest
+        platform = query.get('platform', [None])[0]
+        if platform:
+            latest = latest[latest['platform'] == platform]
+        try:
+            limit = int(query.get('limit', [1000])[0])
+            offset = int(query.get('offset', [0])[0])
+        except ValueError:
+            raise ApiError(400, "limit and offset must be integers")
+        return {
+            'total': len(latest),
+            'products': frame_to_records(latest.iloc[offset:offset + limit]),
+        }
+
+    def parse_time(self, query, name):
+        value = query.get(name, [None])[0]
+        if value is None:
+            return None
+        try:
+            timestamp = pd.Timestamp(value)
+        except ValueError:
+            timestamp = pd.NaT
+        # "", "NaT" and "nat" parse to NaT, which would silently match nothing
+        if pd.isna(timestamp):
+            raise ApiError(400, f"Invalid {name} timestamp: {value}")
+        return timestamp
+
+
+class PriceQueryServer:
+    def __init__(self, host="127.0.0.1", port=8080, service=None):
+        self.service = service or PriceQueryService()
+        self.logger = logging.getLogger(__name__)
+        service = self.service
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                # Blank parameters are kept so "?since=" is rejected rather than ignored
+                status, etag, body = service.handle(parts.path, parse_qs(parts.query, keep_blank_values=True))
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.getLogger(__name__).debug(format % args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+
+    def serve_forever(self):
+        host, port = self.server.server_address[:2]
+        self.service.store.refresh()
+        self.logger.info(f"Serving price query API on http://{host}:{port}")
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,308 @@
+"""
+Typed, validated configuration shared by every component.
+
+config/settings.json, config/products.json and config/selectors.json are parsed into a
+`Config` object and cached. `get_config()` returns the cached object and
+cheaply re-checks the files' modification times, so long-running processes
+(the scheduler, queue workers) pick up edits without a restart. A
+file that fails validation is reported and the last good configuration stays
+in effect.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+
+SETTINGS_FILE = "config/settings.json"
+PRODUCTS_FILE = "config/products.json"
+SELECTORS_FILE = "config/selectors.json"
+OUTPUT_FORMATS = ('csv', 'json', 'excel')
+ANOMALY_MODES = ('quarantine', 'flag')
+# Minimum seconds between modification-time checks
+RELOAD_CHECK_SECONDS = 2.0
+
+
+class ConfigError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class GoogleSheetsConfig:
+    enabled: bool = False
+    credentials_file: str = "credentials.json"
+    spreadsheet_id: str = ""
+
+
+@dataclass(frozen=True)
+class AnomalyConfig:
+    enabled: bool = True
+    mode: str = "quarantine"
+    window: int = 7
+    threshold: float = 6.0
+
+
+@dataclass(frozen=True)
+class WorkQueueConfig:
+    db_file: str = "data/queue.db"
+    lease_seconds: int = 300
+    max_attempts: int = 3
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    daily_at: str = "09:00"
+    timeout_minutes: int = 120
+
+
+@dataclass(frozen=True)
+class FrontierConfig:
+    index_file: str = "data/frontier.npz"
+    # Product pages fetched more recently than this are skipped
+    freshness_hours: float = 6
+
+
+@dataclass(frozen=True)
+class EnrichmentConfig:
+    enabled: bool = False
+    # Browsers fetching product pages at the same time
+    max_workers: int = 2
+    cache_file: str = "data/enrichment_cache.json"
+    ttl_hours: float = 24
+
+
+@dataclass(frozen=True)
+class SelectorStatsConfig:
+    stats_file: str = "data/selector_stats.json"
+    # Selectors that haven't matched for this many runs are tried last
+    demote_after_runs: int = 5
+
+
+@dataclass(frozen=True)
+class BrowserConfig:
+    # Pages kept loading at once in one browser (tab multiplexing); 1 loads one page at a time
+    tabs: int = 1
+    runs_file: str = "data/browser_runs.jsonl"
+
+
+@dataclass(frozen=True)
+class Config:
+    headless: bool = True
+    # Seconds to wait for a page to finish loading before parsing it
+    implicit_wait: float = 10
+    # Seconds to wait for an expected element (WebDriverWait timeout)
+    explicit_wait: float = 30
+    output_formats: tuple = OUTPUT_FORMATS
+    google_sheets: GoogleSheetsConfig = field(default_factory=GoogleSheetsConfig)
+    anomaly_detection: AnomalyConfig = field(default_factory=AnomalyConfig)
+    work_queue: WorkQueueConfig = field(default_factory=WorkQueueConfig)
+    scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+    frontier: FrontierConfig = field(default_factory=FrontierConfig)
+    enrichment: EnrichmentConfig = field(default_factory=EnrichmentConfig)
+    selector_stats: SelectorStatsConfig = field(default_factory=SelectorStatsConfig)
+    browser: BrowserConfig = field(default_factory=BrowserConfig)
+    products: dict = field(default_factory=dict)
+    # {platform: {field: [css selectors]}} from selectors.json
+    selectors: dict = field(default_factory=dict)
+    # The validated settings.json as read, for from_settings() constructors;
+    # alert rules and sinks are heterogeneous and AlertEngine validates them
+    settings: dict = field(default_factory=dict)
+
+
+def _check(condition, message):
+    if not condition:
+        raise ConfigError(message)
+
+
+def _number(section, key, value, minimum=0):
+    _check(isinstance(value, (int, float)) and not isinstance(value, bool) and value > minimum,
+           f"{section}{key} must be a number greater than {minimum}, got {value!r}")
+    return value
+
+
+def _integer(section, key, value, minimum=0):
+    _check(isinstance(value, int) and not isinstance(value, bool) and value > minimum,
+           f"{section}{key} must be a whole number greater than {minimum}, got {value!r}")
+    return value
+
+
+def _non_negative(section, key, value):
+    _check(isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0,
+           f"{section}{key} must be a number of at least 0, got {value!r}")
+
+
+def _section(cls, raw, name, validators):
+    raw = raw.get(name, {})
+    _check(isinstance(raw, dict), f"{name} must be an object")
+    known = {f for f in cls.__dataclass_fields__}
+    unknown = set(raw) - known
+    _check(not unknown, f"Unknown keys in {name}: {', '.join(sorted(unknown))}")
+    for key, validate in validators.items():
+        if key in raw:
+            validate(f"{name}.", key, raw[key])
+    return cls(**raw)
+
+
+def _bool(section, key, value):
+    _check(isinstance(value, bool), f"{section}{key} must be true or false, got {value!r}")
+
+
+def _string(section, key, value):
+    _check(isinstance(value, str), f"{section}{key} must be a string, got {value!r}")
+
+
+def _choice(options):
+    def validate(section, key, value):
+        _check(value in options, f"{section}{key} must be one of {', '.join(options)}, got {value!r}")
+    return validate
+
+
+def _daily_time(section, key, value):
+    try:
+        hour, minute = (int(part) for part in str(value).split(':'))
+        valid = 0 <= hour < 24 and 0 <= minute < 60
+    except ValueError:
+        valid = False
+    _check(valid, f"{section}{key} must be HH:MM, got {value!r}")
+
+
+def parse_settings(raw):
+    """Validate a settings.json dict and build the typed settings fields"""
+    _check(isinstance(raw, dict), "settings must be a JSON object")
+    formats = raw.get('output_formats', list(OUTPUT_FORMATS))
+    _check(isinstance(formats, list) and all(f in OUTPUT_FORMATS for f in formats),
+           f"output_formats must be a list drawn from {', '.join(OUTPUT_FORMATS)}, got {formats!r}")
+    headless = raw.get('headless', True)
+    _bool('', 'headless', headless)
+    _check(isinstance(raw.get('alerts', {}), dict), "alerts must be an object")
+
+    return dict(
+        headless=headless,
+        implicit_wait=_number('', 'implicit_wait', raw.get('implicit_wait', 10)),
+        explicit_wait=_number('', 'explicit_wait', raw.get('explicit_wait', 30)),
+        output_formats=tuple(formats),
+        google_sheets=_section(GoogleSheetsConfig, raw, 'google_sheets', {
+            'enabled': _bool, 'credentials_file': _string, 'spreadsheet_id': _string,
+        }),
+        anomaly_detection=_section(AnomalyConfig, raw, 'anomaly_detection', {
+            'enabled': _bool, 'mode': _choice(ANOMALY_MODES), 'window': _integer, 'threshold': _number,
+        }),
+        work_queue=_section(WorkQueueConfig, raw, 'work_queue', {
+            'db_file': _string, 'lease_seconds': _integer, 'max_attempts': _integer,
+        }),
+        scheduler=_section(SchedulerConfig, raw, 'scheduler', {
+            'daily_at': _daily_time, 'timeout_minutes': _integer,
+        }),
+        frontier=_section(FrontierConfig, raw, 'frontier', {
+            'index_file': _string, 'freshness_hours': _non_negative,
+        }),
+        enrichment=_section(EnrichmentConfig, raw, 'enrichment', {
+            'enabled': _bool, 'max_workers': _integer, 'cache_file': _string, 'ttl_hours': _non_negative,
+        }),
+        selector_stats=_section(SelectorStatsConfig, raw, 'selector_stats', {
+            'stats_file': _string, 'demote_after_runs': _integer,
+        }),
+        browser=_section(BrowserConfig, raw, 'browser', {
+            'tabs': _integer, 'runs_file': _string,
+        }),
+        settings=raw,
+    )
+
+
+def parse_products(raw):
+    """Validate products.json: {platform: [url, ...]}"""
+    _check(isinstance(raw, dict), "products must be a JSON object of platform -> URL list")
+    for platform, urls in raw.items():
+        _check(isinstance(urls, list) and all(isinstance(url, str) and url.startswith('http') for url in urls),
+               f"products.{platform} must be a list of http(s) URLs")
+    return raw
+
+
+def parse_selectors(raw):
+    """Validate selectors.json: {platform: {field: "css, css" or [css, ...]}}"""
+    _check(isinstance(raw, dict), "selectors must be a JSON object of platform -> field -> selectors")
+    selectors = {}
+    for platform, fields in raw.items():
+        _check(isinstance(fields, dict), f"selectors.{platform} must be an object of field -> selectors")
+        selectors[platform] = {}
+        for name, value in fields.items():
+            if isinstance(value, str):
+                # A comma-separated group is split so each alternative gets its own statistics
+                value = [part.strip() for part in value.split(',')]
+            _check(isinstance(value, list) and all(isinstance(part, str) for part in value),
+                   f"selectors.{platform}.{name} must be a string or a list of strings")
+            selectors[platform][name] = [part for part in value if part]
+    return selectors
+
+
+class ConfigStore:
+    def __init__(self, settings_file=SETTINGS_FILE, products_file=PRODUCTS_FILE, selectors_file=SELECTORS_FILE):
+        self.settings_file = settings_file
+        self.products_file = products_file
+        self.selectors_file = selectors_file
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.config = None
+        self.signature = None
+        self.checked_at = 0.0
+
+    def file_signature(self):
+        signature = []
+        for path in (self.settings_file, self.products_file, self.selectors_file):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def read(self, path, parse):
+        if not os.path.exists(path):
+            self.logger.warning(f"Config file {path} not found, using defaults")
+            return parse({})
+        with open(path, 'r') as f:
+            try:
+                raw = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ConfigError(f"Invalid JSON in {path}: {e}")
+        return parse(raw)
+
+    def load(self):
+        """Parse settings.json, products.json and selectors.json into a new Config; raises ConfigError if any is invalid"""
+        settings = self.read(self.settings_file, parse_settings)
+        products = self.read(self.products_file, parse_products)
+        selectors = self.read(self.selectors_file, parse_selectors)
+        return Config(products=products, selectors=selectors, **settings)
+
+    def get(self):
+        """The current Config, reloaded if a config file changed since the last check"""
+        now = time.monotonic()
+        if self.config is not None and now - self.checked_at < RELOAD_CHECK_SECONDS:
+            return self.config
+        with self.lock:
+            self.checked_at = now
+            signature = self.file_signature()
+            if self.config is not None and signature == self.signature:
+                return self.config
+            try:
+                config = self.load()
+            except ConfigError as e:
+                if self.config is None:
+                    raise
+                self.logger.error(f"Ignoring invalid configuration change: {e}")
+                self.signature = signature
+                return self.config
+            if self.config is not None:
+                self.logger.info("Configuration reloaded")
+            self.config = config
+            self.signature = signature
+            return config
+
+
+_store = ConfigStore()
+
+
+def get_config():
+    """The shared, cached configuration for this process"""
+    return _store.get()
@@ -0,0 +1,173 @@
+"""
+Search-to-detail enrichment.
+
+Search cards only show part of a product: the scrapers record a hard-coded
+"0%" discount for them and often miss the rating or review count. The
+Enricher takes a page of search results, fetches each result's product page
+with a small pool of browsers (one per worker thread, at most `max_workers`
+at a time) and fills the placeholder fields from the detail scrape. Detail
+results are kept in an on-disk cache for `ttl_hours`, so popular products
+that show up in every run are not fetched again until their entry expires.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.urls import extract_product_id, page_type
+
+ENRICHED_FIELDS = ('price', 'discount', 'rating', 'reviews')
+PLACEHOLDERS = {None, "", "Not Found", "0%", "0"}
+
+
+class EnrichmentCache:
+    def __init__(self, cache_file="data/enrichment_cache.json", ttl_hours=24):
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_hours * 3600
+        self.logger = logging.getLogger(__name__)
+        self.entries = {}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    self.entries = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                self.logger.error(f"Error reading enrichment cache {cache_file}: {str(e)}")
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or time.time() - entry['fetched_at'] >= self.ttl_seconds:
+            return None
+        return entry['fields']
+
+    def put(self, key, fields):
+        self.entries[key] = {'fetched_at': time.time(), 'fields': fields}
+
+    def save(self):
+        cutoff = time.time() - self.ttl_seconds
+        self.entries = {key: entry for key, entry in self.entries.items() if entry['fetched_at'] >= cutoff}
+        os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_file, self.cache_file)
+
+
+def merge_detail(item, fields):
+    """Fill the item's placeholder fields with real values from its product page"""
+    for name in ENRICHED_FIELDS:
+        value = fields.get(name)
+        if item.get(name) in PLACEHOLDERS and value not in PLACEHOLDERS:
+            item[name] = value
+    return item
+
+
+class Enricher:
+    def __init__(self, scraper_factory, cache, max_workers=2, frontier=None):
+        self.scraper_factory = scraper_factory
+        self.cache = cache
+        self.max_workers = max_workers
+        # The parent scraper's frontier, told about every product page fetched here
+        self.frontier = frontier
+        self.logger = logging.getLogger(__name__)
+        self.local = threading.local()
+        self.scrapers = []
+        self.scrapers_lock = threading.Lock()
+        self.executor = None
+        self.stats = {'items': 0, 'hits': 0, 'fetched': 0, 'failed': 0}
+        self.latencies = []
+
+    @classmethod
+    def from_config(cls, config, scraper_factory, frontier=None):
+        enrichment = config.enrichment
+        cache = EnrichmentCache(enrichment.cache_file, enrichment.ttl_hours)
+        return cls(scraper_factory, cache, max_workers=enrichment.max_workers, frontier=frontier)
+
+    def worker_scraper(self):
+        """The calling thread's own browser; Selenium drivers can't be shared between threads"""
+        scraper = getattr(self.local, 'scraper', None)
+        if scraper is None:
+            scraper = self.local.scraper = self.scraper_factory()
+            with self.scrapers_lock:
+                self.scrapers.append(scraper)
+        return scraper
+
+    def fetch(self, url, platform):
+        started = time.perf_counter()
+        try:
+            fields = self.worker_scraper().scrape_product(url, platform)
+        except Exception as e:
+            self.logger.warning(f"Error enriching {url}: {str(e)}")
+            fields = None
+        return fields, time.perf_counter() - started
+
+    def enrich(self, items):
+        """Enrich a page of search-result items in place; returns them"""
+        pending = {}
+        for item in items:
+            url, platform = item.get('url'), item.get('platform')
+            # Sponsored/redirect links aren't product pages and would be scraped as searches
+            if not url or page_type(url, platform) != "product":
+                continue
+            self.stats['items'] += 1
+            key = extract_product_id(url, platform)
+            fields = self.cache.get(key)
+            if fields is not None:
+                self.stats['hits'] += 1
+                merge_detail(item, fields)
+            else:
+                pending.setdefault(key, []).append(item)
+        if not pending:
+            return items
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="enrich")
+        futures = {
+            key: self.executor.submit(self.fetch, group[0]['url'], group[0]['platform'])
+            for key, group in pending.items()
+        }
+        for key, future in futures.items():
+            fields, latency = future.result()
+            self.latencies.append(latency)
+            if not isinstance(fields, dict):
+                self.stats['failed'] += 1
+                continue
+            self.stats['fetched'] += 1
+            if self.frontier is not None:
+                # The product page is fresh now; the freshness window applies to it like to configured pages
+                self.frontier.mark_fetched(pending[key][0]['url'], pending[key][0]['platform'])
+            fields = {name: fields.get(name) for name in ENRICHED_FIELDS}
+            self.cache.put(key, fields)
+            for item in pending[key]:
+                merge_detail(item, fields)
+        return items
+
+    def report(self):
+        items = self.stats['items']
+        hit_rate = self.stats['hits'] / items if items else 0.0
+        latencies = np.array(self.latencies) * 1000
+        latency = (f", latency mean {latencies.mean():.0f} ms / p95 {np.percentile(latencies, 95):.0f} ms"
+                   if len(latencies) else "")
+        self.logger.info(
+            f"Enrichment: {items} results, {self.stats['hits']} cache hits ({hit_rate:.0%}), "
+            f"{self.stats['fetched']} fetched, {self.stats['failed']} failed{latency}"
+        )
+        return {**self.stats, 'hit_rate': hit_rate}
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        for scraper in self.scrapers:
+            try:
+                scraper.driver.quit()
+            except Exception as e:
+                self.logger.warning(f"Error closing enrichment browser: {str(e)}")
+        self.scrapers = []
+        try:
+            self.cache.save()
+        except OSError as e:
+            self.logger.error(f"Error saving enrichment cache: {str(e)}")
+        self.report()
@@ -1,26 +1,30 @@
 import pandas as pd
 import json
 import os
+import shutil
+import textwrap
 from datetime import datetime
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import logging
+from src.identity import ProductIndex
+from src.matching import ProductMatcher
+from src.alerts import AlertEngine
+from src.anomaly import AnomalyDetector
+from src.rollups import RollupStore
+from src.history_index import HistoryIndex
+from src.series_store import SeriesStore
+from src.snapshot_diff import SnapshotDiff, with_product_ids
+from src.config import get_config
+from src.records import RecordBatch
+from src.utils import setup_logging
 
 class DataExporter:
-    def __init__(self):
+    def __init__(self, shard=None):
+        # Sharded nodes write their snapshots to per-shard files, e.g. products_latest_shard0of4.csv
+        self.suffix = f"_shard{shard[0]}of{shard[1]}" if shard else ""
         self.setup_logging()
         self.setup_directories()
         
     def setup_logging(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('logs/exporter.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        self.logger = setup_logging('exporter', __name__)
         
     def setup_directories(self):
         os.makedirs('data/csv', exist_ok=True)
@@ -30,77 +34,100 @@ class DataExporter:
         os.makedirs('logs', exist_ok=True)
     
     def export_data(self, data, formats=None):
+        """Write snapshots and update the history; `data` is a RecordBatch or a list of item dicts.
+        
+        Returns False if the history update failed, so callers can retry the export.
+        """
+        batch = RecordBatch.coerce(data)
+        df = batch.to_frame()
+        self.write_snapshots(batch, df, formats)
+        
+        # Update historical data
+        return self.update_historical_data(df, batch.price_values()) is not None
+    
+    def write_snapshots(self, batch, df, formats=None):
         if formats is None:
-            formats = ['csv', 'json', 'excel']
-            
+            formats = get_config().output_formats
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         if 'csv' in formats:
-            self.export_to_csv(data, timestamp)
+            self.export_to_csv(df, timestamp)
         
         if 'json' in formats:
-            self.export_to_json(data, timestamp)
+            self.export_to_json(batch.to_items(), timestamp)
             
         if 'excel' in formats:
-            self.export_to_excel(data, timestamp)
+            self.export_to_excel(df, timestamp)
             
         # Update Google Sheets if enabled
-        self.update_google_sheets(data)
-        
-        # Update historical data
-        self.update_historical_data(data)
+        self.update_google_sheets(df)
     
-    def export_to_csv(self, data, timestamp):
+    def open_snapshots(self, formats=None):
+        """Snapshot files written batch by batch while a scrape is still running"""
+        return SnapshotStream(self, get_config().output_formats if formats is None else formats)
+    
+    def export_to_csv(self, df, timestamp):
         try:
-            df = pd.DataFrame(data)
-            filename = f"data/csv/products_{timestamp}.csv"
+            filename = f"data/csv/products{self.suffix}_{timestamp}.csv"
+            # The product ID lets the next run's snapshot diff join without re-deriving it
+            df = with_product_ids(df)
             df.to_csv(filename, index=False)
             self.logger.info(f"Exported data to CSV: {filename}")
             
             # Also update the latest file
-            df.to_csv("data/csv/products_latest.csv", index=False)
+            df.to_csv(f"data/csv/products_latest{self.suffix}.csv", index=False)
         except Exception as e:
             self.logger.error(f"Error exporting to CSV: {str(e)}")
+            return
+        self.report_changes(filename)
+    
+    def report_changes(self, snapshot_file):
+        """Diff a new CSV snapshot against the previous one into data/diffs/"""
+        try:
+            SnapshotDiff().report(snapshot_file)
+        except Exception as e:
+            self.logger.error(f"Error comparing snapshots: {str(e)}")
     
-    def export_to_json(self, data, timestamp):
+    def export_to_json(self, items, timestamp):
         try:
-            filename = f"data/json/products_{timestamp}.json"
+            filename = f"data/json/products{self.suffix}_{timestamp}.json"
             with open(filename, 'w') as f:
-                json.dump(data, f, indent=4)
+                json.dump(items, f, indent=4)
             self.logger.info(f"Exported data to JSON: {filename}")
             
             # Also update the latest file
-            with open("data/json/products_latest.json", 'w') as f:
-                json.dump(data, f, indent=4)
+            with open(f"data/json/products_latest{self.suffix}.json", 'w') as f:
+                json.dump(items, f, indent=4)
         except Exception as e:
             self.logger.error(f"Error exporting to JSON: {str(e)}")
     
-    def export_to_excel(self, data, timestamp):
+    def export_to_excel(self, df, timestamp):
         try:
-            df = pd.DataFrame(data)
-            filename = f"data/excel/products_{timestamp}.xlsx"
+            filename = f"data/excel/products{self.suffix}_{timestamp}.xlsx"
             df.to_excel(filename, index=False)
             self.logger.info(f"Exported data to Excel: {filename}")
             
             # Also update the latest file
-            df.to_excel("data/excel/products_latest.xlsx", index=False)
+            df.to_excel(f"data/excel/products_latest{self.suffix}.xlsx", index=False)
         except Exception as e:
             self.logger.error(f"Error exporting to Excel: {str(e)}")
     
-    def update_google_sheets(self, data):
+    def update_google_sheets(self, df):
         try:
             # Check if Google Sheets integration is enabled
-            with open('config/settings.json', 'r') as f:
-                settings = json.load(f)
-                
-            if not settings.get('google_sheets', {}).get('enabled', False):
+            config = get_config().google_sheets
+            if not config.enabled:
                 return
+            
+            # Imported here so runs without Sheets don't pay for the Google client libraries
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
                 
             # Authenticate with Google Sheets API
             scope = ["https://spreadsheets.google.com/feeds", 
                     "https://www.googleapis.com/auth/drive"]
             
-            creds_file = settings['google_sheets'].get('credentials_file', 'credentials.json')
+            creds_file = config.credentials_file
             if not os.path.exists(creds_file):
                 self.logger.warning("Google Sheets credentials file not found")
                 return
@@ -109,17 +136,13 @@ class DataExporter:
             client = gspread.authorize(creds)
             
             # Open the spreadsheet
-            spreadsheet_id = settings['google_sheets'].get('spreadsheet_id')
+            spreadsheet_id = config.spreadsheet_id
             if not spreadsheet_id:
                 self.logger.warning("Google Sheets spreadsheet ID not configured")
                 return
                 
             sheet = client.open_by_key(spreadsheet_id).sheet1
             
-            # Prepare data for insertion
-            df = pd.DataFrame(data)
-            df['scraped_at'] = pd.to_datetime(df['scraped_at'])
-            
             # Clear existing data (except header)
             if sheet.row_count > 1:
                 sheet.delete_rows(2, sheet.row_count)
@@ -144,19 +167,33 @@ class DataExporter:
         except Exception as e:
             self.logger.error(f"Error updating Google Sheets: {str(e)}")
     
-    def update_historical_data(self, data):
+    def update_historical_data(self, df, price_values=None, historical_df=None):
+        """Append to the history and its derived stores; returns the updated history frame.
+        
+        Pass the frame returned by the previous call as `historical_df` to skip re-reading the file.
+        """
         try:
             historical_file = "data/historical_data.csv"
             
-            # Load existing historical data if it exists
-            if os.path.exists(historical_file):
+            # Load existing historical data if it exists, unless the caller already holds it
+            if historical_df is None and os.path.exists(historical_file):
                 historical_df = pd.read_csv(historical_file)
-            else:
+            elif historical_df is None:
                 historical_df = pd.DataFrame()
             
-            # Convert new data to DataFrame
-            new_df = pd.DataFrame(data)
-            new_df['scraped_at'] = pd.to_datetime(new_df['scraped_at'])
+            new_df = df.copy()
+            if price_values is not None:
+                # Prices parsed while scraping spare the anomaly screen from re-parsing them
+                new_df['price_numeric'] = price_values
+            
+            # Key every observation by its URL-derived product identity
+            product_index = ProductIndex()
+            new_df = product_index.assign(new_df)
+            if not historical_df.empty:
+                historical_df = product_index.ensure_keys(historical_df)
+            
+            # Keep scrape glitches and price outliers out of the history
+            new_df = self.screen_anomalies(new_df, historical_df).drop(columns='price_numeric', errors='ignore')
             
             # Append new data to historical data
             if historical_df.empty:
@@ -166,10 +203,138 @@ class DataExporter:
             
             # Save updated historical data
             historical_df.to_csv(historical_file, index=False)
+            product_index.save()
             self.logger.info(f"Updated historical data with {len(new_df)} new records")
             
         except Exception as e:
             self.logger.error(f"Error updating historical data: {str(e)}")
+            return None
+        
+        self.update_history_index(historical_df)
+        
+        if new_df.empty:
+            return historical_df
+        
+        self.update_rollups(new_df, historical_df)
+        self.update_series(new_df, historical_df)
+        self.update_matching_index(new_df)
+        self.evaluate_alerts(new_df)
+        return historical_df
+    
+    def screen_anomalies(self, new_df, historical_df):
+        config = get_config()
+        if not config.anomaly_detection.enabled:
+            return new_df
+        
+        detector = AnomalyDetector.from_config(config)
+        clean_df, anomalies = detector.split(new_df, historical_df)
+        if anomalies.empty:
+            return new_df
+        
+        if config.anomaly_detection.mode == 'flag':
+            # Keep the rows but mark them so readers can exclude them
+            new_df = new_df.copy()
+            new_df['anomaly'] = ''
+            new_df.loc[anomalies.index, 'anomaly'] = anomalies['anomaly']
+            self.logger.warning(f"Flagged {len(anomalies)} anomalous observations")
+            return new_df
+        
+        detector.quarantine(anomalies)
+        return clean_df
+    
+    def update_history_index(self, historical_df):
+        try:
+            HistoryIndex().build(historical_df)
+        except Exception as e:
+            self.logger.error(f"Error indexing historical data: {str(e)}")
+    
+    def update_rollups(self, new_df, historical_df):
+        try:
+            rollups = RollupStore()
+            if rollups.exists():
+                rollups.update(new_df)
+            else:
+                # First run with rollups: seed them from the full history once
+                rollups.rebuild(historical_df)
+        except Exception as e:
+            self.logger.error(f"Error updating rollups: {str(e)}")
+    
+    def update_series(self, new_df, historical_df):
+        try:
+            series = SeriesStore()
+            with SeriesStore.lock:
+                if series.exists():
+                    series.append(new_df)
+                else:
+                    # First run with the series store: seed it from the full history once
+                    series.rebuild(historical_df)
+        except Exception as e:
+            self.logger.error(f"Error updating price series: {str(e)}")
+    
+    def update_matching_index(self, new_df):
+        try:
+            ProductMatcher().add_products(new_df)
+        except Exception as e:
+            self.logger.error(f"Error updating matching index: {str(e)}")
+    
+    def evaluate_alerts(self, new_df):
+        try:
+            engine = AlertEngine.from_settings(get_config().settings)
+            if engine is None:
+                return
+            engine.process(new_df)
+        except Exception as e:
+            self.logger.error(f"Error evaluating price alerts: {str(e)}")
+
+
+class SnapshotStream:
+    """CSV and JSON snapshots appended per batch; Excel and Sheets need the whole run and are written on close"""
+    def __init__(self, exporter, formats):
+        self.exporter = exporter
+        self.formats = formats
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.csv_file = f"data/csv/products{exporter.suffix}_{self.timestamp}.csv"
+        self.json_file = f"data/json/products{exporter.suffix}_{self.timestamp}.json"
+        self.batch = RecordBatch()
+    
+    def write(self, batch):
+        first = len(self.batch) == 0
+        try:
+            if 'csv' in self.formats:
+                with_product_ids(batch.to_frame()).to_csv(self.csv_file, mode='w' if first else 'a', header=first, index=False)
+            if 'json' in self.formats:
+                # Same layout as json.dump(items, f, indent=4), one item at a time
+                with open(self.json_file, 'w' if first else 'a') as f:
+                    for item in batch.to_items():
+                        f.write("[\n" if first else ",\n")
+                        f.write(textwrap.indent(json.dumps(item, indent=4), "    "))
+                        first = False
+        except Exception as e:
+            self.exporter.logger.error(f"Error streaming snapshot: {str(e)}")
+        self.batch.extend(batch)
+    
+    def close(self):
+        """Finish the files, refresh the latest copies and write the whole-run exports"""
+        suffix = self.exporter.suffix
+        try:
+            if 'csv' in self.formats and self.batch:
+                shutil.copyfile(self.csv_file, f"data/csv/products_latest{suffix}.csv")
+                self.exporter.logger.info(f"Exported data to CSV: {self.csv_file}")
+                self.exporter.report_changes(self.csv_file)
+            if 'json' in self.formats and self.batch:
+                with open(self.json_file, 'a') as f:
+                    f.write("\n]")
+                shutil.copyfile(self.json_file, f"data/json/products_latest{suffix}.json")
+                self.exporter.logger.info(f"Exported data to JSON: {self.json_file}")
+        except Exception as e:
+            self.exporter.logger.error(f"Error finishing snapshot: {str(e)}")
+        
+        if not self.batch:
+            return
+        df = self.batch.to_frame()
+        if 'excel' in self.formats:
+            self.exporter.export_to_excel(df, self.timestamp)
+        self.exporter.update_google_sheets(df)
 
 if __name__ == "__main__":
     # Test the exporter
@@ -186,4 +351,4 @@ if __name__ == "__main__":
             'scraped_at': datetime.now().isoformat()
         }
     ]
-    exporter.export_data(sample_data)
\ No newline at end of file
+    exporter.export_data(sample_data)
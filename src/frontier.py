@@ -0,0 +1,136 @@
+"""
+Crawl frontier: URL deduplication within a run and freshness across runs.
+
+Every URL is reduced to its product identity (ASIN, eBay item ID, ... or the
+canonical URL with tracking parameters removed), so links that differ only
+in ref=/qid= noise or redirects count as the same page. Within a run each
+identity is admitted once: configured pages that repeat are not navigated
+to twice, and a search result already seen in the catalog or in another
+query is skipped before its fields are extracted. Across runs a persistent
+index of 64-bit identity hashes and last-fetch times skips product pages
+fetched within the freshness window. Search pages are always fetched, since
+their results change between runs.
+
+With the work queue, --enqueue plans the run, so configured pages are
+deduplicated across the whole run, but each --worker process keeps its own
+within-run set: a search result that two workers both come across is
+recorded by both.
+"""
+import os
+import json
+import time
+import logging
+from datetime import datetime
+
+from src.urls import extract_product_id, canonical_url
+from src.sharding import stable_hash
+
+
+class CrawlFrontier:
+    def __init__(self, index_file="data/frontier.npz", freshness_hours=6, stats_file="data/frontier_runs.jsonl"):
+        self.index_file = index_file
+        self.stats_file = stats_file
+        self.freshness_seconds = freshness_hours * 3600
+        self.logger = logging.getLogger(__name__)
+        self.keys, self.fetched_at = self.load()
+        self.run_keys = set()
+        self.fetched = {}
+        self.started_at = datetime.now()
+        self.counts = {'admitted': 0, 'duplicates': 0, 'fresh_skips': 0}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(index_file=config.frontier.index_file, freshness_hours=config.frontier.freshness_hours)
+
+    def load(self):
+        """Sorted identity hashes and their last-fetch times (epoch seconds); (None, None) without an index"""
+        if os.path.exists(self.index_file):
+            # NumPy is only loaded once there is an index, so planning a first run (--enqueue) stays light
+            import numpy as np
+            try:
+                with np.load(self.index_file) as data:
+                    return data['keys'], data['fetched_at']
+            except (OSError, ValueError, KeyError) as e:
+                self.logger.error(f"Error reading crawl frontier {self.index_file}: {str(e)}")
+        return None, None
+
+    def key(self, url, platform=None):
+        # Search pages have no product ID; they are deduplicated by canonical URL
+        return stable_hash(extract_product_id(url, platform) or f"url:{canonical_url(url)}")
+
+    def last_fetched(self, key):
+        if key in self.fetched:
+            return self.fetched[key]
+        if self.keys is None:
+            return None
+        import numpy as np
+        position = np.searchsorted(self.keys, np.uint64(key))
+        if position < len(self.keys) and self.keys[position] == key:
+            return int(self.fetched_at[position])
+        return None
+
+    def admit(self, url, platform=None, check_fresh=False):
+        """True the first time a page is offered in this run (and, with check_fresh, if it is stale)"""
+        key = self.key(url, platform)
+        if key in self.run_keys:
+            self.counts['duplicates'] += 1
+            self.logger.debug(f"Skipping duplicate {url}")
+            return False
+        self.run_keys.add(key)
+        if check_fresh:
+            fetched = self.last_fetched(key)
+            if fetched is not None and time.time() - fetched < self.freshness_seconds:
+                self.counts['fresh_skips'] += 1
+                self.logger.debug(f"Skipping {url}, fetched {(time.time() - fetched) / 3600:.1f}h ago")
+                return False
+        self.counts['admitted'] += 1
+        return True
+
+    def plan(self, product_urls, page_type):
+        """Filter {platform: [urls]} down to the pages this run should visit"""
+        planned = {}
+        for platform, urls in product_urls.items():
+            planned[platform] = [
+                url for url in urls
+                if self.admit(url, platform, check_fresh=page_type(url, platform) == "product")
+            ]
+        return {platform: urls for platform, urls in planned.items() if urls}
+
+    def mark_fetched(self, url, platform=None):
+        self.fetched[self.key(url, platform)] = int(time.time())
+
+    def save(self):
+        """Merge this run's fetches into the index, dropping entries past the freshness window"""
+        keys, fetched_at = self.load()
+        if keys is None and not self.fetched:
+            return
+        import numpy as np
+        if keys is None:
+            keys, fetched_at = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        if self.fetched:
+            keys = np.concatenate([keys, np.fromiter(self.fetched.keys(), dtype=np.uint64, count=len(self.fetched))])
+            fetched_at = np.concatenate([fetched_at, np.fromiter(self.fetched.values(), dtype=np.int64, count=len(self.fetched))])
+        # Latest fetch per key: sort by (key, time) and keep the last of each key
+        order = np.lexsort((fetched_at, keys))
+        keys, fetched_at = keys[order], fetched_at[order]
+        last = np.append(keys[1:] != keys[:-1], True) if len(keys) else np.empty(0, dtype=bool)
+        keep = last & (fetched_at >= int(time.time()) - self.freshness_seconds)
+        self.keys, self.fetched_at = keys[keep], fetched_at[keep]
+
+        os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+        tmp_file = f"{self.index_file}.tmp.npz"
+        np.savez(tmp_file, keys=self.keys, fetched_at=self.fetched_at)
+        os.replace(tmp_file, self.index_file)
+        self.fetched = {}
+
+    def finish_run(self):
+        """Persist the index and record this run's admission counts"""
+        self.save()
+        entry = {'started_at': self.started_at.isoformat(), **self.counts}
+        self.logger.info(
+            f"Crawl frontier: {self.counts['admitted']} admitted, {self.counts['duplicates']} duplicates, "
+            f"{self.counts['fresh_skips']} skipped as fresh"
+        )
+        os.makedirs(os.path.dirname(self.stats_file) or '.', exist_ok=True)
+        with open(self.stats_file, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,210 @@
+"""
+Byte-offset index over data/historical_data.csv for filtered reads.
+
+The index records where every CSV record starts and ends, together with its
+product_key, platform and scraped_at, sorted by (product_key, scraped_at).
+Queries resolve their filters against the index and then seek straight to
+the matching records, so reading one product's history touches only that
+product's bytes instead of parsing the whole file. The exporter rebuilds the
+index whenever it rewrites the history; a stale index is rebuilt on demand.
+"""
+import os
+import io
+import csv
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.identity import ProductIndex, UNIDENTIFIED_KEY
+
+SCAN_CHUNK_BYTES = 64 * 1024 * 1024
+# Adjacent records are read in one call, up to this many bytes at a time
+MAX_READ_BYTES = 4 * 1024 * 1024
+INDEX_COLUMNS = ['product_key', 'product_id', 'platform', 'title', 'url', 'scraped_at']
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+
+def record_offsets(path):
+    """Return (header_end, record_starts, record_ends) of a CSV file.
+
+    A newline ends a record only when it is outside quotes, i.e. when the
+    number of quote characters before it is even ("" escapes keep parity).
+    """
+    ends = []
+    quotes_before = 0
+    position = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(SCAN_CHUNK_BYTES)
+            if not chunk:
+                break
+            buf = np.frombuffer(chunk, dtype=np.uint8)
+            newlines = np.flatnonzero(buf == 10)
+            quotes = np.flatnonzero(buf == 34)
+            parity = (quotes_before + np.searchsorted(quotes, newlines)) % 2
+            ends.append(newlines[parity == 0] + position + 1)
+            quotes_before += len(quotes)
+            position += len(chunk)
+
+    ends = np.concatenate(ends) if ends else np.empty(0, dtype=np.int64)
+    if position and (len(ends) == 0 or ends[-1] != position):
+        # Last record without a trailing newline
+        ends = np.append(ends, position)
+    if len(ends) == 0:
+        return 0, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    ends = ends.astype(np.int64)
+    starts = np.concatenate([[0], ends[:-1]])
+    return int(ends[0]), starts[1:], ends[1:]
+
+
+class HistoryIndex:
+    def __init__(self, historical_file="data/historical_data.csv", index_file="data/history_index.npz"):
+        self.historical_file = historical_file
+        self.index_file = index_file
+        self.logger = logging.getLogger(__name__)
+        self.arrays = None
+
+    def build(self, df=None):
+        """Index the history file; pass the frame that was just written to skip re-reading it"""
+        header_end, starts, ends = record_offsets(self.historical_file)
+        if df is None or len(df) != len(starts):
+            df = pd.read_csv(self.historical_file, usecols=lambda column: column in INDEX_COLUMNS)
+        if len(df) != len(starts):
+            raise ValueError(f"{self.historical_file} has {len(starts)} records but {len(df)} rows")
+        if 'product_key' not in df.columns or 'product_id' not in df.columns:
+            df = ProductIndex().ensure_keys(df)
+
+        keys = df['product_key'].to_numpy(dtype=np.int64)
+        times = pd.to_datetime(df['scraped_at'], format='ISO8601').to_numpy(dtype='datetime64[ns]').view(np.int64)
+        platform_codes, platforms = pd.factorize(df['platform'].astype(str))
+        order = np.lexsort((times, keys))
+
+        # Lookup tables for resolving a product_id or exact title to its key
+        latest = df.iloc[order].drop_duplicates('product_key', keep='last')
+        latest = latest[latest['product_key'] != UNIDENTIFIED_KEY]
+        titled = latest[latest['title'].notna()]
+        with open(self.historical_file, 'rb') as f:
+            header = f.read(header_end)
+
+        self.arrays = {
+            'signature': file_signature(self.historical_file),
+            'header': np.frombuffer(header, dtype=np.uint8),
+            'starts': starts[order],
+            'ends': ends[order],
+            'keys': keys[order],
+            'times': times[order],
+            'platform_codes': platform_codes[order].astype(np.int32),
+            'platforms': np.array(platforms, dtype=str),
+            'product_ids': latest['product_id'].to_numpy(dtype=str),
+            'product_id_keys': latest['product_key'].to_numpy(dtype=np.int64),
+            'titles': titled['title'].to_numpy(dtype=str),
+            'title_keys': titled['product_key'].to_numpy(dtype=np.int64),
+        }
+
+        os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+        tmp_file = f"{self.index_file}.tmp.npz"
+        np.savez(tmp_file, **self.arrays)
+        os.replace(tmp_file, self.index_file)
+        self.logger.info(f"Indexed {len(starts)} history records for {len(latest)} products")
+
+    def load(self):
+        """Load the index, rebuilding it if the history file changed since it was written"""
+        if not os.path.exists(self.historical_file):
+            return False
+        if self.arrays is None and os.path.exists(self.index_file):
+            with np.load(self.index_file) as data:
+                self.arrays = {name: data[name] for name in data.files}
+        if self.arrays is None or not np.array_equal(self.arrays['signature'], file_signature(self.historical_file)):
+            self.logger.info("History index is missing or stale, rebuilding")
+            self.build()
+        return True
+
+    @property
+    def header(self):
+        return self.arrays['header'].tobytes()
+
+    def resolve(self, product):
+        """Map a product_key, product_id or exact title to a product_key"""
+        product = str(product)
+        keys = self.arrays['keys']
+        if product.isdigit():
+            position = np.searchsorted(keys, int(product))
+            if position < len(keys) and keys[position] == int(product):
+                return int(product)
+        for names, name_keys in (('product_ids', 'product_id_keys'), ('titles', 'title_keys')):
+            matches = np.flatnonzero(self.arrays[names] == product)
+            if len(matches):
+                return int(self.arrays[name_keys][matches[-1]])
+        return None
+
+    def select(self, product=None, platform=None, since=None, until=None):
+        """Positions (into the sorted index) of the records matching every filter"""
+        keys = self.arrays['keys']
+        times = self.arrays['times']
+        since = pd.Timestamp(since).value if since is not None else None
+        until = pd.Timestamp(until).value if until is not None else None
+
+        if product is not None:
+            product_key = self.resolve(product)
+            if product_key is None:
+                return np.empty(0, dtype=np.int64)
+            low, high = np.searchsorted(keys, [product_key, product_key + 1])
+            # Within one product the index is sorted by time, so the range is a binary search too
+            if since is not None:
+                low += np.searchsorted(times[low:high], since, side='left')
+            if until is not None:
+                high = low + np.searchsorted(times[low:high], until, side='right')
+            positions = np.arange(low, high)
+        else:
+            mask = np.ones(len(keys), dtype=bool)
+            if since is not None:
+                mask &= times >= since
+            if until is not None:
+                mask &= times <= until
+            positions = np.flatnonzero(mask)
+
+        if platform is not None:
+            codes = np.flatnonzero(self.arrays['platforms'] == platform)
+            if len(codes) == 0:
+                return np.empty(0, dtype=np.int64)
+            positions = positions[self.arrays['platform_codes'][positions] == codes[0]]
+        return positions
+
+    def read(self, positions):
+        """Yield the raw CSV bytes of the selected records, in file order"""
+        starts = np.sort(self.arrays['starts'][positions])
+        ends = np.sort(self.arrays['ends'][positions])
+        if len(starts) == 0:
+            return
+        # Coalesce records that sit next to each other in the file into one read,
+        # splitting long runs so a broad query still streams in bounded pieces
+        segment = np.concatenate([[0], np.cumsum(starts[1:] != ends[:-1])])
+        segment_start = starts[np.searchsorted(segment, segment)]
+        piece = (starts - segment_start) // MAX_READ_BYTES
+        breaks = np.flatnonzero((segment[1:] != segment[:-1]) | (piece[1:] != piece[:-1])) + 1
+        run_starts = starts[np.concatenate([[0], breaks])]
+        run_ends = ends[np.concatenate([breaks - 1, [len(ends) - 1]])]
+        with open(self.historical_file, 'rb') as f:
+            for start, end in zip(run_starts, run_ends):
+                f.seek(start)
+                yield f.read(end - start)
+
+    def query(self, product=None, platform=None, since=None, until=None):
+        """Yield raw CSV bytes of the matching observations"""
+        if not self.load():
+            return
+        yield from self.read(self.select(product, platform, since, until))
+
+    def query_records(self, product=None, platform=None, since=None, until=None):
+        """Yield matching observations as dicts keyed by the CSV header"""
+        if not self.load():
+            return
+        columns = next(csv.reader(io.StringIO(self.header.decode('utf-8'))))
+        for blob in self.read(self.select(product, platform, since, until)):
+            for row in csv.reader(io.StringIO(blob.decode('utf-8'), newline='')):
+                yield dict(zip(columns, row))
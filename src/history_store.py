@@ -0,0 +1,125 @@
+"""
+Indexed, read-only view over data/historical_data.csv.
+
+The history is loaded once, sorted by (product_key, scraped_at), and indexed
+so a single product's observations are a contiguous slice. The store reloads
+itself when the file changes on disk (a new export landed) and bumps its
+`generation` so callers can invalidate derived caches.
+"""
+import os
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.identity import ProductIndex, UNIDENTIFIED_KEY
+from src.rollups import parse_price_series
+
+HISTORY_COLUMNS = ['product_key', 'product_id', 'platform', 'title', 'price', 'price_numeric',
+                   'discount', 'rating', 'reviews', 'url', 'scraped_at']
+
+
+class HistoryStore:
+    def __init__(self, historical_file="data/historical_data.csv"):
+        self.historical_file = historical_file
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.file_signature = None
+        self.df = pd.DataFrame(columns=HISTORY_COLUMNS)
+        self.slices = {}
+        self.product_ids = {}
+        self.titles = {}
+        self.latest = pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    def refresh(self):
+        """Reload when the history file changed; returns the current generation"""
+        try:
+            stat = os.stat(self.historical_file)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+
+        if signature == self.file_signature:
+            return self.generation
+
+        with self.lock:
+            if signature != self.file_signature:
+                self.load(signature)
+        return self.generation
+
+    def load(self, signature):
+        if signature is None:
+            df = pd.DataFrame(columns=HISTORY_COLUMNS)
+        else:
+            df = pd.read_csv(self.historical_file)
+            df['scraped_at'] = pd.to_datetime(df['scraped_at'], format='ISO8601')
+            # Only history written before the identity index lacks keys; they are derived in memory and
+            # not saved, since the index file belongs to the exporter and this view never writes
+            df = ProductIndex().ensure_keys(df)
+            # Rows without a product identity aren't one product and can't be queried
+            df = df[df['product_key'] != UNIDENTIFIED_KEY]
+            if 'anomaly' in df.columns:
+                df = df[df['anomaly'].fillna('') == '']
+            df['price_numeric'] = parse_price_series(df['price'])
+            df = df[HISTORY_COLUMNS].sort_values(['product_key', 'scraped_at'], kind='stable').reset_index(drop=True)
+
+        self.df = df
+        self.slices = {}
+        self.product_ids = {}
+        self.titles = {}
+        self.latest = df
+        if not df.empty:
+            keys = df['product_key'].to_numpy()
+            boundaries = np.flatnonzero(np.diff(keys)) + 1
+            starts = np.concatenate([[0], boundaries])
+            ends = np.concatenate([boundaries, [len(keys)]])
+            self.slices = {int(keys[start]): (int(start), int(end)) for start, end in zip(starts, ends)}
+            self.product_ids = dict(zip(df['product_id'].iloc[starts], keys[starts].tolist()))
+            self.latest = df.iloc[ends - 1]
+            self.titles = dict(zip(self.latest['title'], self.latest['product_key'].tolist()))
+        self.file_signature = signature
+        self.generation += 1
+        self.logger.info(f"Loaded {len(df)} observations for {len(self.slices)} products (generation {self.generation})")
+
+    def resolve(self, product):
+        """Map a product_key, product_id or exact title to a product_key"""
+        product = str(product)
+        if product.isdigit() and int(product) in self.slices:
+            return int(product)
+        if product in self.product_ids:
+            return int(self.product_ids[product])
+        if product in self.titles:
+            return int(self.titles[product])
+        return None
+
+    def history(self, product_key, since=None, until=None):
+        bounds = self.slices.get(product_key)
+        if bounds is None:
+            return self.df.iloc[0:0]
+        rows = self.df.iloc[bounds[0]:bounds[1]]
+        # Rows within a product are sorted by time, so a binary search bounds the range
+        times = rows['scraped_at'].to_numpy()
+        start = np.searchsorted(times, np.datetime64(since), side='left') if since is not None else 0
+        end = np.searchsorted(times, np.datetime64(until), side='right') if until is not None else len(rows)
+        return rows.iloc[start:end]
+
+    def latest_for(self, product_key):
+        bounds = self.slices.get(product_key)
+        if bounds is None:
+            return None
+        return self.df.iloc[bounds[1] - 1:bounds[1]]
+
+    def platform_summary(self):
+        latest = self.latest
+        summary = latest.groupby('platform').agg(
+            products=('product_key', 'size'),
+            priced_products=('price_numeric', 'count'),
+            avg_price=('price_numeric', 'mean'),
+            min_price=('price_numeric', 'min'),
+            max_price=('price_numeric', 'max'),
+            last_scraped_at=('scraped_at', 'max'),
+        )
+        observations = self.df.groupby('platform').size().rename('observations')
+        return summary.join(observations).reset_index()
@@ -0,0 +1,341 @@
+"""
+Self-contained interactive HTML dashboard.
+
+Long series are downsampled server-side (LTTB for lines, 2-D binning for the
+rating/review scatter) so the page stays responsive with very large
+histories. Per-product series are split into compact shards that the page
+loads lazily with <script> tags, which also works from file:// URLs. No
+external CDN or library is used.
+"""
+import os
+import json
+import math
+import shutil
+import zlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.identity import UNIDENTIFIED_KEY, display_title
+
+# Maximum points kept per line after downsampling
+TREND_POINTS = 500
+PRODUCT_POINTS = 300
+# Products per lazily loaded shard file
+PRODUCTS_PER_SHARD = 500
+SCATTER_BINS = 40
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling. Returns the kept indices."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    a = 0
+
+    for i in range(threshold - 2):
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        range_start = int(math.floor(i * every)) + 1
+        range_end = int(math.floor((i + 1) * every)) + 1
+        area = np.abs(
+            (x[a] - avg_x) * (y[range_start:range_end] - y[a])
+            - (x[a] - x[range_start:range_end]) * (avg_y - y[a])
+        )
+        a = range_start + int(np.argmax(area))
+        indices[i + 1] = a
+
+    indices[-1] = n - 1
+    return indices
+
+
+def compact_series(dates, prices, threshold):
+    """Drop missing prices, downsample, and encode as delta-coded epoch seconds"""
+    dates = np.asarray(dates, dtype='datetime64[s]').astype(np.int64)
+    prices = np.asarray(prices, dtype=float)
+    valid = ~np.isnan(prices)
+    dates, prices = dates[valid], prices[valid]
+    if len(dates) == 0:
+        return [[], []]
+
+    keep = lttb(dates, prices, threshold)
+    dates, prices = dates[keep], prices[keep]
+    deltas = np.diff(dates, prepend=0)
+    return [deltas.tolist(), np.round(prices, 2).tolist()]
+
+
+def shard_for(key, shard_count):
+    return zlib.crc32(str(key).encode('utf-8')) % shard_count
+
+
+class HtmlDashboardBuilder:
+    def __init__(self, output_dir="data/dashboard"):
+        self.output_dir = output_dir
+        self.shard_dir = os.path.join(output_dir, 'shards')
+        self.logger = logging.getLogger(__name__)
+
+    def build(self, df, key_column='product_key'):
+        """Write index.html, products.js and per-product shards from a history frame"""
+        if os.path.exists(self.shard_dir):
+            shutil.rmtree(self.shard_dir)
+        os.makedirs(self.shard_dir, exist_ok=True)
+
+        df = df.sort_values('scraped_at', kind='stable')
+        summary = self.build_summary(df)
+        product_count, shard_count = self.write_product_shards(df, key_column)
+        summary['products'] = product_count
+        summary['shards'] = shard_count
+
+        index_file = os.path.join(self.output_dir, 'index.html')
+        with open(index_file, 'w', encoding='utf-8') as f:
+            f.write(HTML_TEMPLATE.replace('__SUMMARY__', json.dumps(summary, separators=(',', ':'))))
+
+        self.logger.info(
+            f"Generated HTML dashboard {index_file} "
+            f"({product_count} products in {shard_count} shards)"
+        )
+        return index_file
+
+    def build_summary(self, df):
+        trends = {}
+        for platform, platform_data in df.groupby('platform', sort=True):
+            avg_prices = platform_data.groupby('scraped_at')['price_numeric'].mean().dropna()
+            trends[str(platform)] = compact_series(avg_prices.index, avg_prices.values, TREND_POINTS)
+
+        platform_counts = df['platform'].value_counts()
+
+        # The raw scatter is replaced by a fixed-size 2-D density grid
+        ratings = pd.to_numeric(df['rating'], errors='coerce').to_numpy(dtype=float)
+        reviews = pd.to_numeric(df['reviews'], errors='coerce').to_numpy(dtype=float)
+        valid = ~(np.isnan(ratings) | np.isnan(reviews))
+        scatter = {'counts': [], 'x': [], 'y': []}
+        if valid.any():
+            counts, x_edges, y_edges = np.histogram2d(
+                ratings[valid], np.log10(reviews[valid] + 1), bins=SCATTER_BINS
+            )
+            scatter = {
+                'counts': counts.astype(int).tolist(),
+                'x': np.round(x_edges, 3).tolist(),
+                'y': np.round(y_edges, 3).tolist(),
+            }
+
+        discounts = df['discount'].apply(lambda x: float(x.strip('%')) if '%' in str(x) else 0)
+        discount_counts, discount_edges = np.histogram(discounts, bins=20)
+
+        return {
+            'trends': trends,
+            'platform_counts': {str(k): int(v) for k, v in platform_counts.items()},
+            'scatter': scatter,
+            'discounts': {
+                'counts': discount_counts.tolist(),
+                'edges': np.round(discount_edges, 2).tolist(),
+            },
+        }
+
+    def write_product_shards(self, df, key_column):
+        groups = [
+            (key, product_data) for key, product_data in df.groupby(key_column, sort=False)
+            if key != UNIDENTIFIED_KEY and product_data['price_numeric'].notna().any()
+        ]
+        shard_count = max(1, math.ceil(len(groups) / PRODUCTS_PER_SHARD))
+        shards = [dict() for _ in range(shard_count)]
+        catalog = []
+
+        for key, product_data in groups:
+            shard = shard_for(key, shard_count)
+            shards[shard][str(key)] = compact_series(
+                product_data['scraped_at'].to_numpy(),
+                product_data['price_numeric'].to_numpy(dtype=float, na_value=float('nan')),
+                PRODUCT_POINTS,
+            )
+            catalog.append([
+                str(key),
+                display_title(product_data),
+                str(product_data['platform'].iloc[-1]),
+                shard,
+            ])
+
+        for shard, series in enumerate(shards):
+            with open(os.path.join(self.shard_dir, f'shard_{shard:04d}.js'), 'w', encoding='utf-8') as f:
+                f.write(f"dashboardShard({shard},{json.dumps(series, separators=(',', ':'))});\n")
+
+        with open(os.path.join(self.output_dir, 'products.js'), 'w', encoding='utf-8') as f:
+            f.write(f"dashboardCatalog({json.dumps(catalog, separators=(',', ':'))});\n")
+
+        return len(catalog), shard_count
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>E-commerce Price Tracker Dashboard</title>
+<style>
+body { font-family: sans-serif; margin: 16px; color: #222; }
+.grid { display: grid; grid-template-columns: 1fr 1fr; gap: 16px; }
+.panel { border: 1px solid #ddd; border-radius: 4px; padding: 8px; }
+.panel h2 { font-size: 15px; margin: 0 0 6px; }
+svg { width: 100%; height: 280px; }
+#results { max-height: 240px; overflow-y: auto; font-size: 13px; }
+#results div { cursor: pointer; padding: 2px 4px; }
+#results div:hover { background: #eef; }
+input { width: 100%; padding: 4px; box-sizing: border-box; }
+.legend span { margin-right: 12px; font-size: 12px; }
+</style>
+</head>
+<body>
+<h1>E-commerce Price Tracker</h1>
+<div class="grid">
+  <div class="panel"><h2>Price Trends by Platform</h2><svg id="trends"></svg><div class="legend" id="trend-legend"></div></div>
+  <div class="panel"><h2>Products by Platform</h2><svg id="platforms"></svg></div>
+  <div class="panel"><h2>Rating vs Reviews (density, log10 reviews)</h2><svg id="scatter"></svg></div>
+  <div class="panel"><h2>Discount Distribution</h2><svg id="discounts"></svg></div>
+  <div class="panel"><h2>Product Search</h2><input id="search" placeholder="Loading catalog..." disabled><div id="results"></div></div>
+  <div class="panel"><h2 id="product-title">Product Price History</h2><svg id="product"></svg></div>
+</div>
+<script>
+var SUMMARY = __SUMMARY__;
+var COLORS = ['#e6194b', '#3cb44b', '#4363d8', '#f58231', '#911eb4', '#42d4f4', '#f032e6', '#9a6324'];
+var NS = 'http://www.w3.org/2000/svg';
+var W = 600, H = 280, PAD = 40;
+
+function el(svg, name, attrs, text) {
+  var node = document.createElementNS(NS, name);
+  for (var k in attrs) node.setAttribute(k, attrs[k]);
+  if (text !== undefined) node.textContent = text;
+  svg.appendChild(node);
+  return node;
+}
+function prepare(id) {
+  var svg = document.getElementById(id);
+  while (svg.firstChild) svg.removeChild(svg.firstChild);
+  svg.setAttribute('viewBox', '0 0 ' + W + ' ' + H);
+  return svg;
+}
+function decode(series) {
+  var t = 0, out = [];
+  for (var i = 0; i < series[0].length; i++) { t += series[0][i]; out.push([t * 1000, series[1][i]]); }
+  return out;
+}
+function extent(values) {
+  var lo = Infinity, hi = -Infinity;
+  values.forEach(function (v) { if (v < lo) lo = v; if (v > hi) hi = v; });
+  if (lo === hi) { lo -= 1; hi += 1; }
+  return [lo, hi];
+}
+function axes(svg, xr, yr, xfmt) {
+  el(svg, 'line', {x1: PAD, y1: H - PAD, x2: W - 10, y2: H - PAD, stroke: '#999'});
+  el(svg, 'line', {x1: PAD, y1: 10, x2: PAD, y2: H - PAD, stroke: '#999'});
+  el(svg, 'text', {x: PAD, y: H - PAD + 16, 'font-size': 11}, xfmt(xr[0]));
+  el(svg, 'text', {x: W - 10, y: H - PAD + 16, 'font-size': 11, 'text-anchor': 'end'}, xfmt(xr[1]));
+  el(svg, 'text', {x: PAD - 4, y: H - PAD, 'font-size': 11, 'text-anchor': 'end'}, yr[0].toFixed(1));
+  el(svg, 'text', {x: PAD - 4, y: 16, 'font-size': 11, 'text-anchor': 'end'}, yr[1].toFixed(1));
+}
+function dateFmt(v) { return new Date(v).toISOString().slice(0, 10); }
+function lineChart(id, named) {
+  var svg = prepare(id), xs = [], ys = [];
+  named.forEach(function (s) { s.points.forEach(function (p) { xs.push(p[0]); ys.push(p[1]); }); });
+  if (!xs.length) { el(svg, 'text', {x: W / 2, y: H / 2, 'text-anchor': 'middle'}, 'No data'); return; }
+  var xr = extent(xs), yr = extent(ys);
+  var sx = function (v) { return PAD + (v - xr[0]) / (xr[1] - xr[0]) * (W - PAD - 10); };
+  var sy = function (v) { return H - PAD - (v - yr[0]) / (yr[1] - yr[0]) * (H - PAD - 10); };
+  axes(svg, xr, yr, dateFmt);
+  named.forEach(function (s, i) {
+    var d = s.points.map(function (p, j) { return (j ? 'L' : 'M') + sx(p[0]).toFixed(1) + ',' + sy(p[1]).toFixed(1); }).join('');
+    el(svg, 'path', {d: d, fill: 'none', stroke: COLORS[i % COLORS.length], 'stroke-width': 1.5});
+  });
+}
+function barChart(id, labels, values) {
+  var svg = prepare(id), max = Math.max.apply(null, values.concat([1]));
+  var bw = (W - PAD - 10) / Math.max(values.length, 1);
+  values.forEach(function (v, i) {
+    var h = v / max * (H - PAD - 10);
+    el(svg, 'rect', {x: PAD + i * bw + 1, y: H - PAD - h, width: Math.max(bw - 2, 1), height: h, fill: COLORS[2]});
+    if (labels) el(svg, 'text', {x: PAD + (i + 0.5) * bw, y: H - PAD + 14, 'font-size': 10, 'text-anchor': 'middle'}, labels[i]);
+  });
+  axes(svg, [0, 0], [0, max], function () { return ''; });
+}
+function heatmap(id, grid) {
+  var svg = prepare(id);
+  if (!grid.counts.length) { el(svg, 'text', {x: W / 2, y: H / 2, 'text-anchor': 'middle'}, 'No data'); return; }
+  var nx = grid.counts.length, ny = grid.counts[0].length, max = 0;
+  grid.counts.forEach(function (row) { row.forEach(function (c) { if (c > max) max = c; }); });
+  var cw = (W - PAD - 10) / nx, ch = (H - PAD - 10) / ny;
+  grid.counts.forEach(function (row, i) {
+    row.forEach(function (c, j) {
+      if (!c) return;
+      var a = 0.15 + 0.85 * Math.log(1 + c) / Math.log(1 + max);
+      el(svg, 'rect', {x: PAD + i * cw, y: H - PAD - (j + 1) * ch, width: cw, height: ch, fill: COLORS[2], 'fill-opacity': a.toFixed(2)});
+    });
+  });
+  axes(svg, [grid.x[0], grid.x[nx]], [grid.y[0], grid.y[ny]], function (v) { return v.toFixed(1); });
+}
+
+var catalog = [], shards = {}, pending = {};
+function loadScript(src) { var s = document.createElement('script'); s.src = src; document.body.appendChild(s); }
+function dashboardCatalog(rows) {
+  catalog = rows;
+  var input = document.getElementById('search');
+  input.disabled = false;
+  input.placeholder = 'Search ' + rows.length + ' products...';
+  search('');
+}
+function dashboardShard(id, data) {
+  shards[id] = data;
+  (pending[id] || []).forEach(function (fn) { fn(data); });
+  delete pending[id];
+}
+function withShard(id, fn) {
+  if (shards[id]) { fn(shards[id]); return; }
+  if (!pending[id]) { pending[id] = []; loadScript('shards/shard_' + ('000' + id).slice(-4) + '.js'); }
+  pending[id].push(fn);
+}
+function showProduct(row) {
+  document.getElementById('product-title').textContent = row[1].slice(0, 80) + ' (' + row[2] + ')';
+  withShard(row[3], function (data) { lineChart('product', [{points: decode(data[row[0]] || [[], []])}]); });
+}
+function search(query) {
+  var q = query.toLowerCase(), box = document.getElementById('results'), shown = 0;
+  box.innerHTML = '';
+  for (var i = 0; i < catalog.length && shown < 200; i++) {
+    if (q && catalog[i][1].toLowerCase().indexOf(q) < 0) continue;
+    var div = document.createElement('div');
+    div.textContent = '[' + catalog[i][2] + '] ' + catalog[i][1];
+    div.onclick = showProduct.bind(null, catalog[i]);
+    box.appendChild(div);
+    shown++;
+  }
+}
+
+var trendSeries = [], legend = document.getElementById('trend-legend');
+Object.keys(SUMMARY.trends).forEach(function (platform, i) {
+  trendSeries.push({points: decode(SUMMARY.trends[platform])});
+  var span = document.createElement('span');
+  span.style.color = COLORS[i % COLORS.length];
+  span.textContent = platform;
+  legend.appendChild(span);
+});
+lineChart('trends', trendSeries);
+barChart('platforms', Object.keys(SUMMARY.platform_counts), Object.values(SUMMARY.platform_counts));
+heatmap('scatter', SUMMARY.scatter);
+barChart('discounts', null, SUMMARY.discounts.counts);
+var timer;
+document.getElementById('search').addEventListener('input', function (e) {
+  clearTimeout(timer);
+  timer = setTimeout(search.bind(null, e.target.value), 150);
+});
+loadScript('products.js');
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,96 @@
+"""
+Product identity derived from URLs.
+
+Every observation gets a stable product ID extracted from its URL (see
+src/urls.py) and a compact integer `product_key` assigned by a persistent
+index, so history can be grouped and joined on keys instead of free-text
+titles. Rows whose URL carries no product ID (search pages, Not Found rows)
+share UNIDENTIFIED_KEY; they stay out of the index and out of per-product
+views (latest prices, series, alerts, matching).
+"""
+import os
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.urls import canonical_url, extract_product_id
+
+# product_key of rows without a product identity; never stored in the index
+UNIDENTIFIED_KEY = -1
+
+
+def display_title(product_data):
+    """Most recent real title of one product's observations, else its product ID"""
+    titles = product_data['title']
+    titles = titles[titles.notna() & (titles != "Not Found")]
+    if not titles.empty:
+        return str(titles.iloc[-1])
+    return str(product_data['product_id'].iloc[-1])
+
+
+class ProductIndex:
+    def __init__(self, index_file="data/product_index.csv"):
+        self.index_file = index_file
+        self.logger = logging.getLogger(__name__)
+        self.keys = {}
+        self.rows = []
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_file):
+            return
+        index_df = pd.read_csv(self.index_file, dtype={'product_key': np.int64, 'product_id': str})
+        self.rows = index_df.to_dict('records')
+        self.keys = dict(zip(index_df['product_id'], index_df['product_key']))
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+        tmp_file = f"{self.index_file}.tmp"
+        pd.DataFrame(self.rows, columns=['product_key', 'product_id', 'platform', 'canonical_url', 'first_seen']) \
+            .to_csv(tmp_file, index=False)
+        os.replace(tmp_file, self.index_file)
+        self.dirty = False
+
+    def key_for(self, product_id, platform=None, url=None):
+        key = self.keys.get(product_id)
+        if key is None:
+            key = len(self.rows)
+            self.keys[product_id] = key
+            self.rows.append({
+                'product_key': key,
+                'product_id': product_id,
+                'platform': platform,
+                'canonical_url': canonical_url(url) if url else None,
+                'first_seen': datetime.now().isoformat(),
+            })
+            self.dirty = True
+        return key
+
+    def assign(self, df):
+        """Add product_id and integer product_key columns to a frame with url/platform columns"""
+        df = df.copy()
+        urls = df['url'].where(df['url'].notna(), '').astype(str)
+        platforms = df['platform'].astype(str)
+        # History repeats the same URLs every run, so resolve each distinct pair once
+        codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([urls, platforms]))
+        ids = np.empty(len(pairs), dtype=object)
+        keys = np.full(len(pairs), UNIDENTIFIED_KEY, dtype=np.int64)
+        for i, (url, platform) in enumerate(pairs):
+            ids[i] = extract_product_id(url, platform)
+            if ids[i] is not None:
+                keys[i] = self.key_for(ids[i], platform, url)
+        df['product_id'] = ids[codes]
+        df['product_key'] = keys[codes]
+        return df
+
+    def ensure_keys(self, df):
+        """Fill product keys for rows that predate the identity index"""
+        if 'product_key' in df.columns and df['product_key'].notna().all():
+            df['product_key'] = df['product_key'].astype(np.int64)
+            return df
+        return self.assign(df)
@@ -0,0 +1,220 @@
+"""
+Timer-driven job runner for scheduled scraping.
+
+Due times live in a heap and the runner sleeps until the earliest one, so
+there is no minute polling. Each run happens in its own worker process,
+supervised by a thread that enforces a hard timeout, and a single-flight
+lock (per process and, where fcntl exists, across processes) skips a tick
+while the previous run is still going. Every run, skip and timeout is
+appended to a JSON-lines job history.
+"""
+import os
+import json
+import heapq
+import signal
+import logging
+import itertools
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+
+def interval_trigger(seconds):
+    """Next due time every `seconds` after the previous one"""
+    return lambda after: after + timedelta(seconds=seconds)
+
+
+def daily_trigger(time_str):
+    """Next due time at HH:MM local time"""
+    hour, minute = (int(part) for part in time_str.split(':'))
+
+    def next_run(after):
+        candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if candidate <= after:
+            candidate += timedelta(days=1)
+        return candidate
+    return next_run
+
+
+def run_in_session(target):
+    """Child entry point: lead a new process group so a timeout also kills browsers it started"""
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    target()
+
+
+class Job:
+    def __init__(self, name, target, trigger, timeout_seconds):
+        self.name = name
+        self.target = target
+        self.trigger = trigger
+        self.timeout_seconds = timeout_seconds
+        self.lock = threading.Lock()
+
+
+class JobRunner:
+    def __init__(self, history_file="data/job_history.jsonl", lock_dir="data"):
+        self.history_file = history_file
+        self.lock_dir = lock_dir
+        self.logger = logging.getLogger(__name__)
+        self.heap = []
+        self.counter = itertools.count()
+        self.heap_lock = threading.Lock()
+        self.history_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.workers = []
+        # spawn avoids forking a process that already runs supervisor threads
+        self.context = multiprocessing.get_context('spawn')
+
+    def add_job(self, name, target, trigger, timeout_seconds, run_now=False):
+        """Register a picklable, module-level `target` to run whenever `trigger` says it is due"""
+        job = Job(name, target, trigger, timeout_seconds)
+        now = datetime.now()
+        self.push(now if run_now else trigger(now), job)
+        return job
+
+    def run_once(self, name, target, timeout_seconds):
+        """Run `target` immediately under the same locking and timeout, and wait for it"""
+        started = self.submit(Job(name, target, None, timeout_seconds))
+        self.join()
+        return started
+
+    def push(self, due, job):
+        with self.heap_lock:
+            heapq.heappush(self.heap, (due, next(self.counter), job))
+        self.wakeup.set()
+
+    def reschedule(self, job):
+        """Recompute a job's next due time, e.g. after its trigger changed"""
+        with self.heap_lock:
+            self.heap = [entry for entry in self.heap if entry[2] is not job]
+            heapq.heapify(self.heap)
+        self.push(job.trigger(datetime.now()), job)
+
+    def run_forever(self):
+        """Dispatch due jobs until stop() is called"""
+        while not self.stopped.is_set():
+            with self.heap_lock:
+                due = self.heap[0][0] if self.heap else None
+            delay = None if due is None else (due - datetime.now()).total_seconds()
+            if delay is None or delay > 0:
+                self.wakeup.wait(delay)
+                self.wakeup.clear()
+                continue
+
+            with self.heap_lock:
+                due, _, job = heapq.heappop(self.heap)
+            self.submit(job)
+            # Schedule from the due time so runs don't drift, but never into the past
+            now = datetime.now()
+            next_due = job.trigger(due)
+            if next_due <= now:
+                next_due = job.trigger(now)
+            self.push(next_due, job)
+        self.join()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+    def join(self):
+        for worker in self.workers:
+            worker.join()
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+
+    def submit(self, job):
+        """Start a run unless one is already in flight; returns whether it started"""
+        if not job.lock.acquire(blocking=False):
+            self.skip(job, "previous run still in progress")
+            return False
+        lock_file = self.acquire_file_lock(job)
+        if lock_file is False:
+            job.lock.release()
+            self.skip(job, "another scheduler is running this job")
+            return False
+
+        worker = threading.Thread(target=self.supervise, args=(job, lock_file), name=f"job-{job.name}", daemon=True)
+        self.workers = [w for w in self.workers if w.is_alive()] + [worker]
+        worker.start()
+        return True
+
+    def acquire_file_lock(self, job):
+        """Hold an exclusive flock for the run; None where flock is unavailable, False if taken"""
+        if fcntl is None:
+            return None
+        os.makedirs(self.lock_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.lock_dir, f"{job.name}.lock"), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        return lock_file
+
+    def supervise(self, job, lock_file):
+        started = datetime.now()
+        status, error = 'success', None
+        try:
+            self.logger.info(f"Starting job {job.name}")
+            process = self.context.Process(target=run_in_session, args=(job.target,), name=job.name)
+            process.start()
+            process.join(job.timeout_seconds)
+            if process.is_alive():
+                status, error = 'timeout', f"exceeded {job.timeout_seconds}s"
+                self.terminate(process)
+            elif process.exitcode != 0:
+                status, error = 'failed', f"exit code {process.exitcode}"
+        except Exception as e:
+            status, error = 'failed', str(e)
+        finally:
+            if lock_file:
+                lock_file.close()
+            job.lock.release()
+
+        duration = (datetime.now() - started).total_seconds()
+        log = self.logger.info if status == 'success' else self.logger.error
+        log(f"Job {job.name} finished with status {status} in {duration:.1f}s" + (f": {error}" if error else ""))
+        self.record(job, status, started, duration, error)
+
+    def terminate(self, process):
+        """Kill the run's whole process group, escalating from SIGTERM to SIGKILL"""
+        if not hasattr(os, 'killpg'):
+            process.terminate()
+            process.join(10)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            return
+        # Signal the group even after the leader exits, so stray browser processes go too
+        for sig, grace in ((signal.SIGTERM, 10), (signal.SIGKILL, 5)):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            process.join(grace)
+
+    def skip(self, job, reason):
+        self.logger.warning(f"Skipping job {job.name}: {reason}")
+        self.record(job, 'skipped', datetime.now(), 0.0, reason)
+
+    def record(self, job, status, started, duration, error=None):
+        entry = {
+            'job': job.name,
+            'status': status,
+            'started_at': started.isoformat(),
+            'duration_seconds': round(duration, 3),
+            'error': error,
+        }
+        try:
+            with self.history_lock:
+                os.makedirs(os.path.dirname(self.history_file) or '.', exist_ok=True)
+                with open(self.history_file, 'a') as f:
+                    f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            self.logger.error(f"Error writing job history: {str(e)}")
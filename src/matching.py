@@ -0,0 +1,223 @@
+"""
+Cross-platform product matching with MinHash signatures and LSH banding.
+
+Each product title is normalized into word shingles and summarized by a
+MinHash signature. Signatures are split into bands; products that collide in
+any band become candidate pairs, so matching never compares all pairs.
+Candidates are verified with the estimated Jaccard similarity and grouped
+with union-find into "same product" clusters.
+"""
+import os
+import re
+import zlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.identity import UNIDENTIFIED_KEY
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+MIN_SIMILARITY = 0.7
+# Buckets larger than this come from very generic titles and would explode pair counts
+MAX_BUCKET_SIZE = 50
+# Model numbers (e.g. "g502", "rtx4060") identify a product far better than generic words
+MODEL_TOKEN_WEIGHT = 3
+MERSENNE_PRIME = (1 << 31) - 1
+
+STOPWORDS = {
+    'a', 'an', 'and', 'the', 'for', 'with', 'of', 'in', 'on', 'to', 'by', 'new', 'free',
+    'shipping', 'sale', 'hot', 'original', 'official', 'brand', 'genuine', 'edition', 'pc',
+}
+
+_rng = np.random.RandomState(1)
+PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+
+
+def normalize_title(title):
+    """Lowercase, strip punctuation and marketing noise, return the token list"""
+    if not isinstance(title, str) or title == "Not Found":
+        return []
+    tokens = re.findall(r'[a-z0-9]+', title.lower())
+    return [token for token in tokens if token not in STOPWORDS]
+
+
+def is_model_token(token):
+    has_digit = any(c.isdigit() for c in token)
+    return (has_digit and any(c.isalpha() for c in token)) or (token.isdigit() and len(token) >= 3)
+
+
+def shingles(tokens):
+    """Hash word unigrams, bigrams and weighted model tokens to 31-bit integers"""
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for token in tokens:
+        if is_model_token(token):
+            grams.extend(f"#{i}#{token}" for i in range(1, MODEL_TOKEN_WEIGHT))
+    return np.array(
+        sorted({zlib.crc32(gram.encode('utf-8')) & MERSENNE_PRIME for gram in grams}),
+        dtype=np.uint64,
+    )
+
+
+def minhash(shingle_hashes):
+    if len(shingle_hashes) == 0:
+        return np.full(NUM_PERM, MERSENNE_PRIME, dtype=np.uint32)
+    hashed = (PERM_A[:, None] * shingle_hashes[None, :] + PERM_B[:, None]) % MERSENNE_PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+class ProductMatcher:
+    def __init__(self, index_dir="data/matching"):
+        self.index_dir = index_dir
+        self.signature_file = os.path.join(index_dir, 'signatures.npz')
+        self.products_file = os.path.join(index_dir, 'products.csv')
+        self.logger = logging.getLogger(__name__)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        self.products = pd.DataFrame(columns=['product_key', 'platform', 'title', 'normalized'])
+        self.load()
+
+    def load(self):
+        if not (os.path.exists(self.signature_file) and os.path.exists(self.products_file)):
+            return
+        arrays = np.load(self.signature_file)
+        self.keys = arrays['keys']
+        self.signatures = arrays['signatures']
+        self.products = pd.read_csv(self.products_file, dtype={'normalized': str}).fillna({'normalized': ''})
+
+    def save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_file = os.path.join(self.index_dir, 'signatures.tmp.npz')
+        np.savez(tmp_file, keys=self.keys, signatures=self.signatures)
+        os.replace(tmp_file, self.signature_file)
+        self.products.to_csv(self.products_file, index=False)
+
+    def add_products(self, df):
+        """Sign products that are new or whose title changed; existing signatures are kept"""
+        latest = df[df['product_key'] != UNIDENTIFIED_KEY]
+        latest = latest.sort_values('scraped_at', kind='stable').drop_duplicates('product_key', keep='last')
+        latest = latest[latest['title'].notna() & (latest['title'] != "Not Found")]
+
+        known = dict(zip(self.products['product_key'], self.products['normalized']))
+        position = {key: i for i, key in enumerate(self.keys)}
+        new_keys, new_signatures, new_rows = [], [], []
+        updated = 0
+
+        for product_key, platform, title in zip(latest['product_key'], latest['platform'], latest['title']):
+            tokens = normalize_title(title)
+            normalized = ' '.join(tokens)
+            if not tokens or known.get(product_key) == normalized:
+                continue
+            signature = minhash(shingles(tokens))
+            if product_key in position:
+                self.signatures[position[product_key]] = signature
+                self.products.loc[self.products['product_key'] == product_key, ['title', 'normalized']] = [title, normalized]
+                updated += 1
+            else:
+                new_keys.append(product_key)
+                new_signatures.append(signature)
+                new_rows.append({'product_key': product_key, 'platform': platform,
+                                 'title': title, 'normalized': normalized})
+
+        if new_keys:
+            self.keys = np.concatenate([self.keys, np.array(new_keys, dtype=np.int64)])
+            self.signatures = np.vstack([self.signatures, np.array(new_signatures, dtype=np.uint32)])
+            self.products = pd.concat([self.products, pd.DataFrame(new_rows)], ignore_index=True)
+
+        if new_keys or updated:
+            self.save()
+            self.logger.info(f"Matching index: {len(new_keys)} new, {updated} re-signed, {len(self.keys)} total")
+        return len(new_keys) + updated
+
+    def candidate_pairs(self):
+        """Index pairs (i, j) that share at least one LSH band bucket"""
+        if len(self.keys) < 2:
+            return np.empty((0, 2), dtype=np.int64)
+
+        # products rows are kept in the same order as keys/signatures
+        platforms = pd.factorize(self.products['platform'])[0]
+        bands = self.signatures.reshape(len(self.keys), BANDS, ROWS_PER_BAND).astype(np.uint64)
+        pairs = []
+        for band in range(BANDS):
+            # Fold each band's rows into one integer bucket id
+            band_hash = np.zeros(len(self.keys), dtype=np.uint64)
+            for row in range(ROWS_PER_BAND):
+                band_hash = band_hash * np.uint64(1000003) ^ bands[:, band, row]
+            buckets = pd.DataFrame({'bucket': band_hash, 'idx': np.arange(len(self.keys))})
+            sizes = buckets.groupby('bucket')['idx'].transform('size')
+            buckets = buckets[(sizes > 1) & (sizes <= MAX_BUCKET_SIZE)]
+            if buckets.empty:
+                continue
+            joined = buckets.merge(buckets, on='bucket')
+            joined = joined[joined['idx_x'] < joined['idx_y']]
+            # Only cross-platform pairs are interesting
+            joined = joined[platforms[joined['idx_x'].to_numpy()] != platforms[joined['idx_y'].to_numpy()]]
+            pairs.append(joined[['idx_x', 'idx_y']].to_numpy())
+
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.unique(np.vstack(pairs), axis=0)
+
+    def match_groups(self, min_similarity=MIN_SIMILARITY):
+        """Cluster verified candidate pairs into groups; returns {product_key: group_id}"""
+        pairs = self.candidate_pairs()
+        if len(pairs) == 0:
+            return {}
+
+        similarity = (self.signatures[pairs[:, 0]] == self.signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[similarity >= min_similarity]
+
+        parent = list(range(len(self.keys)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in pairs:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[root_j] = root_i
+
+        members = {int(i) for pair in pairs for i in pair}
+        return {int(self.keys[i]): int(self.keys[find(i)]) for i in members}
+
+    def cheapest_platform_table(self, latest, output_file="data/matching/cross_platform.csv"):
+        """Build the "same product, cheapest platform" table from latest observations"""
+        groups = self.match_groups()
+        if not groups:
+            self.logger.info("No cross-platform matches found")
+            return pd.DataFrame()
+
+        matched = latest[latest['product_key'].isin(groups)].dropna(subset=['price_numeric']).copy()
+        matched['match_group'] = matched['product_key'].map(groups)
+        # Cheapest listing per platform within each group, then compare platforms
+        per_platform = matched.loc[matched.groupby(['match_group', 'platform'])['price_numeric'].idxmin()]
+        per_platform = per_platform[per_platform.groupby('match_group')['platform'].transform('size') > 1]
+        if per_platform.empty:
+            self.logger.info("No priced cross-platform matches found")
+            return pd.DataFrame()
+
+        grouped = per_platform.groupby('match_group')
+        cheapest = per_platform.loc[grouped['price_numeric'].idxmin()].set_index('match_group')
+        dearest = per_platform.loc[grouped['price_numeric'].idxmax()].set_index('match_group')
+        table = pd.DataFrame({
+            'title': cheapest['title'],
+            'cheapest_platform': cheapest['platform'],
+            'cheapest_price': cheapest['price_numeric'],
+            'cheapest_url': cheapest['url'],
+            'highest_platform': dearest['platform'],
+            'highest_price': dearest['price_numeric'],
+            'platforms': grouped['platform'].apply(lambda p: ','.join(sorted(p))),
+        })
+        table['savings'] = table['highest_price'] - table['cheapest_price']
+        table = table.sort_values('savings', ascending=False).reset_index()
+
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        table.to_csv(output_file, index=False)
+        self.logger.info(f"Wrote {len(table)} cross-platform matches to {output_file}")
+        return table
@@ -0,0 +1,118 @@
+"""
+Overlapped scrape, export and chart stages for a full run.
+
+The scraper stays on the calling thread and hands each URL's items to an
+ExportPipeline as soon as they are scraped. An export thread streams them
+into the CSV/JSON snapshots and, once a platform's pages are all done,
+appends that platform to the history (and its rollups, series store, alerts)
+while the next platform is being scraped. A chart thread then re-renders that
+platform's price trends. Both hand-offs go through bounded queues, so a slow
+stage makes the one before it wait instead of buffering without limit. After
+the scrape, only the last platform's work, the whole-run exports (Excel,
+Sheets) and the aggregate charts remain; the visualizer is given the history
+frame the exporter already holds instead of re-reading the CSV.
+
+The chart thread reads the series store under SeriesStore.lock, which the
+export thread holds while appending to it. Chart render pools are started
+with spawn, because forking this process would copy the export and logging
+threads' locks in whatever state they are in.
+"""
+import queue
+import logging
+import threading
+import multiprocessing
+
+from src.records import RecordBatch
+
+# Scraped pages (and finished platforms) waiting for each stage
+QUEUE_SIZE = 32
+
+
+class ExportPipeline:
+    def __init__(self, exporter, visualizer, formats=None, queue_size=QUEUE_SIZE):
+        self.exporter = exporter
+        self.visualizer = visualizer
+        self.visualizer.mp_context = multiprocessing.get_context('spawn')
+        self.logger = logging.getLogger(__name__)
+        self.snapshots = exporter.open_snapshots(formats)
+        self.records = queue.Queue(maxsize=queue_size)
+        self.platforms = queue.Queue(maxsize=queue_size)
+        self.pending = {}
+        self.history = None
+        self.scraped = 0
+        self.threads = [
+            threading.Thread(target=self.export_loop, name="pipeline-export", daemon=True),
+            threading.Thread(target=self.chart_loop, name="pipeline-charts", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, platform, items):
+        """Queue one page's items; blocks while the export stage is `queue_size` pages behind"""
+        self.records.put((platform, items))
+
+    def platform_done(self, platform):
+        self.records.put((platform, None))
+
+    def export_loop(self):
+        while True:
+            message = self.records.get()
+            if message is None:
+                break
+            platform, items = message
+            try:
+                if items is None:
+                    product_keys = self.append_history(platform)
+                    if product_keys:
+                        self.platforms.put((platform, product_keys))
+                else:
+                    batch = RecordBatch(items)
+                    self.snapshots.write(batch)
+                    self.pending.setdefault(platform, RecordBatch()).extend(batch)
+            except Exception as e:
+                self.logger.error(f"Error exporting {platform} records: {str(e)}")
+        self.platforms.put(None)
+
+    def append_history(self, platform):
+        """Append a finished platform to the history; returns the keys of its products"""
+        batch = self.pending.pop(platform, None)
+        if not batch:
+            return None
+        history = self.exporter.update_historical_data(batch.to_frame(), batch.price_values(), self.history)
+        if history is None:
+            return None
+        self.history = history
+        self.scraped += len(batch)
+        return set(history.loc[history['platform'] == platform, 'product_key'])
+
+    def chart_loop(self):
+        while True:
+            message = self.platforms.get()
+            if message is None:
+                break
+            platform, product_keys = message
+            try:
+                self.visualizer.generate_price_trends(product_keys=product_keys)
+            except Exception as e:
+                self.logger.error(f"Error generating {platform} price trends: {str(e)}")
+
+    def close(self):
+        """Drain both stages, then write the whole-run exports and aggregate charts"""
+        self.records.put(None)
+        for thread in self.threads:
+            thread.join()
+        # Platforms the scraper never marked done (e.g. it stopped early) still go into the history
+        for platform in list(self.pending):
+            self.append_history(platform)
+        self.snapshots.close()
+
+        if not self.scraped:
+            return
+        self.logger.info(f"Exported {self.scraped} records, generating aggregate charts...")
+        self.visualizer.history = self.history
+        # Covers any platform missed above and prunes charts of products that disappeared
+        self.visualizer.generate_price_trends()
+        self.visualizer.generate_comparison_charts()
+        self.visualizer.generate_dashboard()
+        self.visualizer.generate_match_comparison()
+        self.visualizer.generate_html_dashboard()
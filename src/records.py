@@ -0,0 +1,151 @@
+"""
+Compact scraped-product records and a columnar batch to collect them in.
+
+A scrape produces one ProductRecord per item: a NamedTuple, so it carries no
+per-instance dict, with the scrape time as a datetime and the price already
+parsed to a float next to the text shown on the site. RecordBatch stores a
+run's records column by column: text in lists (repeated values such as the
+platform or "0%" share one string object), the scrape time as int64
+nanoseconds and the parsed price as float64 in typed arrays. `to_frame()`
+hands those columns to pandas whole instead of building rows, with the scrape
+time formatted back to the ISO text the snapshots and the history hold.
+"""
+import re
+import math
+from array import array
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+TEXT_FIELDS = ('platform', 'title', 'url', 'price', 'discount', 'rating', 'reviews')
+# Low-cardinality columns whose equal values are stored as one shared object
+SHARED_FIELDS = ('platform', 'discount', 'rating', 'reviews')
+NOT_A_TIME = np.iinfo(np.int64).min
+EPOCH = datetime(1970, 1, 1)
+NON_NUMERIC = re.compile(r'[^\d.]')
+
+
+def parse_price(text):
+    """Scalar equivalent of rollups.parse_price_series ("$1,299.99" -> 1299.99, else NaN)"""
+    if text is None or text == "Not Found":
+        return math.nan
+    try:
+        return float(NON_NUMERIC.sub('', str(text)))
+    except ValueError:
+        return math.nan
+
+
+def parse_time(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def time_to_ns(value):
+    """Naive datetimes are stored as if UTC, which round-trips them unchanged"""
+    if value is None:
+        return NOT_A_TIME
+    delta = value.replace(tzinfo=None) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
+
+
+def iso_times(values):
+    """int64 nanoseconds as datetime.isoformat() text (fraction only when non-zero); None where missing"""
+    values = np.asarray(values, dtype=np.int64)
+    text = np.datetime_as_string(values.view('datetime64[ns]'), unit='us')
+    # "2025-01-02T09:00:00.000000" -> "2025-01-02T09:00:00", as isoformat() writes it
+    whole = values // 1000 % 1_000_000 == 0
+    text = np.where(whole, text.astype('U19'), text).astype(object)
+    text[values == NOT_A_TIME] = None
+    return text
+
+
+def ns_to_time(value):
+    if value == NOT_A_TIME:
+        return None
+    return EPOCH + timedelta(microseconds=value // 1000)
+
+
+class ProductRecord(NamedTuple):
+    platform: str
+    title: str
+    url: str
+    price: str
+    discount: str
+    rating: str
+    reviews: str
+    scraped_at: datetime
+    price_value: float
+
+    @classmethod
+    def from_item(cls, item):
+        """Build a record from a scraped item dict; missing fields become None"""
+        return cls(
+            *(item.get(name) for name in TEXT_FIELDS),
+            scraped_at=parse_time(item.get('scraped_at')),
+            price_value=parse_price(item.get('price')),
+        )
+
+    def to_item(self):
+        """The item dict written to JSON exports and the work queue"""
+        item = {name: getattr(self, name) for name in TEXT_FIELDS}
+        item['scraped_at'] = self.scraped_at.isoformat() if self.scraped_at else None
+        return item
+
+
+class RecordBatch:
+    def __init__(self, records=()):
+        self.text = {name: [] for name in TEXT_FIELDS}
+        self.scraped_at = array('q')
+        self.price_value = array('d')
+        self.shared = {}
+        self.appenders = [(self.text[name].append, name in SHARED_FIELDS) for name in TEXT_FIELDS]
+        self.extend(records)
+
+    @classmethod
+    def coerce(cls, data):
+        """A RecordBatch for `data`, which may already be one or be a list of items"""
+        return data if isinstance(data, cls) else cls(data)
+
+    def __len__(self):
+        return len(self.scraped_at)
+
+    def __iter__(self):
+        columns = [self.text[name] for name in TEXT_FIELDS]
+        for i, row in enumerate(zip(*columns)):
+            yield ProductRecord(*row, scraped_at=ns_to_time(self.scraped_at[i]), price_value=self.price_value[i])
+
+    def append(self, record):
+        """Add a ProductRecord or a scraped item dict"""
+        if isinstance(record, ProductRecord):
+            values, scraped_at, price_value = record[:len(TEXT_FIELDS)], record.scraped_at, record.price_value
+        else:
+            # Item dicts go straight into the columns without an intermediate record
+            values = [record.get(name) for name in TEXT_FIELDS]
+            scraped_at, price_value = parse_time(record.get('scraped_at')), parse_price(record.get('price'))
+        for (append, shared), value in zip(self.appenders, values):
+            append(self.shared.setdefault(value, value) if shared else value)
+        self.scraped_at.append(time_to_ns(scraped_at))
+        self.price_value.append(price_value)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def price_values(self):
+        return np.array(self.price_value, dtype=np.float64)
+
+    def to_frame(self):
+        """DataFrame of the text columns plus scraped_at as ISO text; columns are copied whole"""
+        frame = pd.DataFrame({name: self.text[name] for name in TEXT_FIELDS})
+        # Text, not datetime64, so rows appended to the history match the ones already in it
+        frame['scraped_at'] = iso_times(self.scraped_at)
+        return frame
+
+    def to_items(self):
+        return [record.to_item() for record in self]
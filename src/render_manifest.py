@@ -0,0 +1,101 @@
+"""
+Render manifest for incremental chart regeneration.
+
+The manifest remembers a fingerprint of the input series behind every chart
+so unchanged charts are not re-rendered on the next run.
+"""
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint_series(key, dates, prices):
+    """Fingerprint a chart's input series: key, last timestamp, row count and content hash"""
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    prices = np.asarray(prices, dtype=float)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(key).encode('utf-8'))
+    digest.update(dates.view('int64').tobytes())
+    digest.update(prices.tobytes())
+
+    return {
+        'key': str(key),
+        'last_timestamp': str(dates[-1]) if len(dates) else None,
+        'rows': int(len(dates)),
+        'hash': digest.hexdigest(),
+    }
+
+
+def fingerprint_frame(df):
+    """Fingerprint an aggregated DataFrame or Series used as chart input"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(df, pd.DataFrame):
+        digest.update(','.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class RenderManifest:
+    def __init__(self, manifest_file="data/charts/render_manifest.json"):
+        self.manifest_file = manifest_file
+        self.logger = logging.getLogger(__name__)
+        self.charts = {}
+        self.aggregates = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.manifest_file):
+            return
+        try:
+            with open(self.manifest_file, 'r') as f:
+                manifest = json.load(f)
+            self.charts = manifest.get('charts', {})
+            self.aggregates = manifest.get('aggregates', {})
+        except (json.JSONDecodeError, OSError) as e:
+            # A broken manifest only costs us one full re-render
+            self.logger.warning(f"Ignoring unreadable render manifest {self.manifest_file}: {e}")
+            self.charts = {}
+            self.aggregates = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.manifest_file) or '.', exist_ok=True)
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'charts': self.charts, 'aggregates': self.aggregates}, f, indent=1)
+        os.replace(tmp_file, self.manifest_file)
+
+    def is_chart_stale(self, filename, fingerprint):
+        return self.charts.get(filename) != fingerprint or not os.path.exists(filename)
+
+    def mark_chart(self, filename, fingerprint):
+        self.charts[filename] = fingerprint
+
+    def prune_charts(self, current_filenames):
+        """Delete charts recorded in the manifest whose products have disappeared"""
+        removed = 0
+        for filename in list(self.charts):
+            if filename in current_filenames:
+                continue
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"Could not remove stale chart {filename}: {e}")
+                continue
+            del self.charts[filename]
+            removed += 1
+        return removed
+
+    def is_aggregate_stale(self, name, fingerprint, filenames):
+        if self.aggregates.get(name) != fingerprint:
+            return True
+        return not all(os.path.exists(filename) for filename in filenames)
+
+    def mark_aggregate(self, name, fingerprint):
+        self.aggregates[name] = fingerprint
@@ -0,0 +1,171 @@
+"""
+Materialized rollup tables maintained incrementally at ingest time.
+
+The exporter folds every new batch into these small tables so charts can be
+drawn without scanning the full price history:
+
+- platform_daily.csv: per platform/day observation count and price sum/min/max
+- latest.csv: the latest observation for every product (by product_key)
+- rating_reviews.csv: 2-D histogram of rating x reviews (rating marginal included)
+- discount_hist.csv: histogram of discount percentages
+"""
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.identity import UNIDENTIFIED_KEY
+
+LATEST_COLUMNS = ['platform', 'url', 'title', 'price', 'discount', 'rating', 'reviews',
+                  'scraped_at', 'price_numeric', 'product_id']
+
+
+def parse_price_series(prices):
+    """Vectorized equivalent of DataVisualizer.extract_numeric_price"""
+    cleaned = prices.astype(str).str.replace(r'[^\d.]', '', regex=True)
+    numeric = pd.to_numeric(cleaned, errors='coerce')
+    return numeric.where(prices.notna() & (prices != "Not Found"))
+
+
+def parse_discount_series(discounts):
+    """Vectorized discount parsing matching the dashboard ("10%" -> 10.0, otherwise 0)"""
+    as_text = discounts.astype(str)
+    numeric = pd.to_numeric(as_text.str.strip('%'), errors='coerce')
+    return numeric.where(as_text.str.contains('%', regex=False), 0).fillna(0)
+
+
+def round_significant(values, digits=2):
+    """Round positive counts to a few significant digits to keep histogram bins coarse"""
+    values = np.asarray(values, dtype=float)
+    magnitude = np.where(values > 0, np.floor(np.log10(np.where(values > 0, values, 1))), 0)
+    scale = 10 ** (magnitude - digits + 1)
+    return np.round(values / scale) * scale
+
+
+class RollupStore:
+    def __init__(self, rollup_dir="data/rollups", key_column='product_key'):
+        self.rollup_dir = rollup_dir
+        self.key_column = key_column
+        self.logger = logging.getLogger(__name__)
+        self.files = {
+            'platform_daily': os.path.join(rollup_dir, 'platform_daily.csv'),
+            'latest': os.path.join(rollup_dir, 'latest.csv'),
+            'rating_reviews': os.path.join(rollup_dir, 'rating_reviews.csv'),
+            'discount_hist': os.path.join(rollup_dir, 'discount_hist.csv'),
+        }
+
+    def exists(self):
+        if not all(os.path.exists(path) for path in self.files.values()):
+            return False
+        # Rollups written before the key column existed must be rebuilt
+        with open(self.files['latest'], 'r') as f:
+            header = f.readline().strip().split(',')
+        return self.key_column in header
+
+    def load(self):
+        tables = {}
+        for name, path in self.files.items():
+            tables[name] = pd.read_csv(path)
+        tables['platform_daily']['day'] = pd.to_datetime(tables['platform_daily']['day'])
+        tables['latest']['scraped_at'] = pd.to_datetime(tables['latest']['scraped_at'], format='ISO8601')
+        return tables
+
+    def save(self, tables):
+        os.makedirs(self.rollup_dir, exist_ok=True)
+        for name, table in tables.items():
+            tmp_file = f"{self.files[name]}.tmp"
+            table.to_csv(tmp_file, index=False)
+            os.replace(tmp_file, self.files[name])
+
+    def rebuild(self, history_df):
+        """Recompute every rollup from the full history"""
+        tables = self.compute(history_df)
+        self.save(tables)
+        self.logger.info(f"Rebuilt rollups from {len(history_df)} historical records")
+        return tables
+
+    def update(self, new_df):
+        """Fold a batch of new observations into the stored rollups"""
+        batch = self.compute(new_df)
+        if self.exists():
+            batch = self.merge(self.load(), batch)
+        self.save(batch)
+        self.logger.info(f"Updated rollups with {len(new_df)} new records")
+        return batch
+
+    def compute(self, df):
+        df = df.copy()
+        df['scraped_at'] = pd.to_datetime(df['scraped_at'], format='ISO8601')
+        if 'price_numeric' not in df.columns:
+            df['price_numeric'] = parse_price_series(df['price'])
+
+        priced = df.dropna(subset=['price_numeric'])
+        platform_daily = (
+            df.assign(day=df['scraped_at'].dt.normalize())
+            .groupby(['platform', 'day'])
+            .agg(count=('platform', 'size'))
+            .join(
+                priced.assign(day=priced['scraped_at'].dt.normalize())
+                .groupby(['platform', 'day'])['price_numeric']
+                .agg(priced_count='count', price_sum='sum', price_min='min', price_max='max')
+            )
+            .fillna({'priced_count': 0, 'price_sum': 0})
+            .reset_index()
+        )
+
+        keyed = df[df[self.key_column].notna() & (df[self.key_column] != UNIDENTIFIED_KEY)]
+        latest = keyed.loc[keyed.groupby(self.key_column)['scraped_at'].idxmax()]
+        latest = latest[[c for c in LATEST_COLUMNS + [self.key_column] if c in latest.columns]]
+        latest = latest.loc[:, ~latest.columns.duplicated()]
+
+        ratings = pd.to_numeric(df['rating'], errors='coerce').round(1)
+        reviews = round_significant(pd.to_numeric(df['reviews'], errors='coerce'))
+        rating_reviews = (
+            pd.DataFrame({'rating': ratings, 'reviews': reviews})
+            .dropna()
+            .groupby(['rating', 'reviews']).size()
+            .rename('count').reset_index()
+        )
+
+        discount_hist = (
+            parse_discount_series(df['discount']).round()
+            .value_counts().rename_axis('discount')
+            .rename('count').reset_index()
+        )
+
+        return {
+            'platform_daily': platform_daily,
+            'latest': latest.reset_index(drop=True),
+            'rating_reviews': rating_reviews,
+            'discount_hist': discount_hist,
+        }
+
+    def merge(self, old, new):
+        platform_daily = (
+            pd.concat([old['platform_daily'], new['platform_daily']], ignore_index=True)
+            .groupby(['platform', 'day'])
+            .agg(count=('count', 'sum'), priced_count=('priced_count', 'sum'),
+                 price_sum=('price_sum', 'sum'), price_min=('price_min', 'min'),
+                 price_max=('price_max', 'max'))
+            .reset_index()
+        )
+
+        latest = pd.concat([old['latest'], new['latest']], ignore_index=True)
+        latest = latest.loc[latest.groupby(self.key_column)['scraped_at'].idxmax()].reset_index(drop=True)
+
+        rating_reviews = (
+            pd.concat([old['rating_reviews'], new['rating_reviews']], ignore_index=True)
+            .groupby(['rating', 'reviews'], as_index=False)['count'].sum()
+        )
+        discount_hist = (
+            pd.concat([old['discount_hist'], new['discount_hist']], ignore_index=True)
+            .groupby('discount', as_index=False)['count'].sum()
+        )
+
+        return {
+            'platform_daily': platform_daily,
+            'latest': latest,
+            'rating_reviews': rating_reviews,
+            'discount_hist': discount_hist,
+        }
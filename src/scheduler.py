@@ -1,78 +1,84 @@
-import schedule
-import time
-import subprocess
 import logging
-from datetime import datetime
-import os
+import threading
+from src.job_runner import JobRunner, daily_trigger, interval_trigger
+from src.config import get_config
+from src.utils import setup_logging
+
+# Seconds between checks for an edited "scheduler" section in settings.json
+CONFIG_CHECK_SECONDS = 30
+
+def run_scrape_job():
+    """One scheduled run: scrape, export and chart. Runs in the job runner's worker process."""
+    from src.scraper import EcommerceScraper
+    from src.exporter import DataExporter
+    from src.visualizer import DataVisualizer
+    from src.pipeline import ExportPipeline
+    
+    logger = setup_logging('scheduler', __name__)
+    logger.info("Starting scheduled scraping task...")
+    # Each run is a fresh process, so it reads the current settings and catalog
+    scraper = EcommerceScraper()
+    # Export and charts overlap the scrape, as with main.py --all
+    pipeline = ExportPipeline(DataExporter(), DataVisualizer())
+    try:
+        data = scraper.scrape_all_products(sink=pipeline)
+    finally:
+        pipeline.close()
+    
+    if data:
+        logger.info(f"Successfully completed scraping {len(data)} products")
+    else:
+        logger.warning("No data was scraped")
 
 class TaskScheduler:
-    def __init__(self):
+    def __init__(self, timeout_minutes=None):
         self.setup_logging()
+        self.config = get_config().scheduler
+        self.timeout_seconds = (timeout_minutes or self.config.timeout_minutes) * 60
+        self.runner = JobRunner()
         
     def setup_logging(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('logs/scheduler.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        self.logger = setup_logging('scheduler', __name__)
     
     def run_scraper(self):
-        self.logger.info("Starting scheduled scraping task...")
-        try:
-            # Run the scraper
-            from scraper import EcommerceScraper
-            from exporter import DataExporter
-            from visualizer import DataVisualizer
-            
-            scraper = EcommerceScraper(headless=True)
-            data = scraper.scrape_all_products()
-            
-            if data:
-                exporter = DataExporter()
-                exporter.export_data(data)
-                
-                visualizer = DataVisualizer()
-                visualizer.generate_price_trends()
-                visualizer.generate_comparison_charts()
-                
-                self.logger.info(f"Successfully completed scraping {len(data)} products")
-            else:
-                self.logger.warning("No data was scraped")
-                
-        except Exception as e:
-            self.logger.error(f"Error in scheduled task: {str(e)}")
+        """Run one scraping job now and wait for it (skipped if one is in progress)"""
+        return self.runner.run_once('scrape', run_scrape_job, self.timeout_seconds)
     
-    def schedule_daily_task(self, time_str="09:00"):
-        """Schedule the scraping task to run daily at the specified time"""
-        schedule.every().day.at(time_str).do(self.run_scraper)
-        
-        self.logger.info(f"Scheduled daily task at {time_str}")
-        
-        # Run immediately on first start
-        self.run_scraper()
-        
-        # Keep the scheduler running
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+    def schedule_daily_task(self, time_str=None):
+        """Schedule the scraping task to run daily at time_str, or at scheduler.daily_at from settings"""
+        # Run immediately on first start, then at the configured time every day
+        job = self.runner.add_job('scrape', run_scrape_job, daily_trigger(time_str or self.config.daily_at),
+                                  self.timeout_seconds, run_now=True)
+        self.logger.info(f"Scheduled daily task at {time_str or self.config.daily_at}")
+        if time_str is None:
+            threading.Thread(target=self.watch_config, args=(job,), name="config-watch", daemon=True).start()
+        self.run_forever()
     
     def schedule_hourly_task(self):
         """Schedule the scraping task to run hourly"""
-        schedule.every().hour.do(self.run_scraper)
-        
+        # Run immediately on first start, then every hour
+        self.runner.add_job('scrape', run_scrape_job, interval_trigger(3600), self.timeout_seconds, run_now=True)
         self.logger.info("Scheduled hourly task")
-        
-        # Run immediately on first start
-        self.run_scraper()
-        
-        # Keep the scheduler running
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        self.run_forever()
+    
+    def watch_config(self, job):
+        """Apply edits to the scheduler settings without restarting"""
+        while not self.runner.stopped.wait(CONFIG_CHECK_SECONDS):
+            config = get_config().scheduler
+            if config == self.config:
+                continue
+            self.config = config
+            self.timeout_seconds = job.timeout_seconds = config.timeout_minutes * 60
+            job.trigger = daily_trigger(config.daily_at)
+            self.runner.reschedule(job)
+            self.logger.info(f"Rescheduled daily task at {config.daily_at} with a {config.timeout_minutes} minute timeout")
+    
+    def run_forever(self):
+        try:
+            self.runner.run_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Scheduler stopped")
+            self.runner.stop()
 
 if __name__ == "__main__":
     scheduler = TaskScheduler()
@@ -1,5 +1,3 @@
-import json
-import logging
 import time
 import re
 from datetime import datetime
@@ -15,23 +13,49 @@ from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 from webdriver_manager.chrome import ChromeDriverManager
 
+from src.config import get_config
+from src.records import RecordBatch
+from src.frontier import CrawlFrontier
+from src.enrichment import Enricher
+from src.selector_stats import SelectorStats
+from src.tabs import TabPool, BrowserUsage
+from src.urls import page_type
+from src.sharding import UrlCostStore, shard_product_urls
+from src.utils import setup_logging
+
+
+def element_text(elem, selector):
+    return elem.text.strip()
+
+
+def first_word(elem, selector):
+    return elem.text.split(" ")[0]
+
 
 class EcommerceScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=None, shard=None, enrich=None, selector_stats=None, tabs=None, cost_version=None,
+                 detail_only=False):
         self.setup_logging()
-        self.driver = self.setup_driver(headless)
-        self.data = []
+        self.config = get_config()
+        self.headless = self.config.headless if headless is None else headless
+        self.tabs = self.config.browser.tabs if tabs is None else tabs
+        self.driver = self.setup_driver(self.headless)
+        self.data = RecordBatch()
+        self.shard = shard
+        self.cost_version = cost_version
+        self.selector_stats = selector_stats or SelectorStats.from_config(self.config)
+        # A detail_only scraper just loads pages for another one (enrichment), which owns the run's stores
+        self.url_costs = None if detail_only else UrlCostStore()
+        self.frontier = None if detail_only else CrawlFrontier.from_config(self.config)
+        self.enricher = None
+        if not detail_only and (self.config.enrichment.enabled if enrich is None else enrich):
+            # Detail pages are fetched by separate scrapers with their own browsers
+            self.enricher = Enricher.from_config(self.config, lambda: EcommerceScraper(
+                headless=self.headless, selector_stats=self.selector_stats, tabs=1, detail_only=True,
+            ), frontier=self.frontier)
 
     def setup_logging(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
-            handlers=[
-                logging.FileHandler("logs/scraper.log"),
-                logging.StreamHandler(),
-            ],
-        )
-        self.logger = logging.getLogger(__name__)
+        self.logger = setup_logging('scraper', __name__)
 
     def setup_driver(self, headless):
         chrome_options = Options()
@@ -42,6 +66,11 @@ class EcommerceScraper:
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option("useAutomationExtension", False)
+        if self.tabs > 1:
+            # Tabs loading behind the one being extracted must not be throttled as background pages
+            chrome_options.add_argument("--disable-background-timer-throttling")
+            chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+            chrome_options.add_argument("--disable-renderer-backgrounding")
 
         driver_path = ChromeDriverManager().install()
         driver_path = str(Path(driver_path).with_name("chromedriver.exe"))
@@ -51,61 +80,114 @@ class EcommerceScraper:
         driver = webdriver.Chrome(service=service, options=chrome_options)
         return driver
 
-    def load_product_urls(self, config_file="config/products.json"):
-        try:
-            with open(config_file, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            self.logger.error(f"Config file {config_file} not found")
-            return {}
-        except json.JSONDecodeError:
-            self.logger.error(f"Invalid JSON in {config_file}")
-            return {}
+    def load_product_urls(self):
+        # Re-read on every run so a long-lived scraper picks up catalog edits
+        self.config = get_config()
+        return self.config.products
 
     def detect_page_type(self, url, platform):
-        if platform == "amazon":
-            return "product" if "/dp/" in url or "/gp/" in url or "/product/" in url else "search"
-        if platform == "ebay":
-            return "product" if "/itm/" in url else "search"
-        if platform == "aliexpress":
-            return "product" if "/item/" in url else "search"
-        if platform == "jumia":
-            return "product" if "/catalog/" in url or "/product/" in url else "search"
-        return "product"
-
-    def scrape_all_products(self):
+        return page_type(url, platform)
+
+    def scrape_all_products(self, sink=None):
+        """Scrape the catalog; `sink` (e.g. an ExportPipeline) is handed each URL's items and told when a platform is done"""
         product_urls = self.load_product_urls()
-        for platform, urls in product_urls.items():
-            for url in urls:
-                try:
-                    self.logger.info(f"Scraping {url}")
-                    product_data = self.scrape_product(url, platform)
-
-                    if product_data:
-                        if isinstance(product_data, list):  # search results
-                            for item in product_data:
-                                item["scraped_at"] = datetime.now().isoformat()
-                                self.data.append(item)
-                        else:  # single product
-                            product_data["scraped_at"] = datetime.now().isoformat()
-                            self.data.append(product_data)
-
-                        self.logger.info(f"Successfully scraped: {len(product_data) if isinstance(product_data, list) else 1} items from {url}")
-                    else:
-                        self.logger.warning(f"Failed to scrape data from {url}")
-                except Exception as e:
-                    self.logger.error(f"Error scraping {url}: {str(e)}")
-                    import traceback
-                    self.logger.error(traceback.format_exc())
+        if self.shard:
+            product_urls = shard_product_urls(product_urls, *self.shard, cost_version=self.cost_version)
+            self.logger.info(f"Shard {self.shard[0]}/{self.shard[1]}: {sum(len(urls) for urls in product_urls.values())} URLs")
+        # Drop repeated and recently fetched pages before navigating anywhere
+        product_urls = self.frontier.plan(product_urls, self.detect_page_type)
+        jobs = [(platform, url) for platform, urls in product_urls.items() for url in urls]
+        usage = BrowserUsage(self.driver, self.tabs, self.config.browser.runs_file)
+        # With several tabs, the next URLs load in the background while the current page is extracted
+        tab_pool = TabPool(self.driver, self.tabs, self.config.implicit_wait) if self.tabs > 1 and len(jobs) > 1 else None
+        visits = tab_pool.visit(jobs) if tab_pool else iter(jobs)
+        current = None
+        for platform, url in visits:
+            if platform != current:
+                if sink is not None and current is not None:
+                    sink.platform_done(current)
+                current = platform
+            try:
+                items = self.scrape_url(url, platform, navigate=tab_pool is None,
+                                        started=tab_pool.started if tab_pool else None)
+                self.data.extend(items)
+            except Exception as e:
+                self.logger.error(f"Error scraping {url}: {str(e)}", exc_info=True)
+                continue
+            finally:
+                usage.page_done()
+            if sink is not None and items:
+                sink.put(platform, items)
+        if sink is not None and current is not None:
+            sink.platform_done(current)
+
+        if tab_pool is not None:
+            tab_pool.close()
+        usage.report()
+        self.close()
+        return self.data
+
+    def scrape_url(self, url, platform, navigate=True, started=None):
+        """Scrape one configured URL; returns a (possibly empty) list of timestamped items
+
+        With navigate=False the URL is already loading in the current tab (see TabPool);
+        started is then the perf_counter() time its load began, so the recorded cost
+        covers the load as it does when scrape_url navigates itself.
+        """
+        context = {"url": url, "platform": platform}
+        self.logger.info(f"Scraping {url}", extra={**context, "phase": "start"})
+        started = time.perf_counter() if started is None else started
+        duplicates = self.frontier.counts['duplicates']
+        product_data = self.scrape_product(url, platform, navigate)
+        if isinstance(product_data, list) and product_data and self.enricher is not None:
+            self.enricher.enrich(product_data)
+        duration = time.perf_counter() - started
+        # Measured cost (including enrichment) feeds the cost-balanced shard assignment
+        self.url_costs.record(url, duration)
+
+        skipped = self.frontier.counts['duplicates'] - duplicates
+        if not product_data and skipped:
+            self.logger.info(f"All {skipped} results on {url} were already seen this run", extra={**context, "phase": "done", "duration": round(duration, 3), "items": 0})
+            return []
+        if not product_data:
+            self.logger.warning(f"Failed to scrape data from {url}", extra={**context, "phase": "failed", "duration": round(duration, 3)})
+            return []
+
+        items = product_data if isinstance(product_data, list) else [product_data]
+        if not isinstance(product_data, list):
+            self.frontier.mark_fetched(url, platform)
+        for item in items:
+            item["scraped_at"] = datetime.now().isoformat()
+            self.frontier.mark_fetched(item.get("url") or url, platform)
+        self.logger.info(
+            f"Successfully scraped: {len(items)} items from {url}",
+            extra={**context, "phase": "done", "duration": round(duration, 3), "items": len(items)},
+        )
+        return items
 
+    def close(self):
+        if self.enricher is not None:
+            self.enricher.close()
         self.driver.quit()
-        return self.data
+        try:
+            self.url_costs.save()
+        except OSError as e:
+            self.logger.error(f"Error saving URL costs: {str(e)}")
+        try:
+            self.frontier.finish_run()
+        except OSError as e:
+            self.logger.error(f"Error saving crawl frontier: {str(e)}")
+        try:
+            self.selector_stats.save()
+        except OSError as e:
+            self.logger.error(f"Error saving selector statistics: {str(e)}")
 
-    def scrape_product(self, url, platform):
+    def scrape_product(self, url, platform, navigate=True):
         try:
-            self.driver.get(url)
-            # Wait for page to load
-            time.sleep(5)
+            self.config = get_config()
+            if navigate:
+                self.driver.get(url)
+            self.wait_for_page_load()
             
             # Check if we got a CAPTCHA or access denied
             if "captcha" in self.driver.page_source.lower() or "access denied" in self.driver.page_source.lower():
@@ -126,88 +208,96 @@ class EcommerceScraper:
                 self.logger.warning(f"Unsupported platform: {platform}")
                 return None
         except Exception as e:
-            self.logger.error(f"Error scraping {platform}: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error scraping {platform}: {str(e)}", exc_info=True)
             return None
 
+    def wait_for_page_load(self):
+        """Wait up to implicit_wait seconds for the document to finish loading"""
+        # The driver's own implicit wait is left at 0: the selector fallbacks
+        # below expect find_element to fail fast on a miss
+        try:
+            WebDriverWait(self.driver, self.config.implicit_wait).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+        except TimeoutException:
+            self.logger.warning(f"Page still loading after {self.config.implicit_wait}s, parsing what is there")
+
+    def selector_candidates(self, platform, field, defaults):
+        """Hard-coded candidates followed by any extra ones from config/selectors.json"""
+        configured = self.config.selectors.get(platform, {}).get(field, [])
+        return list(dict.fromkeys(list(defaults) + configured))
+
+    def select(self, platform, field, defaults, extract=None, default="Not Found", root=None):
+        """Value from the first candidate selector that yields one, trying the best-performing first.
+
+        `extract(element, selector)` turns a matched element into the value; a
+        falsy result counts as a miss and moves on to the next candidate.
+        """
+        root = self.driver if root is None else root
+        extract = extract or element_text
+        candidates = self.selector_candidates(platform, field, defaults)
+        for selector in self.selector_stats.order(platform, field, candidates):
+            started = time.perf_counter()
+            try:
+                value = extract(root.find_element(By.CSS_SELECTOR, selector), selector)
+            except (NoSuchElementException, StaleElementReferenceException):
+                value = None
+            self.selector_stats.record(platform, field, selector, bool(value), time.perf_counter() - started)
+            if value:
+                return value
+        return default
+
+    def wait_for_any(self, platform, field, defaults):
+        """Wait up to explicit_wait seconds for any candidate selector to appear"""
+        candidates = self.selector_candidates(platform, field, defaults)
+        try:
+            WebDriverWait(self.driver, self.config.explicit_wait).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(candidates)))
+            )
+        except TimeoutException:
+            self.logger.warning(f"No {platform} {field} element appeared within {self.config.explicit_wait}s")
+
     # -------------------- AMAZON --------------------
     def scrape_amazon(self):
         product_data = {"platform": "amazon", "url": self.driver.current_url}
         try:
             # Title
-            try:
-                title_elem = WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "a-size-base-plus"))
-                )
-                product_data["title"] = title_elem.text.strip()
-            except (TimeoutException, NoSuchElementException):
-                try:
-                    title_elem = self.driver.find_element(By.CSS_SELECTOR, "h1.a-size-large")
-                    product_data["title"] = title_elem.text.strip()
-                except NoSuchElementException:
-                    product_data["title"] = "Not Found"
+            title_selectors = [".a-size-base-plus", "h1.a-size-large"]
+            self.wait_for_any("amazon", "title", title_selectors)
+            product_data["title"] = self.select("amazon", "title", title_selectors)
 
             # Price
-            try:
-                # Try multiple price selectors
-                price_selectors = [
-                    "span.a-price-whole",
-                    "span.a-price[data-a-size='xl']",
-                    "#priceblock_ourprice",
-                    "#priceblock_dealprice",
-                    ".a-price .a-offscreen"
-                ]
-                
-                price_found = False
-                for selector in price_selectors:
+            def price_text(elem, selector):
+                if selector == "span.a-price-whole":
                     try:
-                        price_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        if selector == "span.a-price-whole":
-                            try:
-                                price_fraction = self.driver.find_element(By.CSS_SELECTOR, "span.a-price-fraction")
-                                product_data["price"] = f"{price_elem.text}.{price_fraction.text}"
-                            except NoSuchElementException:
-                                product_data["price"] = price_elem.text
-                        else:
-                            product_data["price"] = price_elem.text.strip()
-                        price_found = True
-                        break
+                        price_fraction = self.driver.find_element(By.CSS_SELECTOR, "span.a-price-fraction")
+                        return f"{elem.text}.{price_fraction.text}"
                     except NoSuchElementException:
-                        continue
-                
-                if not price_found:
-                    product_data["price"] = "Not Found"
-            except Exception as e:
-                product_data["price"] = "Not Found"
-                self.logger.warning(f"Error getting price: {e}")
+                        return elem.text
+                return elem.text.strip()
+
+            product_data["price"] = self.select("amazon", "price", [
+                "span.a-price-whole",
+                "span.a-price[data-a-size='xl']",
+                "#priceblock_ourprice",
+                "#priceblock_dealprice",
+                ".a-price .a-offscreen"
+            ], extract=price_text)
 
             # Discount
-            try:
-                discount_elem = self.driver.find_element(By.CSS_SELECTOR, "span.savingsPercentage")
-                product_data["discount"] = discount_elem.text.strip()
-            except NoSuchElementException:
-                product_data["discount"] = "0%"
+            product_data["discount"] = self.select("amazon", "discount", ["span.savingsPercentage"], default="0%")
 
             # Rating
-            try:
-                rating_elem = self.driver.find_element(By.CSS_SELECTOR, "span.a-icon-alt")
-                rating_text = rating_elem.get_attribute("innerHTML")
-                product_data["rating"] = rating_text.split(" ")[0]
-            except NoSuchElementException:
-                product_data["rating"] = "Not Found"
+            product_data["rating"] = self.select(
+                "amazon", "rating", ["span.a-icon-alt"],
+                extract=lambda elem, selector: elem.get_attribute("innerHTML").split(" ")[0],
+            )
 
             # Reviews count
-            try:
-                reviews_elem = self.driver.find_element(By.ID, "acrCustomerReviewText")
-                product_data["reviews"] = reviews_elem.text.split(" ")[0]
-            except NoSuchElementException:
-                product_data["reviews"] = "0"
+            product_data["reviews"] = self.select("amazon", "reviews", ["#acrCustomerReviewText"], extract=first_word, default="0")
                 
         except Exception as e:
-            self.logger.error(f"Error parsing Amazon product: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error parsing Amazon product: {str(e)}", exc_info=True)
             return None
             
         return product_data
@@ -217,7 +307,7 @@ class EcommerceScraper:
         results = []
         try:
             # Wait for search results to load
-            WebDriverWait(self.driver, 15).until(
+            WebDriverWait(self.driver, self.config.explicit_wait).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "[data-component-type='s-search-result']"))
             )
         except TimeoutException:
@@ -231,110 +321,68 @@ class EcommerceScraper:
             )
             
             self.logger.info(f"Found {len(items)} search results on Amazon")
+            page_url = self.driver.current_url
             
             for elem in items[:10]:  # limit to first 10 results
                 try:
+                    # URL
+                    def valid_link(link_elem, selector):
+                        link = link_elem.get_attribute("href")
+                        return link if link and link.startswith("http") else None
+
+                    link = self.select("amazon", "search_link", [
+                        "h2 a",
+                        "a.a-link-normal",
+                        "a.a-text-normal"
+                    ], extract=valid_link, default=page_url, root=elem)
+
+                    # Skip products already in the catalog or in another query's results
+                    if link != page_url and not self.frontier.admit(link, "amazon"):
+                        continue
+
                     # Title - try multiple selectors
-                    title = "Not Found"
-                    title_selectors = [
+                    title = self.select("amazon", "search_title", [
                         "h2 a span",  # Main title selector
                         "span.a-text-normal",  # Alternative selector
                         "h2 a",  # Fallback
                         ".a-size-base-plus"  # Another alternative
-                    ]
-                    
-                    for selector in title_selectors:
-                        try:
-                            title_elem = elem.find_element(By.CSS_SELECTOR, selector)
-                            title = title_elem.text.strip()
-                            if title and title != "":  # Only break if we got a valid title
-                                break
-                        except (NoSuchElementException, StaleElementReferenceException):
-                            continue
-
-                    # URL
-                    link = self.driver.current_url  # Default to current URL
-                    link_selectors = [
-                        "h2 a",
-                        "a.a-link-normal",
-                        "a.a-text-normal"
-                    ]
-                    
-                    for selector in link_selectors:
-                        try:
-                            link_elem = elem.find_element(By.CSS_SELECTOR, selector)
-                            link = link_elem.get_attribute("href")
-                            if link and link.startswith("http"):  # Only break if we got a valid link
-                                break
-                        except (NoSuchElementException, StaleElementReferenceException):
-                            continue
+                    ], root=elem)
 
                     # Price - try multiple selectors
-                    price = "Not Found"
-                    price_selectors = [
+                    price = self.select("amazon", "search_price", [
                         "span.a-price",  # Main price container
                         "span.a-price-whole",  # Whole price part
                         "span.a-offscreen",  # Screen reader price
                         ".a-price-range"  # Price range
-                    ]
-                    
-                    for selector in price_selectors:
-                        try:
-                            price_elem = elem.find_element(By.CSS_SELECTOR, selector)
-                            price_text = price_elem.text.strip()
-                            if price_text and price_text != "":  # Only use if we got text
-                                price = price_text.replace("\n", ".")
-                                break
-                        except (NoSuchElementException, StaleElementReferenceException):
-                            continue
+                    ], extract=lambda price_elem, selector: price_elem.text.strip().replace("\n", "."), root=elem)
 
                     # Rating - for search results
-                    rating = "Not Found"
-                    rating_selectors = [
+                    def rating_value(rating_elem, selector):
+                        rating_text = rating_elem.get_attribute("innerHTML") if selector == "span.a-icon-alt" else rating_elem.text
+                        if rating_text and "out of" in rating_text:
+                            return rating_text.split(" ")[0]
+                        # Try to extract numeric rating
+                        numbers = re.findall(r'\d+\.\d+|\d+', rating_text or "")
+                        return numbers[0] if numbers else None
+
+                    rating = self.select("amazon", "search_rating", [
                         "span.a-icon-alt",
                         ".a-icon-star",
                         "[aria-label*='out of']"
-                    ]
-                    
-                    for selector in rating_selectors:
-                        try:
-                            rating_elem = elem.find_element(By.CSS_SELECTOR, selector)
-                            rating_text = rating_elem.get_attribute("innerHTML") if selector == "span.a-icon-alt" else rating_elem.text
-                            if rating_text and "out of" in rating_text:
-                                rating = rating_text.split(" ")[0]
-                                break
-                            elif rating_text:
-                                # Try to extract numeric rating
-                                numbers = re.findall(r'\d+\.\d+|\d+', rating_text)
-                                if numbers:
-                                    rating = numbers[0]
-                                    break
-                        except (NoSuchElementException, StaleElementReferenceException):
-                            continue
+                    ], extract=rating_value, root=elem)
 
                     # Reviews - for search results
-                    reviews = "0"
-                    reviews_selectors = [
+                    def review_count(reviews_elem, selector):
+                        # Extract numbers from reviews text
+                        numbers = re.findall(r'\d+', reviews_elem.text.strip())
+                        return numbers[0] if numbers else None
+
+                    reviews = self.select("amazon", "search_reviews", [
                         "span.a-size-base",
                         ".a-size-small",
                         "[aria-label*='ratings']",
                         "[aria-label*='reviews']"
-                    ]
-                    
-                    for selector in reviews_selectors:
-                        try:
-                            reviews_elem = elem.find_element(By.CSS_SELECTOR, selector)
-                            reviews_text = reviews_elem.text.strip()
-                            # Extract numbers from reviews text
-                            numbers = re.findall(r'\d+', reviews_text)
-                            if numbers:
-                                reviews = numbers[0]
-                                break
-                            elif reviews_text.isdigit():  # If it's already a number
-                                reviews = reviews_text
-                                break
-                        except (NoSuchElementException, StaleElementReferenceException):
-                            continue
+                    ], extract=review_count, default="0", root=elem)
 
                     results.append({
                         "platform": "amazon",
@@ -353,9 +401,7 @@ class EcommerceScraper:
                     continue
                     
         except Exception as e:
-            self.logger.error(f"Error processing Amazon search results: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error processing Amazon search results: {str(e)}", exc_info=True)
             
         return results
 
@@ -364,50 +410,29 @@ class EcommerceScraper:
         product_data = {"platform": "ebay", "url": self.driver.current_url}
         try:
             # Title
-            try:
-                title_elem = WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "h1.x-item-title__mainTitle"))
-                )
-                product_data["title"] = title_elem.text.strip()
-            except TimeoutException:
-                try:
-                    title_elem = self.driver.find_element(By.CSS_SELECTOR, "h1#itemTitle")
-                    product_data["title"] = title_elem.text.replace("Details about", "").strip()
-                except NoSuchElementException:
-                    product_data["title"] = "Not Found"
+            title_selectors = ["h1.x-item-title__mainTitle", "h1#itemTitle"]
+            self.wait_for_any("ebay", "title", title_selectors)
+            product_data["title"] = self.select(
+                "ebay", "title", title_selectors,
+                extract=lambda elem, selector: elem.text.replace("Details about", "").strip(),
+            )
 
             # Price
-            try:
-                price_elem = self.driver.find_element(By.CSS_SELECTOR, "div.x-price-primary")
-                product_data["price"] = price_elem.text.strip()
-            except NoSuchElementException:
-                try:
-                    price_elem = self.driver.find_element(By.CSS_SELECTOR, "span#prcIsum")
-                    product_data["price"] = price_elem.text.strip()
-                except NoSuchElementException:
-                    product_data["price"] = "Not Found"
+            product_data["price"] = self.select("ebay", "price", ["div.x-price-primary", "span#prcIsum"])
 
-            product_data["discount"] = "0%"
+            product_data["discount"] = self.select("ebay", "discount", [], default="0%")
 
             # Rating
-            try:
-                rating_elem = self.driver.find_element(By.CSS_SELECTOR, "div.x-seller-rating")
-                rating_text = rating_elem.text.strip()
-                product_data["rating"] = rating_text.split(" ")[0]
-            except NoSuchElementException:
-                product_data["rating"] = "Not Found"
+            product_data["rating"] = self.select(
+                "ebay", "rating", ["div.x-seller-rating"],
+                extract=lambda elem, selector: elem.text.strip().split(" ")[0],
+            )
 
             # Reviews count
-            try:
-                reviews_elem = self.driver.find_element(By.CSS_SELECTOR, "span#si-fb")
-                product_data["reviews"] = reviews_elem.text.split(" ")[0]
-            except NoSuchElementException:
-                product_data["reviews"] = "0"
+            product_data["reviews"] = self.select("ebay", "reviews", ["span#si-fb"], extract=first_word, default="0")
                 
         except Exception as e:
-            self.logger.error(f"Error parsing eBay product: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error parsing eBay product: {str(e)}", exc_info=True)
             return None
             
         return product_data
@@ -416,7 +441,7 @@ class EcommerceScraper:
         results = []
         try:
             # Wait for search results
-            WebDriverWait(self.driver, 15).until(
+            WebDriverWait(self.driver, self.config.explicit_wait).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "li.s-item"))
             )
             
@@ -429,8 +454,10 @@ class EcommerceScraper:
                     if "s-item__placeholder" in elem.get_attribute("class"):
                         continue
                         
-                    title = elem.find_element(By.CSS_SELECTOR, "div.s-item__title span").text
                     link = elem.find_element(By.CSS_SELECTOR, "a.s-item__link").get_attribute("href")
+                    if not self.frontier.admit(link, "ebay"):
+                        continue
+                    title = elem.find_element(By.CSS_SELECTOR, "div.s-item__title span").text
                     
                     try:
                         price = elem.find_element(By.CSS_SELECTOR, "span.s-item__price").text
@@ -467,9 +494,7 @@ class EcommerceScraper:
         except TimeoutException:
             self.logger.warning("eBay search results not found or took too long to load")
         except Exception as e:
-            self.logger.error(f"Error processing eBay search results: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error processing eBay search results: {str(e)}", exc_info=True)
             
         return results
 
@@ -478,51 +503,27 @@ class EcommerceScraper:
         product_data = {"platform": "aliexpress", "url": self.driver.current_url}
         try:
             # Title
-            try:
-                title_elem = WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "h1.product-title-text"))
-                )
-                product_data["title"] = title_elem.text.strip()
-            except TimeoutException:
-                product_data["title"] = "Not Found"
+            title_selectors = ["h1.product-title-text"]
+            self.wait_for_any("aliexpress", "title", title_selectors)
+            product_data["title"] = self.select("aliexpress", "title", title_selectors)
 
             # Price
-            try:
-                price_elem = self.driver.find_element(By.CSS_SELECTOR, "div.product-price-current")
-                product_data["price"] = price_elem.text.strip()
-            except NoSuchElementException:
-                try:
-                    price_elem = self.driver.find_element(By.CSS_SELECTOR, "span.price")
-                    product_data["price"] = price_elem.text.strip()
-                except NoSuchElementException:
-                    product_data["price"] = "Not Found"
+            product_data["price"] = self.select("aliexpress", "price", ["div.product-price-current", "span.price"])
 
             # Discount
-            try:
-                discount_elem = self.driver.find_element(By.CSS_SELECTOR, "span.price-discount-percentage")
-                product_data["discount"] = discount_elem.text.strip()
-            except NoSuchElementException:
-                product_data["discount"] = "0%"
+            product_data["discount"] = self.select("aliexpress", "discount", ["span.price-discount-percentage"], default="0%")
 
             # Rating
-            try:
-                rating_elem = self.driver.find_element(By.CSS_SELECTOR, "span.overview-rating-average")
-                product_data["rating"] = rating_elem.text.strip()
-            except NoSuchElementException:
-                product_data["rating"] = "Not Found"
+            product_data["rating"] = self.select("aliexpress", "rating", ["span.overview-rating-average"])
 
             # Reviews count
-            try:
-                reviews_elem = self.driver.find_element(By.CSS_SELECTOR, "span.product-reviewer-reviews")
-                reviews_text = reviews_elem.text.strip()
-                product_data["reviews"] = reviews_text.split(" ")[0]
-            except NoSuchElementException:
-                product_data["reviews"] = "0"
+            product_data["reviews"] = self.select(
+                "aliexpress", "reviews", ["span.product-reviewer-reviews"],
+                extract=lambda elem, selector: elem.text.strip().split(" ")[0], default="0",
+            )
                 
         except Exception as e:
-            self.logger.error(f"Error parsing AliExpress product: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error parsing AliExpress product: {str(e)}", exc_info=True)
             return None
             
         return product_data
@@ -531,7 +532,7 @@ class EcommerceScraper:
         results = []
         try:
             # Wait for search results
-            WebDriverWait(self.driver, 15).until(
+            WebDriverWait(self.driver, self.config.explicit_wait).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "div[data-product-id]"))
             )
             
@@ -540,8 +541,10 @@ class EcommerceScraper:
             
             for elem in items[:10]:
                 try:
-                    title = elem.find_element(By.CSS_SELECTOR, "a._3t7zg._2f4Ho").text
                     link = elem.find_element(By.CSS_SELECTOR, "a._3t7zg._2f4Ho").get_attribute("href")
+                    if not self.frontier.admit(link, "aliexpress"):
+                        continue
+                    title = elem.find_element(By.CSS_SELECTOR, "a._3t7zg._2f4Ho").text
                     
                     try:
                         price = elem.find_element(By.CSS_SELECTOR, "span._12A8D").text
@@ -576,9 +579,7 @@ class EcommerceScraper:
         except TimeoutException:
             self.logger.warning("AliExpress search results not found or took too long to load")
         except Exception as e:
-            self.logger.error(f"Error processing AliExpress search results: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error processing AliExpress search results: {str(e)}", exc_info=True)
             
         return results
 
@@ -587,48 +588,28 @@ class EcommerceScraper:
         product_data = {"platform": "jumia", "url": self.driver.current_url}
         try:
             # Title
-            try:
-                title_elem = WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "h1.-fs20.-pts.-pbxs"))
-                )
-                product_data["title"] = title_elem.text.strip()
-            except TimeoutException:
-                product_data["title"] = "Not Found"
+            title_selectors = ["h1.-fs20.-pts.-pbxs"]
+            self.wait_for_any("jumia", "title", title_selectors)
+            product_data["title"] = self.select("jumia", "title", title_selectors)
 
             # Price
-            try:
-                price_elem = self.driver.find_element(By.CSS_SELECTOR, "span.-b.-ltr.-tal.-fs24")
-                product_data["price"] = price_elem.text.strip()
-            except NoSuchElementException:
-                product_data["price"] = "Not Found"
+            product_data["price"] = self.select("jumia", "price", ["span.-b.-ltr.-tal.-fs24"])
 
             # Discount
-            try:
-                discount_elem = self.driver.find_element(By.CSS_SELECTOR, "span.bdg._dsct._dyn.-mls")
-                product_data["discount"] = discount_elem.text.strip()
-            except NoSuchElementException:
-                product_data["discount"] = "0%"
+            product_data["discount"] = self.select("jumia", "discount", ["span.bdg._dsct._dyn.-mls"], default="0%")
 
             # Rating
-            try:
-                rating_elem = self.driver.find_element(By.CSS_SELECTOR, "div.stars._m._al")
-                rating_text = rating_elem.get_attribute("style")
-                match = re.search(r"width:\s*(\d+)%", rating_text)
-                product_data["rating"] = str(int(match.group(1)) / 20) if match else "Not Found"
-            except NoSuchElementException:
-                product_data["rating"] = "Not Found"
+            def star_width_rating(elem, selector):
+                match = re.search(r"width:\s*(\d+)%", elem.get_attribute("style") or "")
+                return str(int(match.group(1)) / 20) if match else None
+
+            product_data["rating"] = self.select("jumia", "rating", ["div.stars._m._al"], extract=star_width_rating)
 
             # Reviews count
-            try:
-                reviews_elem = self.driver.find_element(By.CSS_SELECTOR, "a.-plxs._more")
-                product_data["reviews"] = reviews_elem.text.split(" ")[0]
-            except NoSuchElementException:
-                product_data["reviews"] = "0"
+            product_data["reviews"] = self.select("jumia", "reviews", ["a.-plxs._more"], extract=first_word, default="0")
                 
         except Exception as e:
-            self.logger.error(f"Error parsing Jumia product: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error parsing Jumia product: {str(e)}", exc_info=True)
             return None
             
         return product_data
@@ -637,7 +618,7 @@ class EcommerceScraper:
         results = []
         try:
             # Wait for search results
-            WebDriverWait(self.driver, 15).until(
+            WebDriverWait(self.driver, self.config.explicit_wait).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "article.prd._fb.col.c-prd"))
             )
             
@@ -646,8 +627,10 @@ class EcommerceScraper:
             
             for elem in items[:10]:
                 try:
-                    title = elem.find_element(By.CSS_SELECTOR, "h3.name").text
                     link = elem.find_element(By.CSS_SELECTOR, "a.core").get_attribute("href")
+                    if not self.frontier.admit(link, "jumia"):
+                        continue
+                    title = elem.find_element(By.CSS_SELECTOR, "h3.name").text
                     
                     try:
                         price = elem.find_element(By.CSS_SELECTOR, "div.prc").text
@@ -682,14 +665,12 @@ class EcommerceScraper:
         except TimeoutException:
             self.logger.warning("Jumia search results not found or took too long to load")
         except Exception as e:
-            self.logger.error(f"Error processing Jumia search results: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
+            self.logger.error(f"Error processing Jumia search results: {str(e)}", exc_info=True)
             
         return results
 
 
 if __name__ == "__main__":
-    scraper = EcommerceScraper(headless=True)
+    scraper = EcommerceScraper()
     data = scraper.scrape_all_products()
     print(f"Scraped {len(data)} products")
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Per-selector hit statistics for self-tuning extraction.
+
+Every lookup of a (platform, field) candidate selector is recorded as a hit
+(it produced a value) or a miss, with its latency. Candidates are then tried
+best first: by smoothed hit rate, then by mean latency, then in their listed
+order. A selector that has not matched for `demote_after_runs` runs is moved
+behind every other candidate; it is still tried last, so it can recover if
+the page layout changes back. Counts are persisted in data/selector_stats.json
+and merged on save, so concurrent scrapers (shards, queue workers) add up.
+"""
+import os
+import json
+import logging
+import threading
+
+
+class SelectorStats:
+    def __init__(self, stats_file="data/selector_stats.json", demote_after_runs=5):
+        self.stats_file = stats_file
+        self.demote_after_runs = demote_after_runs
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.stats = self.load()
+        self.run = self.stats['runs'] + 1
+        self.deltas = {}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.selector_stats.stats_file, config.selector_stats.demote_after_runs)
+
+    def load(self):
+        if os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                self.logger.error(f"Error reading selector stats {self.stats_file}: {str(e)}")
+        return {'runs': 0, 'selectors': {}}
+
+    @staticmethod
+    def key(platform, field, selector):
+        return f"{platform}|{field}|{selector}"
+
+    def entry(self, key):
+        """Persisted counts plus this run's, without the lock (read-mostly, slight staleness is fine)"""
+        saved = self.stats['selectors'].get(key)
+        delta = self.deltas.get(key)
+        if saved is None or delta is None:
+            return saved or delta
+        return merge_entry(saved, delta)
+
+    def order(self, platform, field, candidates):
+        """Candidates sorted best first"""
+        def rank(position):
+            entry = self.entry(self.key(platform, field, candidates[position]))
+            if entry is None:
+                # Untried: behind proven selectors, ahead of ones that keep missing
+                return (False, -0.5, 0.0, position)
+            tries = entry['hits'] + entry['misses']
+            demoted = self.run - entry.get('last_hit_run', entry['first_run']) >= self.demote_after_runs
+            hit_rate = (entry['hits'] + 1) / (tries + 2)
+            mean_ms = entry['total_ms'] / tries if tries else 0.0
+            return (demoted, -hit_rate, mean_ms, position)
+        return [candidates[position] for position in sorted(range(len(candidates)), key=rank)]
+
+    def record(self, platform, field, selector, hit, seconds):
+        key = self.key(platform, field, selector)
+        with self.lock:
+            delta = self.deltas.setdefault(key, {'hits': 0, 'misses': 0, 'total_ms': 0.0, 'first_run': self.run})
+            delta['hits' if hit else 'misses'] += 1
+            delta['total_ms'] += seconds * 1000
+            if hit:
+                delta['last_hit_run'] = self.run
+
+    def save(self):
+        """Add this run's counts to the persisted ones"""
+        with self.lock:
+            stats = self.load()
+            for key, delta in self.deltas.items():
+                saved = stats['selectors'].get(key)
+                stats['selectors'][key] = delta if saved is None else merge_entry(saved, delta)
+            stats['runs'] = max(stats['runs'], self.run)
+            os.makedirs(os.path.dirname(self.stats_file) or '.', exist_ok=True)
+            tmp_file = f"{self.stats_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(stats, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.stats_file)
+            self.stats = stats
+            self.deltas = {}
+
+
+def merge_entry(saved, delta):
+    merged = {
+        'hits': saved['hits'] + delta['hits'],
+        'misses': saved['misses'] + delta['misses'],
+        'total_ms': saved['total_ms'] + delta['total_ms'],
+        'first_run': min(saved['first_run'], delta['first_run']),
+    }
+    last_hits = [entry['last_hit_run'] for entry in (saved, delta) if 'last_hit_run' in entry]
+    if last_hits:
+        merged['last_hit_run'] = max(last_hits)
+    return merged
@@ -0,0 +1,256 @@
+"""
+Memory-mapped columnar price series, one contiguous segment per product.
+
+Observation times (int64 nanoseconds) and prices (float32) live in two flat
+binary files under data/series/; every product owns a segment of each, kept
+sorted by time. An offset index (keys sorted, with each segment's start,
+length and capacity plus the product's ID and latest title) is stored next
+to them, so one product's series is a zero-copy slice of the memory-mapped
+files instead of a parse of the whole history CSV.
+
+Segments are allocated with spare capacity (a power of two) and appends fill
+it in place; a segment that runs out is moved to the end of the files with
+double the capacity. Data is always written before the index, and appends
+only write past a segment's committed length, so readers and a crash midway
+never see a partial series. When moved-out segments waste more than half the
+files, they are rewritten compactly as a new generation of files, and the
+previous generation's files are deleted. Within one process, writers and
+readers therefore hold SeriesStore.lock, so a compaction can't remove the
+files a reader is still using.
+
+Rows are screened like the charts screen the history: observations flagged
+as anomalies, and scrape errors and outliers found by the configured
+anomaly detection, are left out.
+"""
+import os
+import glob
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.anomaly import excluded_rows
+from src.config import get_config
+from src.identity import UNIDENTIFIED_KEY
+from src.rollups import parse_price_series
+
+MIN_CAPACITY = 16
+
+
+def segment_capacity(lengths):
+    """Smallest power of two above each length, at least MIN_CAPACITY"""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    capacity = np.left_shift(1, np.ceil(np.log2(lengths + 1)).astype(np.int64))
+    return np.maximum(capacity, MIN_CAPACITY)
+
+
+class SeriesStore:
+    # Held while writing the store, and while reading it in a process that also writes it
+    lock = threading.RLock()
+
+    def __init__(self, series_dir="data/series"):
+        self.series_dir = series_dir
+        self.index_file = os.path.join(series_dir, 'index.npz')
+        self.logger = logging.getLogger(__name__)
+        self.index = None
+        self.timestamps = None
+        self.prices = None
+
+    def exists(self):
+        return os.path.exists(self.index_file)
+
+    def data_files(self, generation):
+        return (os.path.join(self.series_dir, f'timestamps_{generation}.i8'),
+                os.path.join(self.series_dir, f'prices_{generation}.f4'))
+
+    def open(self):
+        """Load the offset index and map the column files read-only"""
+        with np.load(self.index_file) as data:
+            self.index = {name: data[name] for name in data.files}
+        used = int(self.index['used'])
+        times_file, prices_file = self.data_files(int(self.index['generation']))
+        if used:
+            self.timestamps = np.memmap(times_file, dtype=np.int64, mode='r', shape=(used,))
+            self.prices = np.memmap(prices_file, dtype=np.float32, mode='r', shape=(used,))
+        else:
+            self.timestamps, self.prices = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return self
+
+    def __len__(self):
+        return len(self.index['keys'])
+
+    def products(self):
+        """(product_key, product_id, title) of every stored product"""
+        return zip(self.index['keys'].tolist(), self.index['product_ids'].tolist(), self.index['titles'].tolist())
+
+    def series(self, product_key):
+        """Zero-copy views of one product's (timestamps as datetime64[ns], float32 prices)"""
+        keys = self.index['keys']
+        position = np.searchsorted(keys, product_key)
+        if position == len(keys) or keys[position] != product_key:
+            return np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=np.float32)
+        start = int(self.index['starts'][position])
+        end = start + int(self.index['lengths'][position])
+        return self.timestamps[start:end].view('datetime64[ns]'), self.prices[start:end]
+
+    def columns(self, df):
+        """Screened rows of df as (keys, times, prices, product_ids, titles), sorted by key and time"""
+        if 'price_numeric' not in df.columns:
+            df = df.assign(price_numeric=parse_price_series(df['price']))
+        df = df[~excluded_rows(df, get_config()) & (df['product_key'] != UNIDENTIFIED_KEY)]
+
+        keys = df['product_key'].to_numpy(dtype=np.int64)
+        times = pd.to_datetime(df['scraped_at'], format='ISO8601').to_numpy(dtype='datetime64[ns]').view(np.int64)
+        prices = df['price_numeric'].to_numpy(dtype=np.float32, na_value=np.nan)
+        product_ids = (df['product_id'] if 'product_id' in df.columns else df['product_key']).astype(str).to_numpy()
+        titles = df['title'].astype(str).to_numpy()
+
+        order = np.lexsort((times, keys))
+        return keys[order], times[order], prices[order], product_ids[order], titles[order]
+
+    def rebuild(self, history_df):
+        """Rewrite the store from the full history"""
+        keys, times, prices, product_ids, titles = self.columns(history_df)
+        self.write_generation(keys, times, prices, product_ids, titles)
+        self.logger.info(f"Rebuilt price series for {len(self)} products from {len(keys)} observations")
+        return self
+
+    def append(self, new_df):
+        """Add new observations to their products' segments"""
+        if not self.exists():
+            return self.rebuild(new_df)
+        keys, times, prices, product_ids, titles = self.columns(new_df)
+        self.open()
+        if not len(keys):
+            return self
+
+        # Products seen for the first time get an empty entry to grow into
+        index = {name: self.index[name].copy() for name in ('keys', 'starts', 'lengths', 'capacities')}
+        # Text columns as objects so a longer title isn't cut to the stored array's width
+        index.update({name: self.index[name].astype(object) for name in ('product_ids', 'titles')})
+        unique_keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        new_keys = unique_keys[~np.isin(unique_keys, index['keys'])]
+        if len(new_keys):
+            empty = np.zeros(len(new_keys), dtype=np.int64)
+            additions = {'keys': new_keys, 'starts': empty, 'lengths': empty, 'capacities': empty,
+                         'product_ids': product_ids[first][np.isin(unique_keys, new_keys)],
+                         'titles': titles[first][np.isin(unique_keys, new_keys)]}
+            index = {name: np.concatenate([index[name], additions[name]]) for name in index}
+            order = np.argsort(index['keys'], kind='stable')
+            index = {name: values[order] for name, values in index.items()}
+        positions = np.searchsorted(index['keys'], unique_keys)
+
+        # Segments without room move to the end of the files with doubled capacity
+        old_starts = index['starts'][positions]
+        lengths = index['lengths'][positions]
+        needed = lengths + counts
+        moved = needed > index['capacities'][positions]
+        used = int(self.index['used'])
+        new_capacities = segment_capacity(needed[moved])
+        new_starts = used + np.cumsum(new_capacities) - new_capacities
+        used += int(new_capacities.sum())
+
+        generation = int(self.index['generation'])
+        timestamps, prices_map = self.map_for_write(generation, used)
+        for old_start, new_start, length in zip(old_starts[moved], new_starts, lengths[moved]):
+            if length:
+                timestamps[new_start:new_start + length] = timestamps[old_start:old_start + length]
+                prices_map[new_start:new_start + length] = prices_map[old_start:old_start + length]
+        starts = old_starts.copy()
+        starts[moved] = new_starts
+        index['starts'][positions] = starts
+        index['capacities'][positions[moved]] = new_capacities
+
+        # Scatter each product's rows right after its stored ones
+        destinations = np.repeat(starts + lengths - first, counts) + np.arange(len(keys))
+        previous_last = np.where(lengths > 0, timestamps[np.maximum(starts + lengths - 1, 0)], np.iinfo(np.int64).min)
+        timestamps[destinations] = times
+        prices_map[destinations] = prices
+        # Late observations (e.g. merged from another shard) keep their segment sorted
+        late = times[first] < previous_last
+        for start, length in zip(starts[late], needed[late]):
+            order = np.argsort(timestamps[start:start + length], kind='stable')
+            timestamps[start:start + length] = timestamps[start:start + length][order]
+            prices_map[start:start + length] = prices_map[start:start + length][order]
+        timestamps.flush()
+        prices_map.flush()
+        del timestamps, prices_map
+
+        index['lengths'][positions] = needed
+        # A product's title follows its newest observation
+        newest = times[first + counts - 1] >= previous_last
+        index['titles'][positions[newest]] = titles[(first + counts - 1)[newest]]
+        self.save_index(generation, used, index)
+        self.open()
+
+        if used > 2 * int(index['capacities'].sum()):
+            self.compact()
+        return self
+
+    def compact(self):
+        """Rewrite the live segments contiguously as a new generation of files"""
+        lengths = self.index['lengths']
+        keys = np.repeat(self.index['keys'], lengths)
+        rows = np.concatenate([np.arange(start, start + length) for start, length in zip(self.index['starts'], lengths)]) \
+            if len(lengths) else np.empty(0, dtype=np.int64)
+        times, prices = np.asarray(self.timestamps[rows]), np.asarray(self.prices[rows])
+        # One row per product is enough to carry its ID and title into the new index
+        product_ids = np.repeat(self.index['product_ids'], lengths)
+        titles = np.repeat(self.index['titles'], lengths)
+        self.write_generation(keys, times, prices, product_ids, titles)
+        self.logger.info(f"Compacted price series into {int(self.index['used'])} slots")
+
+    def map_for_write(self, generation, used):
+        """Grow the column files to `used` slots and map them for writing"""
+        maps = []
+        for path, dtype in zip(self.data_files(generation), (np.int64, np.float32)):
+            with open(path, 'r+b') as f:
+                f.truncate(used * np.dtype(dtype).itemsize)
+            maps.append(np.memmap(path, dtype=dtype, mode='r+', shape=(used,)))
+        return maps
+
+    def write_generation(self, keys, times, prices, product_ids, titles):
+        """Write sorted rows into fresh files with spare capacity per product, then switch the index over"""
+        generation = 0
+        if self.exists():
+            with np.load(self.index_file) as data:
+                generation = int(data['generation']) + 1
+        unique_keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        capacities = segment_capacity(counts)
+        starts = np.cumsum(capacities) - capacities
+        used = int(capacities.sum())
+
+        os.makedirs(self.series_dir, exist_ok=True)
+        for path in self.data_files(generation):
+            open(path, 'wb').close()
+        if used:
+            timestamps, prices_map = self.map_for_write(generation, used)
+            destinations = np.repeat(starts - first, counts) + np.arange(len(keys))
+            timestamps[destinations] = times
+            prices_map[destinations] = prices
+            timestamps.flush()
+            prices_map.flush()
+            del timestamps, prices_map
+
+        self.save_index(generation, used, {
+            'keys': unique_keys,
+            'starts': starts,
+            'lengths': counts.astype(np.int64),
+            'capacities': capacities,
+            # Rows are sorted by time, so a product's last row has its latest title
+            'product_ids': product_ids[first + counts - 1] if len(keys) else np.empty(0, dtype=str),
+            'titles': titles[first + counts - 1] if len(keys) else np.empty(0, dtype=str),
+        })
+        current = set(self.data_files(generation))
+        for path in glob.glob(os.path.join(self.series_dir, 'timestamps_*.i8')) + \
+                glob.glob(os.path.join(self.series_dir, 'prices_*.f4')):
+            if path not in current:
+                os.remove(path)
+        self.open()
+
+    def save_index(self, generation, used, index):
+        tmp_file = f"{self.index_file}.tmp.npz"
+        index = {name: values.astype(str) if values.dtype == object else values for name, values in index.items()}
+        np.savez(tmp_file, generation=np.int64(generation), used=np.int64(used), **index)
+        os.replace(tmp_file, self.index_file)
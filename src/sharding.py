@@ -0,0 +1,188 @@
+"""
+Deterministic sharding of the product catalog across scraper nodes.
+
+URLs are placed on a consistent-hash ring keyed by their canonical form, so
+`--shard i/N` needs no coordination and growing the fleet from N to N+1 nodes
+moves only about 1/(N+1) of the URLs. Placement uses consistent hashing with
+bounded loads: each shard has a capacity of (1 + epsilon) times its fair share
+of the measured scrape cost, and a URL whose ring owner is full moves on to
+the next shard clockwise.
+
+Costs come from per-URL timings the scraper records in data/url_costs.json,
+but that file changes after every run and differs between nodes, and nodes
+that balance on different costs disagree about which URLs they own. So
+placement only balances on a frozen cost snapshot (`python -m src.sharding
+freeze`), copied to every node and selected by its version with
+--cost-version. Without a version every node uses the plain consistent-hash
+ring, which they all compute the same way; a node given a version it doesn't
+have refuses to start rather than split the catalog its own way.
+"""
+import os
+import sys
+import json
+import bisect
+import hashlib
+import logging
+
+from src.urls import canonical_url
+
+VIRTUAL_NODES = 128
+LOAD_EPSILON = 0.25
+# Weight of a new timing in the per-URL cost moving average
+COST_SMOOTHING = 0.3
+COST_SNAPSHOT_FILE = "data/url_costs_snapshot.json"
+
+
+def stable_hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def parse_shard(value):
+    """Parse "i/N" into (i, N) with 0 <= i < N"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be between 0 and {count - 1}, got {value!r}")
+    return index, count
+
+
+class UrlCostStore:
+    """Smoothed scrape duration (seconds) per canonical URL"""
+    def __init__(self, cost_file="data/url_costs.json"):
+        self.cost_file = cost_file
+        self.logger = logging.getLogger(__name__)
+        self.costs = {}
+        if os.path.exists(cost_file):
+            try:
+                with open(cost_file, 'r') as f:
+                    self.costs = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                self.logger.error(f"Could not read URL costs {cost_file}: {e}")
+        # A frozen snapshot holds {"version": ..., "costs": {...}}
+        self.frozen_version = None
+        if isinstance(self.costs.get('costs'), dict):
+            self.frozen_version = self.costs.get('version')
+            self.costs = self.costs['costs']
+
+    def version(self):
+        """Content hash of the costs, so nodes can check they balance on the same numbers"""
+        return hashlib.blake2b(json.dumps(self.costs, sort_keys=True).encode('utf-8'), digest_size=6).hexdigest()
+
+    def freeze(self, snapshot_file=COST_SNAPSHOT_FILE):
+        """Write the current costs as a versioned snapshot for every node to share; returns the version"""
+        version = self.version()
+        os.makedirs(os.path.dirname(snapshot_file) or '.', exist_ok=True)
+        tmp_file = f"{snapshot_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': version, 'costs': self.costs}, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, snapshot_file)
+        return version
+
+    def cost(self, url, default=None):
+        return self.costs.get(canonical_url(url), default)
+
+    def default_cost(self):
+        """Median of the known costs, used for URLs that were never timed"""
+        if not self.costs:
+            return 1.0
+        values = sorted(self.costs.values())
+        return values[len(values) // 2]
+
+    def record(self, url, seconds):
+        key = canonical_url(url)
+        previous = self.costs.get(key)
+        self.costs[key] = seconds if previous is None else previous + COST_SMOOTHING * (seconds - previous)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cost_file) or '.', exist_ok=True)
+        tmp_file = f"{self.cost_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.costs, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.cost_file)
+
+
+class ShardRing:
+    def __init__(self, shard_count, virtual_nodes=VIRTUAL_NODES, epsilon=LOAD_EPSILON):
+        self.shard_count = shard_count
+        self.epsilon = epsilon
+        points = sorted(
+            (stable_hash(f"shard-{shard}#{vnode}"), shard)
+            for shard in range(shard_count) for vnode in range(virtual_nodes)
+        )
+        self.points = [point for point, _ in points]
+        self.owners = [shard for _, shard in points]
+
+    def assign(self, product_urls, costs=None):
+        """Split {platform: [urls]} into one {platform: [urls]} per shard
+
+        With `costs` (a UrlCostStore every node shares) loads are bounded by
+        cost; without, every URL goes to its ring owner.
+        """
+        default = costs.default_cost() if costs is not None else 1.0
+        entries = []
+        for platform, urls in product_urls.items():
+            for url in urls:
+                cost = costs.cost(url, default) if costs is not None else 1.0
+                entries.append((stable_hash(canonical_url(url)), platform, url, cost))
+
+        if costs is None:
+            capacity = float('inf')
+        else:
+            capacity = (1 + self.epsilon) * sum(cost for *_, cost in entries) / self.shard_count
+        loads = [0.0] * self.shard_count
+        shards = [{platform: [] for platform in product_urls} for _ in range(self.shard_count)]
+
+        # Ring order makes the bounded-load spill-over deterministic on every node
+        for point, platform, url, cost in sorted(entries):
+            shard = self.place(point, cost, loads, capacity)
+            loads[shard] += cost
+            shards[shard][platform].append(url)
+        return shards
+
+    def place(self, point, cost, loads, capacity):
+        """First shard clockwise from `point` with room for `cost`, else the least loaded"""
+        position = bisect.bisect_left(self.points, point)
+        seen = set()
+        for step in range(len(self.points)):
+            shard = self.owners[(position + step) % len(self.points)]
+            if shard in seen:
+                continue
+            if loads[shard] + cost <= capacity or loads[shard] == 0:
+                return shard
+            seen.add(shard)
+            if len(seen) == self.shard_count:
+                break
+        return min(range(self.shard_count), key=lambda s: loads[s])
+
+
+def load_cost_snapshot(cost_version, snapshot_file=COST_SNAPSHOT_FILE):
+    """The frozen costs with version `cost_version`; None without a version.
+
+    A missing or different snapshot raises ValueError instead of falling back,
+    since this node would then split the catalog differently from the others.
+    """
+    if not cost_version:
+        return None
+    if not os.path.exists(snapshot_file):
+        raise ValueError(f"Cost snapshot {snapshot_file} not found; copy it from the node that froze it")
+    costs = UrlCostStore(snapshot_file)
+    if costs.frozen_version != cost_version or costs.version() != cost_version:
+        raise ValueError(f"Cost snapshot {snapshot_file} is version {costs.frozen_version}, not {cost_version}")
+    return costs
+
+
+def shard_product_urls(product_urls, shard_index, shard_count, cost_version=None, snapshot_file=COST_SNAPSHOT_FILE):
+    """The part of the catalog that belongs to shard `shard_index` of `shard_count`"""
+    costs = load_cost_snapshot(cost_version, snapshot_file)
+    shards = ShardRing(shard_count).assign(product_urls, costs)
+    return {platform: urls for platform, urls in shards[shard_index].items() if urls}
+
+
+if __name__ == "__main__":
+    # Freeze this node's measured costs for the fleet: python -m src.sharding freeze
+    if sys.argv[1:] != ['freeze']:
+        sys.exit("usage: python -m src.sharding freeze")
+    version = UrlCostStore().freeze()
+    print(f"Wrote {COST_SNAPSHOT_FILE} version {version}; copy it to every node and run them with --cost-version {version}")
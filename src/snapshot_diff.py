@@ -0,0 +1,259 @@
+"""
+Run-to-run snapshot diff.
+
+Compares the current products_<timestamp>.csv snapshot with the previous one
+and reports new and removed products, price increases and decreases, and
+discounts that appeared. Rows are joined on their product identity (ASIN,
+eBay item ID, ... or the canonical URL), hashed to 64 bits. The exporter
+writes that identity into the snapshot's product_id column, so the diff only
+hashes it; for older snapshots without the column it is extracted once per
+distinct URL. Rows without an identity (e.g. search cards whose link fell
+back to the results page) can't be matched between runs and are only
+counted.
+
+Prices and discounts are compared as text first; only rows whose text
+differs, plus new and removed ones, are parsed.
+
+Both snapshots are read in chunks and every chunk is split by key hash into
+partitions, so a partition holds all rows of its keys from both sides. Each
+partition is then joined on its own with a vectorized hash join (pandas
+merge). Small snapshots use a single in-memory partition; larger ones spill
+their partitions to a temporary directory, which bounds memory by the
+partition size rather than the snapshot size.
+
+Changed rows are written to data/diffs/changes<suffix>_<timestamp>.csv and
+the counts appended to data/diffs/summary.jsonl.
+
+    python -m src.snapshot_diff previous.csv current.csv
+"""
+import os
+import re
+import sys
+import json
+import math
+import shutil
+import logging
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.urls import extract_product_id
+from src.rollups import parse_price_series, parse_discount_series
+
+CHUNK_ROWS = 200_000
+# Snapshot bytes per partition; both sides of a partition are held in memory at once
+PARTITION_BYTES = 128 * 1024 * 1024
+CHANGE_TYPES = ['new', 'removed', 'price_up', 'price_down', 'new_discount']
+SNAPSHOT_COLUMNS = ['product_id', 'platform', 'title', 'url', 'price', 'discount']
+CHANGE_COLUMNS = ['change', 'product_id', 'platform', 'title', 'url', 'old_price', 'new_price',
+                  'price_change_pct', 'old_discount', 'new_discount']
+
+
+def product_ids(urls, platforms):
+    """extract_product_id for every row, computed once per distinct (url, platform)"""
+    codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([pd.Series(urls, dtype=object).fillna(''),
+                                                             pd.Series(platforms, dtype=object).fillna('')]))
+    ids = np.array([extract_product_id(url, platform) or '' for url, platform in pairs], dtype=object)
+    return ids[codes]
+
+
+def with_product_ids(df):
+    """A snapshot frame with the product_id column the diff joins on; '' where a row has none"""
+    return df.assign(product_id=product_ids(df['url'], df['platform']))
+
+
+def parse_repeated(values, parse):
+    """Apply a vectorized parser to each distinct value once"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return parse(pd.Series(uniques, dtype=object)).to_numpy(dtype=float)[codes]
+
+
+def prepare(chunk):
+    """Key and the raw fields of a snapshot chunk's identified rows"""
+    # Snapshots carry their product IDs; older ones without the column get them extracted here
+    ids = chunk['product_id'].to_numpy(dtype=object) if 'product_id' in chunk.columns \
+        else product_ids(chunk['url'], chunk['platform'])
+    # Search cards without a product link and rows without a URL can't be matched between runs
+    identified = ids != ''
+    chunk, ids = chunk[identified], ids[identified]
+    return pd.DataFrame({
+        'key': pd.util.hash_array(ids),
+        'product_id': ids,
+        'platform': chunk['platform'].to_numpy(),
+        'title': chunk['title'].to_numpy(),
+        'url': chunk['url'].to_numpy(),
+        'price': chunk['price'].to_numpy(),
+        'discount': chunk['discount'].to_numpy(),
+    }), int((~identified).sum())
+
+
+def compare(previous, current):
+    """Changed rows between two prepared frames holding the same keys' partition"""
+    # A product listed twice in one snapshot counts once, as its last row
+    previous = previous.drop_duplicates('key', keep='last')
+    current = current.drop_duplicates('key', keep='last')
+    joined = previous.merge(current, on='key', how='outer', suffixes=('_old', '_new'), indicator=True)
+
+    in_old = joined['_merge'] != 'right_only'
+    in_new = joined['_merge'] != 'left_only'
+    # A price or discount can only have changed where its text did, so only those rows get parsed
+    retyped = (joined['price_old'] != joined['price_new']) | (joined['discount_old'] != joined['discount_new'])
+    joined = joined[~(in_old & in_new) | retyped].reset_index(drop=True)
+    in_old = joined['_merge'] != 'right_only'
+    in_new = joined['_merge'] != 'left_only'
+    for column in ['price_old', 'price_new']:
+        joined[column] = parse_repeated(joined[column], parse_price_series)
+    for column in ['discount_old', 'discount_new']:
+        # Left empty on the side a new or removed product is missing from
+        joined[column] = pd.Series(parse_repeated(joined[column], parse_discount_series)).where(joined[column].notna())
+    old_price, new_price = joined['price_old'], joined['price_new']
+    both_priced = in_old & in_new & old_price.notna() & new_price.notna()
+    # Float noise from formatting shouldn't count as a price change
+    moved = both_priced & ~np.isclose(old_price.fillna(0), new_price.fillna(0), rtol=1e-9, atol=0.005)
+    old_discount, new_discount = joined['discount_old'].fillna(0), joined['discount_new'].fillna(0)
+
+    # One row per product and change, so a price drop that comes with a new discount is listed under both
+    masks = {
+        'new': ~in_old,
+        'removed': ~in_new,
+        'price_up': moved & (new_price > old_price),
+        'price_down': moved & (new_price < old_price),
+        'new_discount': in_old & in_new & (new_discount > 0) & (old_discount <= 0),
+    }
+    rows = np.concatenate([np.flatnonzero(mask.to_numpy()) for mask in masks.values()])
+    change = np.repeat(list(masks), [int(mask.sum()) for mask in masks.values()])
+    changed = joined.iloc[rows].reset_index(drop=True)
+
+    def side(name):
+        # Fields shown for a change come from the current row, or the previous one if it was removed
+        return changed[f'{name}_new'].where(changed['_merge'] != 'left_only', changed[f'{name}_old'])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = (changed['price_new'] - changed['price_old']) / changed['price_old'] * 100
+    return pd.DataFrame({
+        'change': change,
+        'product_id': side('product_id'),
+        'platform': side('platform'),
+        'title': side('title'),
+        'url': side('url'),
+        'old_price': changed['price_old'],
+        'new_price': changed['price_new'],
+        'price_change_pct': percent.replace([np.inf, -np.inf], np.nan).round(2),
+        'old_discount': changed['discount_old'],
+        'new_discount': changed['discount_new'],
+    })[CHANGE_COLUMNS]
+
+
+class SnapshotDiff:
+    def __init__(self, output_dir="data/diffs", chunk_rows=CHUNK_ROWS, partition_bytes=PARTITION_BYTES):
+        self.output_dir = output_dir
+        self.chunk_rows = chunk_rows
+        self.partition_bytes = partition_bytes
+        self.unidentified = 0
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def previous_snapshot(current_file):
+        """The newest snapshot older than current_file from the same node (same shard suffix)"""
+        directory, name = os.path.split(current_file)
+        match = re.match(r'^(products.*?)_(\d{8}_\d{6})\.csv$', name)
+        if not match:
+            return None
+        prefix, timestamp = match.groups()
+        pattern = re.compile(rf'^{re.escape(prefix)}_(\d{{8}}_\d{{6}})\.csv$')
+        older = sorted(
+            (found.group(1), entry) for entry in os.listdir(directory or '.')
+            if (found := pattern.match(entry)) and found.group(1) < timestamp
+        )
+        return os.path.join(directory, older[-1][1]) if older else None
+
+    def partitions(self, path, partition_count, spill_dir, side):
+        """Prepared rows of a snapshot split by key hash: per partition, a list of frames or spill files"""
+        parts = [[] for _ in range(partition_count)]
+        reader = pd.read_csv(path, usecols=lambda column: column in SNAPSHOT_COLUMNS,
+                             dtype=str, keep_default_na=False, chunksize=self.chunk_rows)
+        for number, chunk in enumerate(reader):
+            prepared, unidentified = prepare(chunk)
+            self.unidentified += unidentified
+            if partition_count == 1:
+                parts[0].append(prepared)
+                continue
+            partition = (prepared['key'].to_numpy() % np.uint64(partition_count)).astype(np.int64)
+            order = np.argsort(partition, kind='stable')
+            bounds = np.searchsorted(partition[order], np.arange(partition_count + 1))
+            for p in range(partition_count):
+                if bounds[p] == bounds[p + 1]:
+                    continue
+                spill_file = os.path.join(spill_dir, f"{side}_{p}_{number}.pkl")
+                prepared.iloc[order[bounds[p]:bounds[p + 1]]].to_pickle(spill_file)
+                parts[p].append(spill_file)
+        return parts
+
+    @staticmethod
+    def load_part(pieces):
+        frames = [piece if isinstance(piece, pd.DataFrame) else pd.read_pickle(piece) for piece in pieces]
+        if not frames:
+            return pd.DataFrame({'key': np.empty(0, dtype=np.uint64), **{c: [] for c in
+                                 ['product_id', 'platform', 'title', 'url', 'price', 'discount']}})
+        return pd.concat(frames, ignore_index=True)
+
+    def diff(self, previous_file, current_file):
+        """Changed rows between two snapshot files"""
+        size = os.path.getsize(previous_file) + os.path.getsize(current_file)
+        partition_count = max(1, math.ceil(size / self.partition_bytes))
+        spill_dir = tempfile.mkdtemp(prefix='snapshot-diff-') if partition_count > 1 else None
+        self.unidentified = 0
+        try:
+            old_parts = self.partitions(previous_file, partition_count, spill_dir, 'old')
+            new_parts = self.partitions(current_file, partition_count, spill_dir, 'new')
+            changes = [compare(self.load_part(old), self.load_part(new)) for old, new in zip(old_parts, new_parts)]
+        finally:
+            if spill_dir:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+        return pd.concat(changes, ignore_index=True)
+
+    def report(self, current_file, previous_file=None):
+        """Diff a snapshot against the previous one, write the changes file and return the summary counts"""
+        previous_file = previous_file or self.previous_snapshot(current_file)
+        if previous_file is None:
+            self.logger.info(f"No earlier snapshot to compare {current_file} with")
+            return None
+
+        started = datetime.now()
+        changes = self.diff(previous_file, current_file)
+        counts = changes['change'].value_counts()
+        summary = {
+            'previous': previous_file,
+            'current': current_file,
+            'compared_at': started.isoformat(),
+            'seconds': round((datetime.now() - started).total_seconds(), 3),
+            **{change: int(counts.get(change, 0)) for change in CHANGE_TYPES},
+            # Rows of either snapshot left out for lacking a product identity
+            'unidentified': self.unidentified,
+        }
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = os.path.basename(current_file).replace('products', 'changes', 1)
+        changes_file = os.path.join(self.output_dir, name)
+        tmp_file = f"{changes_file}.tmp"
+        changes.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, changes_file)
+        summary['changes_file'] = changes_file
+        with open(os.path.join(self.output_dir, 'summary.jsonl'), 'a') as f:
+            f.write(json.dumps(summary) + "\n")
+
+        self.logger.info(
+            "Snapshot changes: " + ", ".join(f"{summary[change]} {change}" for change in CHANGE_TYPES)
+            + f" ({changes_file}, {summary['seconds']:.2f}s)"
+        )
+        return summary
+
+
+if __name__ == "__main__":
+    # Compare two snapshot files by hand: python -m src.snapshot_diff previous.csv current.csv
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m src.snapshot_diff PREVIOUS.csv CURRENT.csv")
+    print(json.dumps(SnapshotDiff().report(sys.argv[2], previous_file=sys.argv[1]), indent=2))
@@ -0,0 +1,194 @@
+"""
+Tab multiplexing inside one Chrome instance.
+
+A TabPool keeps up to `tabs` pages loading at once in a single browser. Each
+tab is started on its URL without waiting for it (a script sets
+window.location), and the pool hands the tabs to the scraper in the order
+their URLs were planned. While one tab is being extracted, the next ones are
+already loading, so network wait overlaps with extraction. As soon as a tab
+is extracted it starts on the next pending URL.
+
+BrowserUsage measures what a mode costs: the browser's resident memory
+(Chrome and chromedriver processes together) sampled after every page, and
+the URLs scraped per minute. Each run appends one entry to
+data/browser_runs.jsonl, so tabs and separate browser processes can be
+compared on the same host.
+"""
+import os
+import json
+import time
+import socket
+import logging
+import itertools
+from collections import deque
+from datetime import datetime
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+try:
+    import psutil
+except ImportError:  # read /proc instead where it exists (Linux)
+    psutil = None
+
+# Set on the old document before navigating; the new document starts without it
+PENDING_MARK = "__pendingNavigation"
+
+
+def process_tree_rss(pid):
+    """Resident bytes of a process and all its descendants, or None if they can't be read"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            total = 0
+            for process in [root] + root.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            return total
+        except psutil.Error:
+            return None
+    if not os.path.isdir('/proc'):
+        return None
+
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; the parent PID follows its closing parenthesis
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    total, pending = 0, [pid]
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class BrowserUsage:
+    def __init__(self, driver, tabs=1, runs_file="data/browser_runs.jsonl"):
+        self.driver = driver
+        self.tabs = tabs
+        self.runs_file = runs_file
+        self.logger = logging.getLogger(__name__)
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.urls = 0
+        self.samples = []
+
+    def browser_pid(self):
+        try:
+            return self.driver.service.process.pid
+        except AttributeError:
+            return None
+
+    def page_done(self):
+        """Count a scraped URL and sample the browser's memory while its pages are open"""
+        self.urls += 1
+        pid = self.browser_pid()
+        rss = process_tree_rss(pid) if pid else None
+        if rss is not None:
+            self.samples.append(rss)
+
+    def report(self):
+        """Log and record URLs/min and memory per concurrent page for this run"""
+        seconds = time.perf_counter() - self.started
+        peak_mb = max(self.samples) / 2 ** 20 if self.samples else None
+        entry = {
+            'started_at': self.started_at.isoformat(),
+            'host': socket.gethostname(),
+            'mode': 'tabs' if self.tabs > 1 else 'single',
+            'tabs': self.tabs,
+            'urls': self.urls,
+            'seconds': round(seconds, 3),
+            'urls_per_min': round(self.urls / seconds * 60, 2) if seconds > 0 else 0.0,
+            'peak_rss_mb': round(peak_mb, 1) if peak_mb is not None else None,
+            'mean_rss_mb': round(sum(self.samples) / len(self.samples) / 2 ** 20, 1) if self.samples else None,
+            # The whole browser divided by the pages it keeps open at once
+            'mb_per_page': round(peak_mb / self.tabs, 1) if peak_mb is not None else None,
+        }
+        memory = (f", peak browser RSS {entry['peak_rss_mb']:.0f} MB ({entry['mb_per_page']:.0f} MB per page)"
+                  if peak_mb is not None else "")
+        self.logger.info(
+            f"Browser: {self.urls} URLs in {seconds:.1f}s with {self.tabs} tab(s), "
+            f"{entry['urls_per_min']:.1f} URLs/min{memory}"
+        )
+        try:
+            os.makedirs(os.path.dirname(self.runs_file) or '.', exist_ok=True)
+            with open(self.runs_file, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            self.logger.error(f"Error recording browser usage: {str(e)}")
+        return entry
+
+
+class TabPool:
+    def __init__(self, driver, tabs=2, load_timeout=10):
+        self.driver = driver
+        self.load_timeout = load_timeout
+        self.logger = logging.getLogger(__name__)
+        self.handles = [driver.current_window_handle]
+        for _ in range(tabs - 1):
+            driver.switch_to.new_window('tab')
+            self.handles.append(driver.current_window_handle)
+        self.idle = deque(self.handles)
+        # (tab handle, platform, url, load start) in the order the scraper gets them
+        self.loading = deque()
+        # perf_counter() when the URL now in front started loading, so its cost includes the load
+        self.started = None
+
+    def start(self, platform, url):
+        """Begin loading url in an idle tab without waiting for it"""
+        handle = self.idle.popleft()
+        self.driver.switch_to.window(handle)
+        self.driver.execute_script(f"window.{PENDING_MARK} = true; window.location.href = arguments[0];", url)
+        self.loading.append((handle, platform, url, time.perf_counter()))
+
+    def wait_for_navigation(self, url):
+        """Wait until the tab shows the new document rather than the one it navigated away from"""
+        try:
+            WebDriverWait(self.driver, self.load_timeout).until(
+                lambda driver: not driver.execute_script(f"return window.{PENDING_MARK} === true")
+            )
+        except TimeoutException:
+            # Extracting now would read the previous page; load it the blocking way instead
+            self.logger.warning(f"Navigation to {url} not started after {self.load_timeout}s, loading it directly")
+            self.driver.get(url)
+
+    def visit(self, jobs):
+        """Yield each (platform, url) of jobs with its tab in front, while the following URLs load"""
+        jobs = iter(jobs)
+        for platform, url in itertools.islice(jobs, len(self.handles)):
+            self.start(platform, url)
+        while self.loading:
+            handle, platform, url, self.started = self.loading.popleft()
+            self.driver.switch_to.window(handle)
+            self.wait_for_navigation(url)
+            yield platform, url
+            # Extraction is done; put the tab to work on the next URL
+            self.idle.append(handle)
+            following = next(jobs, None)
+            if following is not None:
+                self.start(*following)
+
+    def close(self):
+        """Close the extra tabs, leaving the browser on its first one"""
+        for handle in self.handles[1:]:
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except Exception as e:
+                self.logger.warning(f"Error closing tab: {str(e)}")
+        self.driver.switch_to.window(self.handles[0])
@@ -0,0 +1,130 @@
+"""
+Product identity of URLs.
+
+Extracts a stable product ID from a URL (Amazon ASIN, eBay item ID,
+AliExpress item ID, Jumia SKU), falling back to the canonical URL with
+tracking parameters removed. Only the standard library is used, so commands
+that just plan URLs (e.g. --enqueue) start without loading pandas.
+"""
+import re
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+
+# Query parameters that only carry tracking/session state
+TRACKING_PARAMS = {
+    'ref', 'ref_', 'qid', 'sr', 'crid', 'sprefix', 'keywords', 'dib', 'dib_tag', 'th', 'psc',
+    'smid', 'spia', 'content-id', 'hash', 'itmmeta', 'itmprp', 'epid', 'mkevt', 'mkcid',
+    'mkrid', 'campid', 'toolid', 'customid', 'spm', 'scm', 'pvid', 'pdp_npi', 'gatewayadapt',
+    'fbclid', 'gclid', 'msclkid', 'tag', 'linkcode', 'camp', 'creative',
+}
+TRACKING_PREFIXES = ('utm_', 'pd_rd_', 'pf_rd_', '_trk', 'algo_', 'aff_')
+
+ID_PATTERNS = {
+    'amazon': [
+        re.compile(r'/(?:dp|gp/product|gp/aw/d|product)/([A-Z0-9]{10})(?:[/?]|$)', re.IGNORECASE),
+    ],
+    'ebay': [
+        re.compile(r'/itm/(?:[^/?]+/)?(\d{9,15})(?:[/?]|$)'),
+    ],
+    'aliexpress': [
+        re.compile(r'/item/(?:[^/?]+/)?(\d{6,20})\.html'),
+    ],
+    'jumia': [
+        re.compile(r'-([A-Z]{2}\d{3}[A-Z]{2}[A-Z0-9]{6,})\.html', re.IGNORECASE),
+        re.compile(r'-(\d{6,12})\.html'),
+        re.compile(r'/catalog/product/?([A-Za-z0-9]+)/?$'),
+    ],
+}
+# Query parameters that wrapper links use to carry the real URL
+REDIRECT_PARAMS = ('ru', 'url', 'redirect', 'returnUrl')
+PLATFORM_HOSTS = {
+    'amazon': 'amazon.',
+    'ebay': 'ebay.',
+    'aliexpress': 'aliexpress.',
+    'jumia': 'jumia.',
+}
+
+
+def is_product_path(url):
+    """Whether url's path carries a product ID of any platform"""
+    path = urlsplit(url).path
+    return any(pattern.search(path) for patterns in ID_PATTERNS.values() for pattern in patterns)
+
+
+def unwrap_redirect(url):
+    """Return the real product URL behind wrapper links.
+
+    Bot-challenge/redirect pages (e.g. eBay splashui) are always unwrapped;
+    other links (e.g. Amazon sponsored /sspa/click?url=%2Fdp%2F...) only when
+    the wrapped URL, possibly relative, is a product page.
+    """
+    parts = urlsplit(url)
+    wrapper = 'challenge' in parts.path or 'redirect' in parts.path
+    for name, value in parse_qsl(parts.query):
+        if name not in REDIRECT_PARAMS or not value.startswith(('http', '/')):
+            continue
+        target = urljoin(url, value)
+        if wrapper or is_product_path(target):
+            return target
+    return url
+
+
+def canonical_url(url):
+    """Normalize a product URL: unwrap redirects, drop tracking params and fragments"""
+    if not isinstance(url, str) or not url.startswith('http'):
+        return url
+    parts = urlsplit(unwrap_redirect(url.strip()))
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=False)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    ]
+    path = parts.path.rstrip('/') or '/'
+    # Amazon appends /ref=... path segments for tracking
+    path = re.sub(r'/ref=[^/]*$', '', path)
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+
+def detect_platform(url):
+    if not isinstance(url, str):
+        return None
+    host = urlsplit(url).netloc.lower()
+    for platform, marker in PLATFORM_HOSTS.items():
+        if marker in host:
+            return platform
+    return None
+
+
+def page_type(url, platform):
+    """'product' for a single product page, 'search' for a results/listing page"""
+    if platform == "amazon":
+        return "product" if "/dp/" in url or "/gp/" in url or "/product/" in url else "search"
+    if platform == "ebay":
+        return "product" if "/itm/" in url else "search"
+    if platform == "aliexpress":
+        return "product" if "/item/" in url else "search"
+    if platform == "jumia":
+        return "product" if "/catalog/" in url or "/product/" in url else "search"
+    return "product"
+
+
+def extract_product_id(url, platform=None):
+    """Extract a stable '<platform>:<id>' identifier, falling back to the canonical URL.
+
+    Search and listing pages (e.g. a search card whose link fell back to the
+    results page) don't identify one product and get None, like a missing URL.
+    """
+    if not isinstance(url, str) or not url.startswith('http'):
+        return None
+    canonical = canonical_url(url)
+    platform = platform or detect_platform(canonical)
+    path = urlsplit(canonical).path
+    for pattern in ID_PATTERNS.get(platform, []):
+        match = pattern.search(path)
+        if match:
+            return f"{platform}:{match.group(1).upper()}"
+    if page_type(canonical, platform) != "product":
+        return None
+    return f"url:{canonical}"
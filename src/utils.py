@@ -1,19 +1,172 @@
 import re
+import os
 import json
+import time
+import queue
+import atexit
 import logging
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
-def setup_logging(name):
-    """Set up logging configuration"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(f'logs/{name}.log'),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger(name)
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Structured fields a record may carry via `extra=`; they are written to logs/events.jsonl
+STRUCTURED_FIELDS = ('url', 'platform', 'phase', 'duration', 'items', 'task_id', 'run_id')
+LOG_QUEUE_SIZE = 10000
+
+_logging_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+_file_handlers = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any structured fields passed through `extra=`"""
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `burst` identical warnings per `window` seconds, then summarize the rest"""
+    def __init__(self, burst=5, window=60):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.lock = threading.Lock()
+        self.seen = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            started, count, suppressed = self.seen.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                if suppressed:
+                    record.msg = f"{record.msg} (suppressed {suppressed} identical messages in the last {self.window}s)"
+                started, count, suppressed = now, 0, 0
+            count += 1
+            allowed = count <= self.burst
+            self.seen[key] = (started, count, suppressed + (0 if allowed else 1))
+        return allowed
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread; drops them instead of waiting if the writer falls behind"""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge the message here; tracebacks are formatted by the writer thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            # Report drops once the writer has caught up, not on every freed slot
+            if self.dropped and self.queue.qsize() < self.queue.maxsize // 2:
+                self.queue.put_nowait(self.drop_notice())
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def drop_notice(self):
+        notice = logging.makeLogRecord({
+            'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+            'msg': f"Dropped {self.dropped} log records while the log writer was behind",
+        })
+        self.dropped = 0
+        return notice
+
+
+class LogWriter(QueueListener):
+    def enqueue_sentinel(self):
+        # On shutdown wait for room in the queue, so every record already queued gets written
+        self.queue.put(self._sentinel)
+
+
+class LoggerFilter(logging.Filter):
+    def __init__(self, names):
+        super().__init__()
+        self.names = names
+
+    def filter(self, record):
+        return any(record.name == name or record.name.startswith(name + '.') for name in self.names)
+
+
+def _start_logging():
+    """Install the queue handler on the root logger and start the background writer"""
+    global _listener, _queue_handler
+    os.makedirs('logs', exist_ok=True)
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    events = logging.FileHandler('logs/events.jsonl')
+    events.setFormatter(JsonFormatter())
+
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(RateLimitFilter())
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(_queue_handler)
+
+    _listener = LogWriter(log_queue, console, events, *_file_handlers.values(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _queue_handler
+    with _logging_lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        if _queue_handler.dropped:
+            _listener.queue.put(_queue_handler.drop_notice())
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
+
+
+def setup_logging(name, logger_name=None):
+    """Route `logger_name` (default: name) to logs/<name>.log through the shared background writer.
+
+    Safe to call from every component: the queue, the writer thread, the
+    console output and logs/events.jsonl are set up once per process.
+    """
+    logger_name = logger_name or name
+    with _logging_lock:
+        if _listener is None:
+            _start_logging()
+        handler = _file_handlers.get(name)
+        if handler is None:
+            handler = logging.FileHandler(f'logs/{name}.log')
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            handler.addFilter(LoggerFilter([]))
+            _file_handlers[name] = handler
+            # The writer thread reads this tuple per record, so swapping it in is safe
+            _listener.handlers = _listener.handlers + (handler,)
+        names = handler.filters[0].names
+        if logger_name not in names:
+            names.append(logger_name)
+    return logging.getLogger(logger_name)
 
 def extract_price(price_str):
     """Extract numeric price from string"""
@@ -1,4 +1,6 @@
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
@@ -6,22 +8,31 @@ from datetime import datetime
 import logging
 import json
 import re
+from src.renderer import ChartRenderer, safe_chart_name
+from src.html_dashboard import HtmlDashboardBuilder
+from src.render_manifest import RenderManifest, fingerprint_series, fingerprint_frame
+from src.identity import ProductIndex
+from src.rollups import RollupStore
+from src.series_store import SeriesStore
+from src.matching import ProductMatcher
+from src.anomaly import excluded_rows
+from src.config import get_config
+from src.utils import setup_logging
+
 class DataVisualizer:
-    def __init__(self):
+    def __init__(self, max_workers=None, history=None, mp_context=None):
+        self.max_workers = max_workers
+        # Start method for the chart render pool (see ChartRenderer); None uses the platform default
+        self.mp_context = mp_context
+        # History frame handed over by the exporter, used instead of re-reading the CSV
+        self.history = history
         self.setup_logging()
         self.setup_directories()
         self.setup_style()
+        self.manifest = RenderManifest()
         
     def setup_logging(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('logs/visualizer.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        self.logger = setup_logging('visualizer', __name__)
         
     def setup_directories(self):
         os.makedirs('data/charts', exist_ok=True)
@@ -31,14 +42,27 @@ class DataVisualizer:
         sns.set_palette("husl")
         
     def load_historical_data(self):
+        df = self.read_historical_data()
+        if df.empty:
+            return df
+        return self.drop_anomalies(df)
+    
+    def read_historical_data(self):
         try:
             historical_file = "data/historical_data.csv"
-            if not os.path.exists(historical_file):
+            if self.history is not None:
+                df = self.history.copy()
+            elif not os.path.exists(historical_file):
                 self.logger.warning("Historical data file not found")
                 return pd.DataFrame()
-                
-            df = pd.read_csv(historical_file)
-            df['scraped_at'] = pd.to_datetime(df['scraped_at'])
+            else:
+                df = pd.read_csv(historical_file)
+            df['scraped_at'] = pd.to_datetime(df['scraped_at'], format='ISO8601')
+            
+            # History written before the identity index existed has no product keys
+            product_index = ProductIndex()
+            df = product_index.ensure_keys(df)
+            product_index.save()
             
             # Clean price data
             df['price_numeric'] = df['price'].apply(self.extract_numeric_price)
@@ -48,6 +72,41 @@ class DataVisualizer:
             self.logger.error(f"Error loading historical data: {str(e)}")
             return pd.DataFrame()
     
+    def drop_anomalies(self, df):
+        # Rows flagged at ingest plus glitches already in older history
+        flagged = excluded_rows(df, get_config())
+        if flagged.any():
+            self.logger.info(f"Excluding {int(flagged.sum())} anomalous observations from charts")
+        return df[~flagged]
+    
+    def load_rollups(self):
+        try:
+            rollups = RollupStore()
+            if not rollups.exists():
+                # Rollups are normally maintained by the exporter; seed them once if missing
+                df = self.load_historical_data()
+                if df.empty:
+                    return None
+                return rollups.rebuild(df)
+            return rollups.load()
+        except Exception as e:
+            self.logger.error(f"Error loading rollups: {str(e)}")
+            return None
+    
+    def load_series(self):
+        try:
+            series = SeriesStore()
+            if not series.exists():
+                # The series store is normally maintained by the exporter; seed it once if missing
+                df = self.read_historical_data()
+                if df.empty:
+                    return None
+                return series.rebuild(df)
+            return series.open()
+        except Exception as e:
+            self.logger.error(f"Error loading price series: {str(e)}")
+            return None
+    
     def extract_numeric_price(self, price_str):
         if pd.isna(price_str) or price_str == "Not Found":
             return None
@@ -59,60 +118,77 @@ class DataVisualizer:
         except:
             return None
     
-    def generate_price_trends(self):
-        df = self.load_historical_data()
-        if df.empty:
-            self.logger.warning("No historical data available for generating trends")
-            return
+    def generate_price_trends(self, force=False, product_keys=None):
+        """Render stale price trend charts, only for `product_keys` if given"""
+        tasks = []
+        current_charts = {}
+        # The exporter may be appending to (or compacting) the store on another thread meanwhile;
+        # stale series are copied out under the lock so rendering doesn't touch the mapped files
+        with SeriesStore.lock:
+            series = self.load_series()
+            if series is None or not len(series):
+                self.logger.warning("No historical data available for generating trends")
+                return
             
-        # Get unique products
-        products = df['title'].unique()
-        
-        for product in products:
-            if pd.isna(product) or product == "Not Found":
-                continue
+            # Each product's series is a slice of the memory-mapped store; the CSV isn't read
+            for product_key, product_id, title in series.products():
+                if product_keys is not None and product_key not in product_keys:
+                    continue
+                dates, prices = series.series(product_key)
+                # Skip if not enough data points
+                if len(prices) < 2:
+                    continue
                 
-            product_data = df[df['title'] == product]
-            
-            # Skip if not enough data points
-            if len(product_data) < 2:
-                continue
+                product = title if title and title != "Not Found" else product_id
                 
-            plt.figure(figsize=(10, 6))
-            
-            # Plot price trend
-            plt.plot(product_data['scraped_at'], product_data['price_numeric'], 
-                    marker='o', linewidth=2, markersize=6)
-            
-            plt.title(f"Price Trend for {product[:50]}...")
-            plt.xlabel("Date")
-            plt.ylabel("Price")
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            
-            # Save the chart
-            safe_product_name = "".join(c for c in product if c.isalnum() or c in (' ',)).rstrip()
-            safe_product_name = safe_product_name[:50]  # Limit filename length
-            filename = f"data/charts/price_trend_{safe_product_name}.png"
-            plt.savefig(filename)
-            plt.close()
-            
-            self.logger.info(f"Generated price trend chart for: {product[:30]}...")
+                filename = f"data/charts/price_trend_{product_key}_{safe_chart_name(product)}.png"
+                # Only re-render charts whose input series changed since the last run
+                fingerprint = fingerprint_series(product_key, dates, prices)
+                current_charts[filename] = fingerprint
+                if force or self.manifest.is_chart_stale(filename, fingerprint):
+                    tasks.append((product, dates.copy(), prices.copy(), filename))
+        
+        # Charts outside a partial run belong to products that weren't considered, not deleted ones
+        removed = self.manifest.prune_charts(current_charts) if product_keys is None else 0
+        self.logger.info(
+            f"Price trends: {len(tasks)} stale, {len(current_charts) - len(tasks)} up to date, "
+            f"{removed} removed"
+        )
+        
+        stats = None
+        if tasks:
+            stats = ChartRenderer(max_workers=self.max_workers, mp_context=self.mp_context).render(tasks)
+        
+        for filename, fingerprint in current_charts.items():
+            self.manifest.mark_chart(filename, fingerprint)
+        self.manifest.save()
+        return stats
     
-    def generate_comparison_charts(self):
-        df = self.load_historical_data()
-        if df.empty:
+    def generate_comparison_charts(self, force=False):
+        rollups = self.load_rollups()
+        if rollups is None:
             return
             
-        # Get latest data for each product
-        latest_data = df.loc[df.groupby('title')['scraped_at'].idxmax()]
+        # Latest data for each product is maintained at ingest time
+        latest_data = rollups['latest']
         
-        # Platform comparison
-        plt.figure(figsize=(12, 8))
         platform_avg = latest_data.groupby('platform')['price_numeric'].mean().dropna()
         if platform_avg.empty:
             logging.warning("No data available for comparison charts. Skipping visualization.")
             return
+        ratings = pd.to_numeric(latest_data['rating'], errors='coerce').dropna()
+        
+        # Skip rendering when the aggregated inputs are unchanged
+        fingerprint = fingerprint_frame(pd.concat([platform_avg, ratings], keys=['avg', 'rating']))
+        outputs = ["data/charts/platform_comparison.png"]
+        if not ratings.empty:
+            outputs.append("data/charts/rating_distribution.png")
+        if not force and not self.manifest.is_aggregate_stale('comparison', fingerprint, outputs):
+            self.logger.info("Comparison charts are up to date, skipping")
+            return
+        
+        # Platform comparison
+        plt.figure(figsize=(12, 8))
         platform_avg.plot(kind='bar')
         plt.title("Average Price by Platform")
         plt.xlabel("Platform")
@@ -123,9 +199,8 @@ class DataVisualizer:
         plt.close()
         
         # Rating distribution
-        plt.figure(figsize=(10, 6))
-        ratings = pd.to_numeric(latest_data['rating'], errors='coerce').dropna()
         if not ratings.empty:
+            plt.figure(figsize=(10, 6))
             plt.hist(ratings, bins=10, edgecolor='black')
             plt.title("Rating Distribution")
             plt.xlabel("Rating")
@@ -134,25 +209,36 @@ class DataVisualizer:
             plt.savefig("data/charts/rating_distribution.png")
             plt.close()
         
+        self.manifest.mark_aggregate('comparison', fingerprint)
+        self.manifest.save()
         self.logger.info("Generated comparison charts")
     
-    def generate_dashboard(self):
-        df = self.load_historical_data()
-        if df.empty:
+    def generate_dashboard(self, force=False):
+        rollups = self.load_rollups()
+        if rollups is None:
+            return
+        
+        platform_daily = rollups['platform_daily']
+        rating_reviews = rollups['rating_reviews']
+        discount_hist = rollups['discount_hist']
+        fingerprint = fingerprint_frame(pd.concat(
+            [platform_daily.astype(str), rating_reviews.astype(str), discount_hist.astype(str)],
+            keys=['daily', 'ratings', 'discounts'],
+        ))
+        if not force and not self.manifest.is_aggregate_stale('dashboard', fingerprint, ["data/charts/dashboard.png"]):
+            self.logger.info("Dashboard is up to date, skipping")
             return
             
         # Create a comprehensive dashboard
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         
-        # Price trends by platform
-        for i, platform in enumerate(df['platform'].unique()):
-            platform_data = df[df['platform'] == platform]
-            if platform_data.empty:
+        # Daily average price by platform
+        for platform, platform_data in platform_daily.groupby('platform'):
+            priced = platform_data[platform_data['priced_count'] > 0].sort_values('day')
+            if priced.empty:
                 continue
-                
-            # Get average price over time
-            avg_prices = platform_data.groupby('scraped_at')['price_numeric'].mean()
-            axes[0, 0].plot(avg_prices.index, avg_prices.values, label=platform, marker='o')
+            avg_prices = priced['price_sum'] / priced['priced_count']
+            axes[0, 0].plot(priced['day'], avg_prices, label=platform, marker='o')
         
         axes[0, 0].set_title("Price Trends by Platform")
         axes[0, 0].set_xlabel("Date")
@@ -161,21 +247,19 @@ class DataVisualizer:
         axes[0, 0].tick_params(axis='x', rotation=45)
         
         # Platform distribution
-        platform_counts = df['platform'].value_counts()
+        platform_counts = platform_daily.groupby('platform')['count'].sum().sort_values(ascending=False)
         axes[0, 1].pie(platform_counts.values, labels=platform_counts.index, autopct='%1.1f%%')
         axes[0, 1].set_title("Products by Platform")
         
-        # Rating vs Reviews scatter plot
-        ratings = pd.to_numeric(df['rating'], errors='coerce')
-        reviews = pd.to_numeric(df['reviews'], errors='coerce')
-        axes[1, 0].scatter(ratings, reviews, alpha=0.6)
+        # Rating vs Reviews scatter plot, one point per histogram bin sized by its count
+        sizes = 10 + 90 * rating_reviews['count'] / max(rating_reviews['count'].max(), 1)
+        axes[1, 0].scatter(rating_reviews['rating'], rating_reviews['reviews'], s=sizes, alpha=0.6)
         axes[1, 0].set_title("Rating vs Number of Reviews")
         axes[1, 0].set_xlabel("Rating")
         axes[1, 0].set_ylabel("Reviews")
         
         # Discount distribution
-        discounts = df['discount'].apply(lambda x: float(x.strip('%')) if '%' in str(x) else 0)
-        axes[1, 1].hist(discounts, bins=20, edgecolor='black')
+        axes[1, 1].hist(discount_hist['discount'], weights=discount_hist['count'], bins=20, edgecolor='black')
         axes[1, 1].set_title("Discount Distribution")
         axes[1, 1].set_xlabel("Discount (%)")
         axes[1, 0].set_ylabel("Count")
@@ -184,10 +268,69 @@ class DataVisualizer:
         plt.savefig("data/charts/dashboard.png")
         plt.close()
         
+        self.manifest.mark_aggregate('dashboard', fingerprint)
+        self.manifest.save()
         self.logger.info("Generated comprehensive dashboard")
+    
+    def generate_match_comparison(self, force=False):
+        rollups = self.load_rollups()
+        if rollups is None:
+            return
+        
+        latest_data = rollups['latest']
+        matcher = ProductMatcher()
+        if len(matcher.keys) == 0:
+            # The exporter maintains the index; seed it from the latest observations once
+            matcher.add_products(latest_data)
+        
+        table = matcher.cheapest_platform_table(latest_data)
+        if table.empty:
+            return table
+        
+        fingerprint = fingerprint_frame(table[['match_group', 'cheapest_platform', 'cheapest_price', 'highest_price']])
+        filename = "data/charts/cheapest_platform.png"
+        if not force and not self.manifest.is_aggregate_stale('cheapest_platform', fingerprint, [filename]):
+            self.logger.info("Cheapest platform chart is up to date, skipping")
+            return table
+        
+        fig, axes = plt.subplots(1, 2, figsize=(16, 8), gridspec_kw={'width_ratios': [1, 2]})
+        
+        # How often each platform is the cheapest for a matched product
+        wins = table['cheapest_platform'].value_counts()
+        axes[0].bar(wins.index, wins.values)
+        axes[0].set_title("Cheapest Platform (matched products)")
+        axes[0].set_xlabel("Platform")
+        axes[0].set_ylabel("Products")
+        
+        # Largest price gaps between platforms for the same product
+        top = table.head(15).iloc[::-1]
+        labels = [f"{title[:40]} ({platform})" for title, platform in zip(top['title'], top['cheapest_platform'])]
+        axes[1].barh(labels, top['highest_price'], color='lightgray', label='Highest price')
+        axes[1].barh(labels, top['cheapest_price'], label='Cheapest price')
+        axes[1].set_title("Same Product, Cheapest Platform")
+        axes[1].set_xlabel("Price")
+        axes[1].legend()
+        
+        plt.tight_layout()
+        plt.savefig(filename)
+        plt.close()
+        
+        self.manifest.mark_aggregate('cheapest_platform', fingerprint)
+        self.manifest.save()
+        self.logger.info(f"Generated cheapest platform chart for {len(table)} matched products")
+        return table
+    
+    def generate_html_dashboard(self):
+        df = self.load_historical_data()
+        if df.empty:
+            return
+        
+        return HtmlDashboardBuilder().build(df, key_column='product_key')
 
 if __name__ == "__main__":
     visualizer = DataVisualizer()
     visualizer.generate_price_trends()
     visualizer.generate_comparison_charts()
-    visualizer.generate_dashboard()
\ No newline at end of file
+    visualizer.generate_dashboard()
+    visualizer.generate_match_comparison()
+    visualizer.generate_html_dashboard()
\ No newline at end of file
@@ -0,0 +1,345 @@
+"""
+Lease-based work queue for distributed scraping, backed by SQLite.
+
+`enqueue_run` turns config/products.json into one task per URL. Workers
+(`main.py --worker`, any number of processes or machines sharing the
+database file) lease a task, heartbeat while scraping it and then complete or
+fail it. A lease that is not renewed expires, so a task held by a worker that
+died is picked up again by another one. Results are stored per task; the
+worker that finishes a run's last task merges them into one run snapshot and
+hands it to DataExporter. The merge is leased like a task and the run is
+only marked merged once the export succeeded, so a worker that dies or fails
+mid-export leaves the run for another worker to merge.
+"""
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open',
+    merge_owner TEXT,
+    merge_expires REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    platform TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run_id, status);
+CREATE TABLE IF NOT EXISTS results (
+    task_id INTEGER NOT NULL,
+    run_id INTEGER NOT NULL,
+    items TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+"""
+
+
+class WorkQueue:
+    def __init__(self, db_file="data/queue.db", lease_seconds=300, max_attempts=3):
+        self.db_file = db_file
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            # Databases created before merges were leased lack the lease columns
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+            for column, kind in (('merge_owner', 'TEXT'), ('merge_expires', 'REAL')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE runs ADD COLUMN {column} {kind}")
+
+    @classmethod
+    def from_settings(cls, settings):
+        config = settings.get('work_queue', {})
+        return cls(
+            db_file=config.get('db_file', "data/queue.db"),
+            lease_seconds=config.get('lease_seconds', 300),
+            max_attempts=config.get('max_attempts', 3),
+        )
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue_run(self, product_urls):
+        """Create a run with one task per configured URL; returns the run_id"""
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            run_id = conn.execute(
+                "INSERT INTO runs (created_at) VALUES (?)", (datetime.now().isoformat(),)
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO tasks (run_id, platform, url, updated_at) VALUES (?, ?, ?, ?)",
+                [(run_id, platform, url, now) for platform, urls in product_urls.items() for url in urls],
+            )
+            conn.execute("COMMIT")
+        self.logger.info(f"Enqueued run {run_id} with {self.run_counts(run_id).get('pending', 0)} tasks")
+        return run_id
+
+    def lease(self, worker_id):
+        """Claim the oldest pending task, or one whose lease expired; None if there is nothing to do"""
+        now = time.time()
+        with self.connect() as conn:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            self.expire_exhausted(conn, now)
+            row = conn.execute(
+                "SELECT task_id, run_id, platform, url, attempts FROM tasks "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY task_id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            task_id, run_id, platform, url, attempts = row
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE task_id = ?",
+                (worker_id, now + self.lease_seconds, now, task_id),
+            )
+            conn.execute("COMMIT")
+        if attempts:
+            self.logger.info(f"Reclaimed task {task_id} ({url}), attempt {attempts + 1}")
+        return {'task_id': task_id, 'run_id': run_id, 'platform': platform, 'url': url}
+
+    def expire_exhausted(self, conn, now):
+        """Expired leases that already used every attempt are failed instead of retried"""
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', last_error = 'lease expired', updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+
+    def heartbeat(self, task_id, worker_id):
+        """Extend a lease; returns False if the worker no longer owns it"""
+        now = time.time()
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE task_id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, task_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, task, worker_id, items):
+        """Store a task's results; returns False if the lease was lost to another worker"""
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', lease_owner = NULL, updated_at = ? "
+                "WHERE task_id = ? AND lease_owner = ? AND status = 'leased'",
+                (now, task['task_id'], worker_id),
+            )
+            if cursor.rowcount != 1:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT INTO results (task_id, run_id, items) VALUES (?, ?, ?)",
+                (task['task_id'], task['run_id'], json.dumps(items)),
+            )
+            conn.execute("COMMIT")
+        return True
+
+    def fail(self, task, worker_id, error):
+        """Release a task for retry, or fail it once it has used every attempt"""
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? "
+                "WHERE task_id = ? AND lease_owner = ? AND status = 'leased'",
+                (self.max_attempts, str(error), now, task['task_id'], worker_id),
+            )
+
+    def run_counts(self, run_id):
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def has_open_tasks(self):
+        with self.connect() as conn:
+            row = conn.execute("SELECT 1 FROM tasks WHERE status IN ('pending', 'leased') LIMIT 1").fetchone()
+        return row is not None
+
+    def claim_merge(self, run_id, worker_id):
+        """Lease a finished run for merging; only one worker at a time gets True"""
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            open_tasks = conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE run_id = ? AND status IN ('pending', 'leased')", (run_id,)
+            ).fetchone()[0]
+            if open_tasks:
+                conn.execute("ROLLBACK")
+                return False
+            cursor = conn.execute(
+                "UPDATE runs SET status = 'merging', merge_owner = ?, merge_expires = ? "
+                "WHERE run_id = ? AND (status = 'open' OR (status = 'merging' AND merge_expires < ?))",
+                (worker_id, now + self.lease_seconds, run_id, now),
+            )
+            conn.execute("COMMIT")
+        return cursor.rowcount == 1
+
+    def renew_merge(self, run_id, worker_id):
+        """Extend a merge lease; returns False if the worker no longer owns it"""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE runs SET merge_expires = ? WHERE run_id = ? AND merge_owner = ? AND status = 'merging'",
+                (time.time() + self.lease_seconds, run_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def finish_merge(self, run_id, worker_id):
+        """Mark a run merged once its export succeeded"""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE runs SET status = 'merged', merge_owner = NULL, merge_expires = NULL "
+                "WHERE run_id = ? AND merge_owner = ? AND status = 'merging'",
+                (run_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def release_merge(self, run_id, worker_id):
+        """Give up a merge after a failed export so the run is merged again later"""
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE runs SET status = 'open', merge_owner = NULL, merge_expires = NULL "
+                "WHERE run_id = ? AND merge_owner = ? AND status = 'merging'",
+                (run_id, worker_id),
+            )
+
+    def finished_runs(self):
+        """Runs not merged yet (or whose merge lease expired) whose tasks are all done or failed"""
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT run_id FROM runs WHERE (status = 'open' OR (status = 'merging' AND merge_expires < ?)) "
+                "AND NOT EXISTS (SELECT 1 FROM tasks WHERE tasks.run_id = runs.run_id AND status IN ('pending', 'leased'))",
+                (time.time(),),
+            ).fetchall()
+        return [run_id for (run_id,) in rows]
+
+    def snapshot(self, run_id):
+        """All items scraped in a run, in task order"""
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT items FROM results WHERE run_id = ? ORDER BY task_id", (run_id,)
+            ).fetchall()
+        return [item for (items,) in rows for item in json.loads(items)]
+
+
+class QueueWorker:
+    def __init__(self, queue, scraper_factory, worker_id=None, poll_seconds=5):
+        self.queue = queue
+        self.scraper_factory = scraper_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        self.logger = logging.getLogger(__name__)
+        self.scraper = None
+
+    def run(self, export=None):
+        """Process tasks until the queue is drained; `export(run_id, data)` merges finished runs"""
+        self.logger.info(f"Worker {self.worker_id} started")
+        processed = 0
+        try:
+            while True:
+                task = self.queue.lease(self.worker_id)
+                if task is None:
+                    if not self.queue.has_open_tasks():
+                        break
+                    # Other workers hold the remaining leases; wait in case one of them dies
+                    time.sleep(self.poll_seconds)
+                    continue
+                self.process(task)
+                processed += 1
+                self.merge_finished(export)
+            self.merge_finished(export)
+        finally:
+            if self.scraper is not None:
+                self.scraper.close()
+        self.logger.info(f"Worker {self.worker_id} finished after {processed} tasks")
+        return processed
+
+    def merge_finished(self, export):
+        if export is None:
+            return
+        for run_id in self.queue.finished_runs():
+            if not self.queue.claim_merge(run_id, self.worker_id):
+                continue
+            counts = self.queue.run_counts(run_id)
+            self.logger.info(f"Merging run {run_id}: {counts}")
+            stop = threading.Event()
+            beat = threading.Thread(target=self.merge_heartbeat, args=(run_id, stop), daemon=True)
+            beat.start()
+            try:
+                export(run_id, self.queue.snapshot(run_id))
+            except Exception as e:
+                self.logger.error(f"Error exporting run {run_id}, leaving it for a later merge: {str(e)}")
+                self.queue.release_merge(run_id, self.worker_id)
+                continue
+            finally:
+                stop.set()
+                beat.join()
+            if not self.queue.finish_merge(run_id, self.worker_id):
+                self.logger.warning(f"Merge lease on run {run_id} was lost while exporting it")
+
+    def process(self, task):
+        stop = threading.Event()
+        beat = threading.Thread(target=self.heartbeat, args=(task, stop), daemon=True)
+        beat.start()
+        try:
+            if self.scraper is None:
+                self.scraper = self.scraper_factory()
+            items = self.scraper.scrape_url(task['url'], task['platform'])
+            # A page with nothing on it (e.g. all results already seen) is a finished task, not a failure
+            if not self.queue.complete(task, self.worker_id, items or []):
+                self.logger.warning(f"Lease on task {task['task_id']} was lost; discarding its results")
+        except Exception as e:
+            self.logger.error(f"Error scraping {task['url']}: {str(e)}")
+            self.queue.fail(task, self.worker_id, e)
+        finally:
+            stop.set()
+            beat.join()
+
+    def merge_heartbeat(self, run_id, stop):
+        interval = max(1, self.queue.lease_seconds / 3)
+        while not stop.wait(interval):
+            if not self.queue.renew_merge(run_id, self.worker_id):
+                self.logger.warning(f"Lost merge lease on run {run_id}")
+                return
+
+    def heartbeat(self, task, stop):
+        interval = max(1, self.queue.lease_seconds / 3)
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(task['task_id'], self.worker_id):
+                self.logger.warning(f"Lost lease on task {task['task_id']}")
+                return
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, so data/ and logs/ are scratch and the config is the defaults"""
+    # Log files are opened relative to the working directory, which the app expects to have logs/
+    (tmp_path / 'logs').mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
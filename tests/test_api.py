@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from src.api import PriceQueryService
+from src.exporter import DataExporter
+from src.records import RecordBatch
+from tests.test_exporter import items
+
+
+@pytest.fixture
+def service(workdir):
+    batch = RecordBatch.coerce(items(2))
+    DataExporter().update_historical_data(batch.to_frame(), batch.price_values())
+    return PriceQueryService()
+
+
+@pytest.mark.parametrize('query', [{'since': ['']}, {'until': ['NaT']}, {'since': ['yesterday-ish']}])
+def test_history_rejects_unparseable_bounds(service, query):
+    status, _, body = service.handle('/products/amazon:B000000000/history', query)
+    assert status == 400
+    assert 'Invalid' in json.loads(body)['error']
+
+
+@pytest.mark.parametrize('since, count', [('2025-01-01', 1), ('2025-01-03', 0)])
+def test_history_filters_by_bounds(service, since, count):
+    status, _, body = service.handle('/products/amazon:B000000000/history', {'since': [since]})
+    assert status == 200
+    assert len(json.loads(body)['observations']) == count
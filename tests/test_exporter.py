@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+
+from src.exporter import DataExporter
+from src.records import RecordBatch
+
+
+def items(count=4, scraped_at="2025-01-02T09:00:00.123456"):
+    rows = [{
+        'platform': 'amazon',
+        'title': f"Wireless Mouse {i}",
+        'url': f"https://www.amazon.com/dp/B00000000{i}",
+        'price': f"${20 + i}.99",
+        'discount': '0%',
+        'rating': '4.5',
+        'reviews': '120',
+        'scraped_at': scraped_at,
+    } for i in range(count)]
+    return rows
+
+
+def test_update_historical_data_quarantines_anomalous_rows(workdir):
+    data = items()
+    data.append({**data[0], 'url': "https://www.amazon.com/dp/B000000099", 'title': "Not Found", 'price': "Not Found"})
+    batch = RecordBatch.coerce(data)
+
+    history = DataExporter().update_historical_data(batch.to_frame(), batch.price_values())
+
+    assert history is not None
+    assert len(history) == 4
+    written = pd.read_csv("data/historical_data.csv")
+    assert len(written) == 4
+    assert "Not Found" not in written['title'].tolist()
+    quarantined = pd.read_csv("data/quarantine.csv")
+    assert quarantined['url'].tolist() == ["https://www.amazon.com/dp/B000000099"]
+
+
+def test_export_data_reports_a_failed_history_update(workdir):
+    # A directory where the history file belongs makes writing it fail
+    os.makedirs("data/historical_data.csv")
+    assert DataExporter().export_data(items(), formats=['csv']) is False
+
+
+def test_export_data_reports_success(workdir):
+    assert DataExporter().export_data(items(), formats=['csv']) is True
+
+
+def test_history_keeps_iso_scrape_times(workdir):
+    exporter = DataExporter()
+    exporter.update_historical_data(RecordBatch.coerce(items(2, "2025-01-01T00:00:00")).to_frame())
+    batch = RecordBatch.coerce(items(2, "2025-01-02T09:00:00.123456"))
+    exporter.update_historical_data(batch.to_frame(), batch.price_values())
+
+    written = pd.read_csv("data/historical_data.csv", dtype=str)
+    assert written['scraped_at'].tolist() == ["2025-01-01T00:00:00"] * 2 + ["2025-01-02T09:00:00.123456"] * 2
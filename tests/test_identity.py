@@ -0,0 +1,38 @@
+import pandas as pd
+
+from src.identity import ProductIndex, UNIDENTIFIED_KEY
+from src.matching import ProductMatcher
+
+
+def observations():
+    return pd.DataFrame({
+        'platform': ['amazon', 'amazon', 'amazon', 'ebay'],
+        'url': ["https://www.amazon.com/dp/B000000001?tag=x", "https://www.amazon.com/s?k=mouse",
+                None, "https://www.ebay.com/itm/123456789012"],
+        'title': ["Logitech Wireless Mouse", "Razer Gaming Mouse", "Not Found", "Logitech Wireless Mouse"],
+        'price': ["$20.99", "$35.00", "Not Found", "$21.50"],
+        'scraped_at': ["2025-01-02T09:00:00"] * 4,
+    })
+
+
+def test_unidentified_rows_share_a_key_outside_the_index(workdir):
+    product_index = ProductIndex()
+    df = product_index.assign(observations())
+    product_index.save()
+
+    assert df['product_key'].tolist()[1:3] == [UNIDENTIFIED_KEY, UNIDENTIFIED_KEY]
+    assert df['product_id'].isna().tolist() == [False, True, True, False]
+    stored = pd.read_csv("data/product_index.csv")
+    assert stored['product_id'].tolist() == ["amazon:B000000001", "ebay:123456789012"]
+
+    # Assigning the same rows again adds nothing to the index
+    again = ProductIndex()
+    assert again.assign(observations())['product_key'].tolist() == df['product_key'].tolist()
+    assert not again.dirty
+
+
+def test_matcher_skips_unidentified_rows(workdir):
+    matcher = ProductMatcher()
+    matcher.add_products(ProductIndex().assign(observations()))
+    assert UNIDENTIFIED_KEY not in matcher.keys.tolist()
+    assert sorted(matcher.products['title']) == ["Logitech Wireless Mouse", "Logitech Wireless Mouse"]
@@ -0,0 +1,27 @@
+import glob
+
+from src.exporter import DataExporter
+from src.pipeline import ExportPipeline
+from src.visualizer import DataVisualizer
+from tests.test_exporter import items
+
+
+def scrape_run(pipeline, scraped_at):
+    amazon = items(10, scraped_at)
+    ebay = [{**item, 'platform': 'ebay', 'url': f"https://www.ebay.com/itm/1234567890{i:02d}"}
+            for i, item in enumerate(amazon)]
+    for platform, page in (('amazon', amazon), ('ebay', ebay)):
+        pipeline.put(platform, page)
+        pipeline.platform_done(platform)
+    pipeline.close()
+
+
+def test_pipeline_renders_with_a_spawned_pool(workdir):
+    visualizer = DataVisualizer(max_workers=2)
+    scrape_run(ExportPipeline(DataExporter(), visualizer, formats=['csv']), "2025-01-01T09:00:00")
+    pipeline = ExportPipeline(DataExporter(), visualizer, formats=['csv'])
+    assert visualizer.mp_context.get_start_method() == 'spawn'
+    scrape_run(pipeline, "2025-01-02T09:00:00")
+
+    # Ten products per platform with two observations each, rendered in the pool
+    assert len(glob.glob("data/charts/price_trend_*.png")) == 20
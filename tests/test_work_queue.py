@@ -0,0 +1,31 @@
+from src.work_queue import WorkQueue, QueueWorker
+
+
+class FakeScraper:
+    def scrape_url(self, url, platform):
+        return [{'platform': platform, 'title': "Wireless Mouse", 'url': url, 'price': "$20.99"}]
+
+    def close(self):
+        pass
+
+
+def run_status(queue, run_id):
+    with queue.connect() as conn:
+        return conn.execute("SELECT status FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+
+def test_failed_export_releases_the_run(workdir):
+    queue = WorkQueue(db_file="data/queue.db")
+    run_id = queue.enqueue_run({'amazon': ["https://www.amazon.com/dp/B000000001"]})
+
+    def failing_export(run_id, data):
+        raise RuntimeError("history update failed")
+
+    QueueWorker(queue, FakeScraper, worker_id="w1").run(export=failing_export)
+    assert run_status(queue, run_id) == 'open'
+    assert queue.finished_runs() == [run_id]
+
+    merged = []
+    QueueWorker(queue, FakeScraper, worker_id="w2").run(export=lambda run_id, data: merged.append((run_id, len(data))))
+    assert merged == [(run_id, 1)]
+    assert run_status(queue, run_id) == 'merged'